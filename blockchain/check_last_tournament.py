@@ -1,8 +1,10 @@
 from web3 import Web3
 import json
+import os
 
-# Connect to Ganache
-ganache_url = "http://ganache:8545"
+# Connect to Ganache (the same node and build directory the app uses)
+ganache_url = f"http://{os.getenv('TRUFFLE_HOST', 'ganache')}:{os.getenv('TRUFFLE_PORT', '8545')}"
+build_dir = os.getenv('CONTRACT_BUILD_DIR', '/app/build')
 web3 = Web3(Web3.HTTPProvider(ganache_url))
 
 # Check if connection is successful
@@ -12,12 +14,12 @@ else:
     print("Failed to connect")
 
 # Get the contract ABI and address
-with open('/app/build/contracts/Tournament.json') as f:
+with open(os.path.join(build_dir, 'contracts', 'Tournament.json')) as f:
     contract_json = json.load(f)
     contract_abi = contract_json['abi']
 
 # Read contract address from file
-with open('/app/build/contract_address.txt', 'r') as file:
+with open(os.path.join(build_dir, 'contract_address.txt'), 'r') as file:
     contract_address = file.read().replace('\n', '')
 contract = web3.eth.contract(address=contract_address, abi=contract_abi)
 
@@ -25,19 +27,19 @@ contract = web3.eth.contract(address=contract_address, abi=contract_abi)
 web3.eth.default_account = web3.eth.accounts[0]
 
 def get_last_tournament():
-    # Get all matches
-    matches = contract.functions.getMatches().call()
-    if matches:  # Check if there are any matches
-        # Return the last match in the list
-        last_match = matches[-1]
+    # Read only the last match instead of the whole array
+    count = contract.functions.matchCount().call()
+    if count:  # Check if there are any matches
+        last_match = contract.functions.getMatches(count - 1, 1).call()[0]
         return {
+            "index": count - 1,
             "player_id_1": last_match[0],
             "player_id_2": last_match[1],
             "player_id_3": last_match[2],
             "player_id_4": last_match[3],
-            "score_match_1_2": last_match[4],
-            "score_match_3_4": last_match[5],
-            "score_match_final": last_match[6]
+            "score_match_1_2": f"{last_match[4]}-{last_match[5]}",
+            "score_match_3_4": f"{last_match[6]}-{last_match[7]}",
+            "score_match_final": f"{last_match[8]}-{last_match[9]}"
         }
     else:
         return "No tournaments found"
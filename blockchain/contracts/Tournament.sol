@@ -2,39 +2,65 @@
 pragma solidity 0.8.19;
 
 contract Tournament {
+    // IDs de usuario (0 si es un bye) y marcadores de las semifinales y la
+    // final como enteros: cada torneo ocupa un solo slot de almacenamiento
     struct Match {
-        string player_id_1;
-        string player_id_2;
-        string player_id_3;
-        string player_id_4;
-        string score_match_1_2;
-        string score_match_3_4;
-        string score_match_final;
+        uint32 player_id_1;
+        uint32 player_id_2;
+        uint32 player_id_3;
+        uint32 player_id_4;
+        uint8 score_1;
+        uint8 score_2;
+        uint8 score_3;
+        uint8 score_4;
+        uint8 score_final_1;
+        uint8 score_final_2;
     }
 
     Match[] public matches;
+    // Clave de idempotencia de cada torneo guardado -> índice + 1 (0 si no está)
+    mapping(bytes32 => uint256) public indexOf;
 
-    function saveMatch(
-        string memory player_id_1,
-        string memory player_id_2,
-        string memory player_id_3,
-        string memory player_id_4,
-        string memory score_match_1_2,
-        string memory score_match_3_4,
-        string memory score_match_final
-    ) public {
-        matches.push(Match(
-            player_id_1,
-            player_id_2,
-            player_id_3,
-            player_id_4,
-            score_match_1_2,
-            score_match_3_4,
-            score_match_final
-        ));
+    event MatchSaved(uint256 indexed index, bytes32 indexed key, Match data);
+
+    function saveMatch(bytes32 key, Match calldata data) public returns (uint256) {
+        return save(key, data);
+    }
+
+    // Varios torneos en una transacción. Los que ya se guardaron con la misma
+    // clave (un reintento) se omiten sin revertir el resto
+    function saveMatches(bytes32[] calldata keys, Match[] calldata data) public {
+        require(keys.length == data.length, "keys and data length mismatch");
+        for (uint256 i = 0; i < keys.length; i++) {
+            save(keys[i], data[i]);
+        }
+    }
+
+    function save(bytes32 key, Match calldata data) private returns (uint256 index) {
+        uint256 saved = indexOf[key];
+        if (saved != 0) {
+            return saved - 1;
+        }
+        index = matches.length;
+        matches.push(data);
+        indexOf[key] = index + 1;
+        emit MatchSaved(index, key, data);
+    }
+
+    function matchCount() public view returns (uint256) {
+        return matches.length;
     }
 
-    function getMatches() public view returns (Match[] memory) {
-        return matches;
+    // Hasta `limit` torneos a partir de `offset` (menos al final del array)
+    function getMatches(uint256 offset, uint256 limit) public view returns (Match[] memory page) {
+        uint256 count = matches.length;
+        if (offset >= count) {
+            return new Match[](0);
+        }
+        uint256 end = limit > count - offset ? count : offset + limit;
+        page = new Match[](end - offset);
+        for (uint256 i = offset; i < end; i++) {
+            page[i - offset] = matches[i];
+        }
     }
 }
@@ -1,8 +1,10 @@
 from web3 import Web3
 import json
+import os
 
-# Connect to Ganache
-ganache_url = "http://ganache:8545"
+# Connect to Ganache (the same node and build directory the app uses)
+ganache_url = f"http://{os.getenv('TRUFFLE_HOST', 'ganache')}:{os.getenv('TRUFFLE_PORT', '8545')}"
+build_dir = os.getenv('CONTRACT_BUILD_DIR', '/app/build')
 web3 = Web3(Web3.HTTPProvider(ganache_url))
 
 
@@ -13,13 +15,13 @@ else:
     print("Failed to connect")
 
 # Get the contract ABI and address
-with open('/app/build/contracts/Tournament.json') as f:
+with open(os.path.join(build_dir, 'contracts', 'Tournament.json')) as f:
     contract_json = json.load(f)
     contract_abi = contract_json['abi']
 
 # contract_address = '0x6B130A87fD200bEb185Eb5426144E7f473AF9Ef9' # get from deploying with truffle
 # read contract adrress from file
-with open('/app/build/contract_address.txt', 'r') as file:
+with open(os.path.join(build_dir, 'contract_address.txt'), 'r') as file:
     contract_address = file.read().replace('\n', '')
 contract = web3.eth.contract(address=contract_address, abi=contract_abi)
 
@@ -27,56 +29,62 @@ contract = web3.eth.contract(address=contract_address, abi=contract_abi)
 web3.eth.default_account = web3.eth.accounts[0]
 
 
+# Match fields in contract order: user ids (0 for a bye) and the scores of
+# semifinal 1-2, semifinal 3-4 and the final
+MATCH_FIELDS = ("player_id_1", "player_id_2", "player_id_3", "player_id_4",
+                "score_1", "score_2", "score_3", "score_4",
+                "score_final_1", "score_final_2")
+
+
 def save_tournament(data):
+    # A random idempotency key: the contract ignores a key it already has
     tx_hash = contract.functions.saveMatch(
-        data["player_id_1"],
-        data["player_id_2"],
-        data["player_id_3"],
-        data["player_id_4"],
-        data["score_match_1_2"],
-        data["score_match_3_4"],
-        data["score_match_final"]
+        os.urandom(32),
+        tuple(data[field] for field in MATCH_FIELDS)
     ).transact()
 
     # Wait for transaction to be mined
     receipt = web3.eth.wait_for_transaction_receipt(tx_hash)
+    # The MatchSaved event carries the index of the new match
+    event = contract.events.MatchSaved().process_receipt(receipt)[0]
+    print(f"Saved match #{event['args']['index']}")
     return receipt
 
 
-def get_tournaments():
-    matches = contract.functions.getMatches().call()
+def get_tournaments(offset=0, limit=10):
+    matches = contract.functions.getMatches(offset, limit).call()
     return matches
 
 
 # Example JSON data
 tournament_data = {
-    "player_id_1": "player_id_1",
-    "player_id_2": "player_id_2",
-    "player_id_3": "player_id_3",
-    "player_id_4": "player_id_4",
-    "score_match_1_2": "1-0",
-    "score_match_3_4": "1-0",
-    "score_match_final": "1-0"
+    "player_id_1": 1,
+    "player_id_2": 2,
+    "player_id_3": 3,
+    "player_id_4": 4,
+    "score_1": 5, "score_2": 0,
+    "score_3": 5, "score_4": 3,
+    "score_final_1": 5, "score_final_2": 4
 }
 
 tournament_data_2 = {
-    "player_id_1": "player_id_1",
-    "player_id_2": "player_id_2",
-    "player_id_3": "player_id_3",
-    "player_id_4": "player_id_4",
-    "score_match_1_2": "1-0",
-    "score_match_3_4": "1-0",
-    "score_match_final": "1-0"
+    "player_id_1": 5,
+    "player_id_2": 6,
+    "player_id_3": 7,
+    "player_id_4": 0,
+    "score_1": 2, "score_2": 5,
+    "score_3": 0, "score_4": 0,
+    "score_final_1": 5, "score_final_2": 1
 }
 
 tournament_data_3 = {
-    "player_id_1": "player_id_1",
-    "player_id_2": "player_id_2",
-    "player_id_3": "player_id_3",
-    "player_id_4": "player_id_4",
-    "score_match_1_2": "1-0",
-    "score_match_3_4": "1-0",
-    "score_match_final": "1-0"
+    "player_id_1": 1,
+    "player_id_2": 3,
+    "player_id_3": 5,
+    "player_id_4": 7,
+    "score_1": 5, "score_2": 1,
+    "score_3": 4, "score_4": 5,
+    "score_final_1": 3, "score_final_2": 5
 }
 
 # Save the tournament data
@@ -84,7 +92,8 @@ save_tournament(tournament_data)
 save_tournament(tournament_data_2)
 save_tournament(tournament_data_3)
 
-# Get all matches
+# Get the first page of matches
+print(f"{contract.functions.matchCount().call()} matches saved")
 matches = get_tournaments()
 for match in matches:
     print(match)
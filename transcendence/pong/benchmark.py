@@ -0,0 +1,225 @@
+"""
+Mide cuántos pasos de física por segundo dan los backends de pong.physics y
+cuánta memoria ocupa cada sala activa. Antes de medir comprueba que todos los
+backends dan las mismas trayectorias (physics.compare_backends). No necesita
+Django; se ejecuta desde el directorio transcendence/:
+
+    python -m pong.benchmark [segundos] [redis://host:puerto]
+
+También compara la entrega de frames entre procesos por el FrameRing de
+memoria compartida con la de los mismos eventos update_ball por el channel
+layer (en memoria y, si se pasa su URL, Redis).
+"""
+import asyncio
+import multiprocessing
+import sys
+import time
+import tracemalloc
+import numpy as np
+from pong import engine
+from pong.physics import BACKENDS, compare_backends
+from pong.ringbuffer import FRAME, FrameRing
+from pong.simulation import RING_CAPACITY, PooledPhysics
+from pong.state import MatchRoom
+
+DT = 1.0 / 60
+ROOM_COUNTS = (1, 10, 100, 1000)
+MEMORY_ROOMS = 10000
+DELIVERY_TICKS = 200
+
+
+def bench_engine(duration):
+    """Pasos por segundo de engine.step() sobre una sola partida."""
+    state = engine.GameState(engine.PONG, seed=1)
+    step = engine.step
+    steps = 0
+    started = time.perf_counter()
+    deadline = started + duration
+    while time.perf_counter() < deadline:
+        for _ in range(1000):
+            if step(state, DT) == engine.FINISHED:
+                state = engine.GameState(engine.PONG, seed=steps)
+        steps += 1000
+    return steps / (time.perf_counter() - started)
+
+
+def bench_backend(name, rooms, duration):
+    """Pasos de sala por segundo de un backend con `rooms` salas activas."""
+    physics = BACKENDS[name]()
+    for room_id in range(rooms):
+        physics.add(room_id, engine.PONG, seed=room_id)
+    ticks = 0
+    started = time.perf_counter()
+    deadline = started + duration
+    while time.perf_counter() < deadline:
+        events = physics.step(DT)
+        for room_id, event in events.items():
+            # Las partidas terminadas se reinician para mantener la carga
+            if event == engine.FINISHED:
+                physics.remove(room_id)
+                physics.add(room_id, engine.PONG, seed=ticks)
+        ticks += 1
+    elapsed = time.perf_counter() - started
+    return ticks * rooms / elapsed, elapsed / ticks * 1000
+
+
+def bench_pool(processes, rooms, duration):
+    """
+    Milisegundos por tick que PooledPhysics ocupa al proceso que lo usa (el
+    ASGI) con `rooms` salas repartidas en `processes` procesos. Entre ticks se
+    espera como el planificador para que los procesos calculen en paralelo.
+    """
+    physics = PooledPhysics(processes)
+    for room_id in range(rooms):
+        physics.add(room_id, engine.PONG, seed=room_id)
+    # Sin contar el arranque de los procesos
+    for _ in range(3):
+        physics.step(DT)
+    busy = 0.0
+    ticks = 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        physics.step(DT)
+        busy += time.perf_counter() - started
+        ticks += 1
+        time.sleep(DT)
+    physics.close()
+    return busy / ticks * 1000
+
+
+def produce(ring_name, rooms, ticks):
+    """Proceso productor de bench_ring(): un frame por sala y tick."""
+    ring = FrameRing(name=ring_name)
+    records = np.zeros(rooms, dtype=FRAME)
+    records['slot'] = np.arange(rooms)
+    records['moved'] = 1
+    for seq in range(1, ticks + 1):
+        records['seq'] = seq
+        records['ball_x'] = seq / ticks
+        ring.write(records)
+        ring.finish_step(seq)
+    ring.close()
+
+
+def bench_ring(rooms, ticks=DELIVERY_TICKS):
+    """Frames por segundo que llegan de otro proceso por un FrameRing."""
+    ring = FrameRing(RING_CAPACITY)
+    context = multiprocessing.get_context('spawn')
+    process = context.Process(target=produce, args=(ring.name, rooms, ticks), daemon=True)
+    # El reloj empieza con el primer frame, sin contar el arranque del proceso
+    process.start()
+    while not ring.read():
+        time.sleep(0)
+    started = time.perf_counter()
+    frames = 0
+    while frames < rooms * ticks:
+        views = ring.read()
+        for view in views:
+            frames += len(view)
+            view['ball_x'].sum()
+        ring.release(views)
+    elapsed = time.perf_counter() - started
+    process.join()
+    ring.close()
+    return frames / elapsed
+
+
+async def deliver(layer, rooms, ticks):
+    """Envía y recibe por `layer` un update_ball por sala y tick."""
+    channel = await layer.new_channel()
+    started = time.perf_counter()
+    for tick in range(ticks):
+        for room_id in range(rooms):
+            await layer.send(channel, {
+                'type': 'update_ball',
+                'ball_position_x': tick / ticks,
+                'ball_position_y': room_id / rooms,
+            })
+        for _ in range(rooms):
+            await layer.receive(channel)
+    return rooms * ticks / (time.perf_counter() - started)
+
+
+def bench_channel_layer(rooms, redis_url=None, ticks=DELIVERY_TICKS):
+    """Eventos update_ball por segundo entregados por el channel layer."""
+    if redis_url is None:
+        from channels.layers import InMemoryChannelLayer
+        layer = InMemoryChannelLayer(capacity=max(100, rooms))
+    else:
+        from channels_redis.core import RedisChannelLayer
+        layer = RedisChannelLayer(hosts=[redis_url], capacity=max(100, rooms))
+    return asyncio.run(deliver(layer, rooms, ticks))
+
+
+def measure(build):
+    """Bytes por sala reservados por build() al crear MEMORY_ROOMS salas."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    rooms = build()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del rooms
+    return used / MEMORY_ROOMS
+
+
+def legacy_room(room_id):
+    """Estado de una partida de torneo tal y como se guardaba antes, en un dict."""
+    return {
+        'ball_position_x': 0.5, 'ball_position_y': 0.5,
+        'ball_speed_x': 0.008, 'ball_speed_y': 0.0064,
+        'left_paddle': 0.5, 'right_paddle': 0.5,
+        'player1_score': 0, 'player2_score': 0,
+        'player1_id': str(room_id), 'player2_id': str(room_id + 1),
+        'players': {}, 'ready': 0, 'running': False,
+        'ball_task': None, 'paused_until': 0.0,
+    }
+
+
+def memory_report():
+    """Compara los bytes por sala activa del dict antiguo con el estado actual."""
+    def build_legacy():
+        return {room_id: legacy_room(room_id) for room_id in range(MEMORY_ROOMS)}
+
+    def build_slots(name):
+        def build():
+            physics = BACKENDS[name](MEMORY_ROOMS) if name == 'batch' else BACKENDS[name]()
+            rooms = {}
+            for room_id in range(MEMORY_ROOMS):
+                rooms[room_id] = MatchRoom(str(room_id), str(room_id + 1))
+                physics.add(room_id, engine.TOURNAMENT, seed=room_id)
+            return rooms, physics
+        return build
+
+    print(f"dict por sala: {measure(build_legacy):,.0f} bytes/sala")
+    for name in BACKENDS:
+        print(f"MatchRoom + {name}: {measure(build_slots(name)):,.0f} bytes/sala")
+
+
+def main():
+    duration = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+    for config in (engine.PONG, engine.TOURNAMENT):
+        difference = compare_backends(config)
+        if difference is not None:
+            sys.exit(f"Los backends de física no coinciden: {difference}")
+    print(f"engine.step: {bench_engine(duration):,.0f} pasos/s")
+    for name in BACKENDS:
+        for rooms in ROOM_COUNTS:
+            rate, tick_ms = bench_backend(name, rooms, duration)
+            print(f"{name:>6} {rooms:>5} salas: {rate:>12,.0f} pasos/s "
+                  f"({tick_ms:.3f} ms/tick)")
+    for rooms in ROOM_COUNTS:
+        tick_ms = bench_pool(2, rooms, duration)
+        print(f"  pool {rooms:>5} salas: {tick_ms:.3f} ms/tick en el proceso ASGI")
+    redis_url = sys.argv[2] if len(sys.argv) > 2 else None
+    for rooms in ROOM_COUNTS:
+        line = (f"entrega {rooms:>5} salas: ring {bench_ring(rooms):>12,.0f} frames/s, "
+                f"channel layer en memoria {bench_channel_layer(rooms):>10,.0f} eventos/s")
+        if redis_url:
+            line += f", Redis {bench_channel_layer(rooms, redis_url):>10,.0f} eventos/s"
+        print(line)
+    memory_report()
+
+
+if __name__ == '__main__':
+    main()
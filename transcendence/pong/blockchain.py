@@ -0,0 +1,93 @@
+"""
+Cliente compartido del contrato Tournament para todo el proceso. Importarlo
+no conecta con la blockchain ni lee ficheros: el ABI y la dirección del
+contrato se leen una sola vez al primer uso, y cada cliente web3 se crea
+también al primer uso sobre un pool de conexiones HTTP keep-alive que
+comparten todos los que lo llaman.
+
+Hay dos clientes porque hay dos tipos de llamadas: contract() es síncrono,
+para las vistas, y async_contract() usa AsyncWeb3, para el escritor de
+pong.chain que corre en el bucle de eventos.
+"""
+import asyncio
+import json
+import os
+import threading
+import aiohttp
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from web3 import AsyncWeb3, Web3
+
+
+class BlockchainClient:
+    def __init__(self):
+        self.abi = None
+        self.address = None
+        self.web3 = None
+        self.cached_contract = None
+        self.async_web3 = None
+        self.cached_async_contract = None
+        self.lock = threading.Lock()
+        # Para que dos llamadas a la vez no creen cada una su sesión aiohttp
+        self.async_lock = asyncio.Lock()
+
+    def contract_info(self):
+        """ABI y dirección del contrato desplegado por Truffle (se leen una vez)."""
+        if self.address is None:
+            build_dir = settings.BLOCKCHAIN_BUILD_DIR
+            with open(os.path.join(build_dir, 'contracts', 'Tournament.json')) as f:
+                abi = json.load(f)['abi']
+            with open(os.path.join(build_dir, 'contract_address.txt')) as f:
+                self.abi, self.address = abi, f.read().strip()
+        return self.abi, self.address
+
+    def contract(self):
+        """Contrato con el cliente síncrono; las vistas lo usan desde varios hilos."""
+        if self.cached_contract is None:
+            with self.lock:
+                if self.cached_contract is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=1,
+                                          pool_maxsize=settings.BLOCKCHAIN_POOL_SIZE)
+                    session.mount('http://', adapter)
+                    session.mount('https://', adapter)
+                    self.web3 = Web3(Web3.HTTPProvider(
+                        settings.BLOCKCHAIN_URL, session=session,
+                        request_kwargs={'timeout': settings.BLOCKCHAIN_TIMEOUT_S}))
+                    abi, address = self.contract_info()
+                    self.cached_contract = self.web3.eth.contract(address=address, abi=abi)
+        return self.cached_contract
+
+    async def async_contract(self):
+        """
+        Contrato con el cliente AsyncWeb3, que envía las transacciones desde la
+        primera cuenta de Ganache. Si falla al crearlo se reintenta en la
+        siguiente llamada.
+        """
+        if self.cached_async_contract is None:
+            async with self.async_lock:
+                if self.cached_async_contract is None:
+                    await self.create_async_contract()
+        return self.cached_async_contract
+
+    async def create_async_contract(self):
+        provider = AsyncWeb3.AsyncHTTPProvider(settings.BLOCKCHAIN_URL)
+        # La sesión queda ligada al bucle de eventos que la crea
+        session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=settings.BLOCKCHAIN_POOL_SIZE),
+            timeout=aiohttp.ClientTimeout(total=settings.BLOCKCHAIN_TIMEOUT_S))
+        await provider.cache_async_session(session)
+        web3 = AsyncWeb3(provider)
+        try:
+            web3.eth.default_account = (await web3.eth.accounts)[0]
+        except Exception:
+            await session.close()
+            raise
+        abi, address = self.contract_info()
+        self.async_web3 = web3
+        self.cached_async_contract = web3.eth.contract(address=address, abi=abi)
+
+
+# Instancia única por proceso
+blockchain = BlockchainClient()
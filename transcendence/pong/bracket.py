@@ -0,0 +1,118 @@
+"""
+Cuadro de eliminación directa guardado como un árbol binario en un array,
+igual que un heap: el nodo 1 es la final, los hijos del nodo i son 2i y
+2i + 1 y las hojas (de size a 2 * size - 1) son los jugadores sembrados. Cada
+nodo interno es un partido y guarda a su ganador, así que anotar un
+resultado solo toca el nodo y su padre, y seguir el camino de un jugador
+hasta su partido actual es O(log n).
+
+Los partidos se identifican por su nodo: '<token>-m<nodo>'.
+"""
+
+SIZES = (4, 8, 16, 32, 64, 128)   # Tamaños de torneo que se pueden crear
+MIN_PLAYERS = 2
+
+
+def bracket_size(players):
+    """Menor tamaño de cuadro (potencia de dos, mínimo 4) en el que caben `players`."""
+    size = SIZES[0]
+    while size < players:
+        size *= 2
+    return size
+
+
+class Bracket:
+    __slots__ = ('size', 'slots', 'scores', 'leaves')
+
+    def __init__(self, size, slots=None, scores=None):
+        self.size = size
+        # slots[nodo]: ganador del partido o jugador de la hoja; None si aún
+        # no se sabe o es un bye
+        self.slots = slots if slots is not None else [None] * (2 * size)
+        # scores[2 * nodo] y scores[2 * nodo + 1]: marcador del partido
+        self.scores = scores if scores is not None else [0] * (2 * size)
+        self.leaves = {player: leaf for leaf, player in enumerate(self.slots[size:], size)
+                       if player is not None}
+
+    @classmethod
+    def seed(cls, players):
+        """
+        Cuadro con `players` en orden de inscripción. Los byes van a los
+        últimos cruces de la primera ronda, uno por cruce, y sus rivales pasan
+        directamente a la segunda.
+        """
+        size = bracket_size(len(players))
+        bracket = cls(size)
+        half = size // 2
+        for k in range(half):
+            first = players[k] if k < len(players) else None
+            second = players[k + half] if k + half < len(players) else None
+            bracket.slots[size + 2 * k] = first
+            bracket.slots[size + 2 * k + 1] = second
+            if first is not None:
+                bracket.leaves[first] = size + 2 * k
+            if second is not None:
+                bracket.leaves[second] = size + 2 * k + 1
+            if second is None:
+                bracket.slots[half + k] = first
+        return bracket
+
+    @property
+    def rounds(self):
+        return self.size.bit_length() - 1
+
+    def round_of(self, node):
+        """Ronda de un partido: 1 es la primera y `rounds` la final."""
+        return self.rounds - node.bit_length() + 1
+
+    def nodes(self, round_number):
+        """Partidos de una ronda, de arriba abajo del cuadro."""
+        first = 1 << (self.rounds - round_number)
+        return range(first, 2 * first)
+
+    def players(self, node):
+        return self.slots[2 * node], self.slots[2 * node + 1]
+
+    def score(self, node):
+        return self.scores[2 * node], self.scores[2 * node + 1]
+
+    def winner(self, node=1):
+        return self.slots[node]
+
+    def is_ready(self, node):
+        """Si el partido tiene a sus dos jugadores y aún no se ha jugado."""
+        player1, player2 = self.players(node)
+        return self.slots[node] is None and player1 is not None and player2 is not None
+
+    def is_bye(self, node):
+        """Si el partido no se jugó porque uno de los dos era un bye."""
+        player1, player2 = self.players(node)
+        return self.slots[node] is not None and (player1 is None or player2 is None)
+
+    def round_finished(self, round_number):
+        return all(self.slots[node] is not None for node in self.nodes(round_number))
+
+    def current_match(self, player):
+        """Partido que le queda por jugar a `player`, o None si ya no sigue."""
+        leaf = self.leaves.get(player)
+        if leaf is None:
+            return None
+        node = leaf // 2
+        while node and self.slots[node] == player:
+            node //= 2
+        if node == 0 or self.slots[node] is not None:
+            return None
+        return node
+
+    def opponent(self, node, player):
+        player1, player2 = self.players(node)
+        return player2 if player == player1 else player1
+
+    def record(self, node, winner, score1, score2):
+        """Anota el resultado de un partido. Devuelve False si ya lo tenía."""
+        if self.slots[node] is not None:
+            return False
+        self.slots[node] = winner
+        self.scores[2 * node] = score1
+        self.scores[2 * node + 1] = score2
+        return True
@@ -0,0 +1,325 @@
+"""
+Resultados de torneos en la blockchain sin bloquear el bucle de eventos.
+
+Al terminar un torneo su resultado se guarda en la tabla TournamentOutbox
+(enqueue) y un bucle en segundo plano la vacía en el libro configurado
+(pong.ledger, normalmente el contrato en Ganache): junta los
+pendientes en lotes de hasta BLOCKCHAIN_BATCH_SIZE (o los que haya tras
+BLOCKCHAIN_BATCH_WINDOW_S), los envía en una sola transacción saveMatches,
+espera al recibo (en una tarea aparte, sin frenar los siguientes lotes) y
+reintenta con espera exponencial los que fallan. Como la cola está en la base
+de datos, lo que no llegó a enviarse se envía tras un reinicio, y con varios
+workers cada resultado lo reclama solo uno. Cada worker sigue los recibos de
+sus propias transacciones; las que dejó enviadas un worker caído las adopta
+otro pasado el doble de BLOCKCHAIN_RECEIPT_TIMEOUT_S. Cada
+resultado lleva su clave de idempotencia, así que un reintento de algo que sí
+llegó a minarse no lo guarda dos veces.
+
+El mismo bucle copia en TournamentRecord las entradas nuevas del contrato,
+leyendo por rangos desde la última copiada, y el historial de torneos pagina
+esa tabla en lugar de leer el contrato entero.
+
+El contrato guarda IDs y marcadores como enteros (CONTRACT_FIELDS);
+from_contract() los pasa al formato de texto del historial (MATCH_FIELDS).
+"""
+import asyncio
+from datetime import timedelta
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.db.models import F, Max
+from django.utils import timezone
+from pong.ledger import ledger
+from pong.models import TournamentOutbox, TournamentRecord
+
+# Campos de Match en el orden del contrato: IDs de usuario (0 si es un bye) y
+# marcadores de las semifinales 1-2 y 3-4 y de la final
+CONTRACT_FIELDS = ('player_id_1', 'player_id_2', 'player_id_3', 'player_id_4',
+                   'score_1', 'score_2', 'score_3', 'score_4',
+                   'score_final_1', 'score_final_2')
+# Campos de TournamentRecord
+MATCH_FIELDS = ('player_id_1', 'player_id_2', 'player_id_3', 'player_id_4',
+                'score_match_1_2', 'score_match_3_4', 'score_match_final')
+MAX_BACKOFF_S = 300
+
+
+def from_contract(entry):
+    """Entrada del contrato con los campos de TournamentRecord."""
+    (player1, player2, player3, player4,
+     score1, score2, score3, score4, final1, final2) = entry
+    return {
+        'player_id_1': str(player1) if player1 else '',
+        'player_id_2': str(player2) if player2 else '',
+        'player_id_3': str(player3) if player3 else '',
+        'player_id_4': str(player4) if player4 else '',
+        'score_match_1_2': f"{score1}-{score2}",
+        'score_match_3_4': f"{score3}-{score4}",
+        'score_match_final': f"{final1}-{final2}",
+    }
+
+
+@database_sync_to_async
+def create_entry(payload):
+    return TournamentOutbox.objects.create(payload=payload)
+
+
+def entry_key(entry):
+    """Clave de idempotencia como bytes32 para el contrato."""
+    return entry.idempotency_key.bytes.rjust(32, b'\0')
+
+
+@database_sync_to_async
+def claim_entries(limit, window):
+    """
+    Reclama hasta `limit` resultados pendientes cuyo reintento ya toca. Si no
+    llenan un lote y el más antiguo lleva menos de `window` segundos en cola,
+    no reclama ninguno y devuelve también cuánto falta para que lo haga.
+    """
+    now = timezone.now()
+    # Los que un worker caído dejó a medio enviar vuelven a la cola
+    stale = now - timedelta(seconds=settings.BLOCKCHAIN_RECEIPT_TIMEOUT_S)
+    TournamentOutbox.objects.filter(
+        status=TournamentOutbox.SENDING, updated_at__lt=stale
+    ).update(status=TournamentOutbox.PENDING, updated_at=now)
+
+    candidates = list(TournamentOutbox.objects.filter(
+        status=TournamentOutbox.PENDING, next_attempt_at__lte=now
+    ).values_list('pk', 'created_at')[:limit])
+    if not candidates:
+        return [], None
+    waited = (now - candidates[0][1]).total_seconds()
+    if len(candidates) < limit and waited < window:
+        return [], window - waited
+    claimed = []
+    for pk, _ in candidates:
+        # Si otro worker lo reclama a la vez, solo uno consigue cambiar el estado
+        if TournamentOutbox.objects.filter(pk=pk, status=TournamentOutbox.PENDING).update(
+                status=TournamentOutbox.SENDING, attempts=F('attempts') + 1, updated_at=now):
+            claimed.append(pk)
+    return list(TournamentOutbox.objects.filter(pk__in=claimed)), None
+
+
+@database_sync_to_async
+def orphaned_entries(tracked):
+    """
+    Reclama los resultados enviados cuyo recibo nadie sigue: los de
+    transacciones que no están en `tracked` y llevan más del doble del tiempo
+    de espera del recibo sin cambios (el worker que las envió ha caído).
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=2 * settings.BLOCKCHAIN_RECEIPT_TIMEOUT_S)
+    candidates = TournamentOutbox.objects.filter(
+        status=TournamentOutbox.SENT, updated_at__lt=stale
+    ).exclude(tx_hash__in=tracked).values_list('pk', 'updated_at')
+    claimed = [pk for pk, updated_at in candidates
+               # Si otro worker lo adopta a la vez, solo uno lo cambia
+               if TournamentOutbox.objects.filter(
+                   pk=pk, status=TournamentOutbox.SENT, updated_at=updated_at
+               ).update(updated_at=now)]
+    return list(TournamentOutbox.objects.filter(pk__in=claimed))
+
+
+@database_sync_to_async
+def mark_sent(entries, tx_hash):
+    TournamentOutbox.objects.filter(pk__in=[entry.pk for entry in entries]).update(
+        status=TournamentOutbox.SENT, tx_hash=tx_hash, updated_at=timezone.now())
+
+
+@database_sync_to_async
+def confirm(entry, block_number, chain_index):
+    entry.status = TournamentOutbox.CONFIRMED
+    entry.block_number = block_number
+    entry.chain_index = chain_index
+    entry.last_error = ''
+    entry.save(update_fields=['status', 'block_number', 'chain_index',
+                              'last_error', 'updated_at'])
+
+
+@database_sync_to_async
+def retry(entry, error):
+    """Vuelve a poner el resultado en cola, o lo da por fallido. Devuelve su estado."""
+    entry.last_error = str(error)
+    if entry.attempts >= settings.BLOCKCHAIN_MAX_ATTEMPTS:
+        entry.status = TournamentOutbox.FAILED
+    else:
+        entry.status = TournamentOutbox.PENDING
+        entry.next_attempt_at = timezone.now() + timedelta(
+            seconds=min(2 ** entry.attempts, MAX_BACKOFF_S))
+    entry.save(update_fields=['status', 'next_attempt_at', 'last_error', 'updated_at'])
+    return entry.status
+
+
+@database_sync_to_async
+def next_chain_index():
+    last = TournamentRecord.objects.aggregate(last=Max('chain_index'))['last']
+    return 0 if last is None else last + 1
+
+
+@database_sync_to_async
+def last_record():
+    return TournamentRecord.objects.order_by('-chain_index').first()
+
+
+@database_sync_to_async
+def clear_records():
+    TournamentRecord.objects.all().delete()
+
+
+@database_sync_to_async
+def save_records(first_index, entries):
+    TournamentRecord.objects.bulk_create([
+        TournamentRecord(chain_index=index, **from_contract(entry))
+        for index, entry in enumerate(entries, first_index)
+    ], ignore_conflicts=True)
+
+
+class ChainWriter:
+    def __init__(self):
+        self.task = None
+        self.wakeup = None
+        self.batch_wait = None  # Segundos hasta que el lote incompleto se envíe
+        self.tracking = {}  # Mapea tx_hash a la tarea que espera su recibo
+
+    def start(self):
+        """
+        Arranca el bucle de escritura (solo la primera vez). Se llama al usar
+        los torneos para que los resultados que quedaron en cola se envíen.
+        """
+        if self.task is not None and not self.task.done():
+            return
+        self.wakeup = asyncio.Event()
+        self.task = asyncio.create_task(self.run())
+
+    async def enqueue(self, payload):
+        """Guarda un resultado (campos de Match) para enviarlo en segundo plano."""
+        entry = await create_entry(payload)
+        print(f"[DEBUG] Torneo en cola para la blockchain ({entry.pk})")
+        self.start()
+        self.wakeup.set()
+
+    async def run(self):
+        while True:
+            try:
+                await self.drain()
+                await self.sync()
+            except Exception as e:
+                print(f"[ERROR] Error con la blockchain: {e}")
+            timeout = settings.BLOCKCHAIN_POLL_S
+            if self.batch_wait is not None:
+                timeout = min(timeout, self.batch_wait)
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+
+    async def drain(self):
+        """Envía un lote de resultados pendientes y adopta los enviados que nadie sigue."""
+        entries, self.batch_wait = await claim_entries(
+            settings.BLOCKCHAIN_BATCH_SIZE, settings.BLOCKCHAIN_BATCH_WINDOW_S)
+        if entries:
+            await self.send(entries)
+            if len(entries) == settings.BLOCKCHAIN_BATCH_SIZE:
+                # Puede que queden más en cola: la siguiente pasada no espera
+                self.batch_wait = 0
+
+        transactions = {}
+        for entry in await orphaned_entries(list(self.tracking)):
+            transactions.setdefault(entry.tx_hash, []).append(entry)
+        for tx_hash, entries in transactions.items():
+            print(f"[WARNING] Recuperando {len(entries)} torneos enviados en {tx_hash}")
+            self.start_tracking(tx_hash, entries)
+
+    async def send(self, entries):
+        """Envía los resultados reclamados en una transacción saveMatches."""
+        try:
+            tx_hash = await ledger.save_matches(
+                [entry_key(entry) for entry in entries],
+                [tuple(entry.payload[field] for field in CONTRACT_FIELDS) for entry in entries])
+        except Exception as e:
+            for entry in entries:
+                await retry(entry, e)
+            print(f"[ERROR] Error enviando {len(entries)} torneos a la blockchain: {e}")
+            return
+        await mark_sent(entries, tx_hash)
+        print(f"[DEBUG] {len(entries)} torneos enviados a la blockchain en una transacción")
+        self.start_tracking(tx_hash, entries)
+
+    def start_tracking(self, tx_hash, entries):
+        """Espera al recibo en una tarea aparte para no frenar el envío de más lotes."""
+        task = asyncio.create_task(self.track(tx_hash, entries))
+        self.tracking[tx_hash] = task
+        task.add_done_callback(lambda task: self.finish_tracking(tx_hash, task))
+
+    def finish_tracking(self, tx_hash, task):
+        self.tracking.pop(tx_hash, None)
+        if task.cancelled():
+            return
+        exc = task.exception()
+        if exc is not None:
+            # Los resultados siguen enviados; se adoptan de nuevo más tarde
+            print(f"[ERROR] Error esperando el recibo de {tx_hash}: {exc!r}")
+        elif self.wakeup is not None:
+            # Los que han vuelto a la cola pueden reenviarse ya
+            self.wakeup.set()
+
+    async def track(self, tx_hash, entries):
+        """Espera al recibo de una transacción y confirma cada resultado que llevaba."""
+        receipt = await ledger.wait_for_receipt(tx_hash, settings.BLOCKCHAIN_RECEIPT_TIMEOUT_S)
+        if receipt is None:
+            # La transacción no se ha minado: se vuelven a enviar
+            for entry in entries:
+                await retry(entry, 'sin recibo')
+            print(f"[WARNING] Sin recibo para {tx_hash}; {len(entries)} torneos vuelven a la cola")
+            return
+        if receipt['status'] != 1:
+            for entry in entries:
+                await retry(entry, 'transacción revertida')
+            print(f"[ERROR] Transacción {tx_hash} revertida; {len(entries)} torneos vuelven a la cola")
+            return
+        for entry in entries:
+            key = entry_key(entry)
+            chain_index = receipt['saved'].get(key)
+            if chain_index is None:
+                # No lo guardó esta transacción: lo guardó un envío anterior
+                # cuyo recibo se perdió
+                chain_index = await ledger.index_of(key)
+                if chain_index is None:
+                    await retry(entry, 'no está en la transacción')
+                    continue
+            await confirm(entry, receipt['block_number'], chain_index)
+        print(f"[DEBUG] {len(entries)} torneos guardados en blockchain. Tx Hash: {tx_hash}")
+
+    async def sync(self):
+        """Copia en TournamentRecord las entradas del contrato que aún no están."""
+        index = await next_chain_index()
+        count = await ledger.match_count()
+        if count == index:
+            return
+        if index and ledger.shared and (count < index or not await self.same_chain(index - 1)):
+            # Libro nuevo (Ganache arranca vacío): la copia es de otra cadena.
+            # Con el libro en memoria cada worker tiene el suyo, así que no
+            # coincidir es lo normal y borrar la copia solo haría que los
+            # workers la borrasen por turnos: se añaden las entradas que falten
+            print("[WARNING] El libro no coincide con el historial local; se vuelve a copiar")
+            await clear_records()
+            index = 0
+        first = index
+        while index < count:
+            entries = await ledger.get_matches(index, settings.BLOCKCHAIN_BATCH_SIZE)
+            if not entries:
+                break
+            await save_records(index, entries)
+            index += len(entries)
+        if index > first:
+            print(f"[DEBUG] {index - first} torneos copiados de la blockchain desde #{first}")
+
+    async def same_chain(self, chain_index):
+        """Si la última entrada copiada sigue igual en el contrato."""
+        record = await last_record()
+        entries = await ledger.get_matches(chain_index, 1)
+        return bool(entries) and from_contract(entries[0]) == {
+            field: getattr(record, field) for field in MATCH_FIELDS}
+
+
+# Instancia única por proceso
+chain_writer = ChainWriter()
@@ -1,85 +1,1142 @@
 import json
 import asyncio
-import random
+import threading
+import time
 import uuid
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db.models.signals import post_save
+from django.dispatch import receiver
 from users.models import User
 from pong.models import Game, History
+from pong import engine
+from pong.engine import FINISHED
+from pong import protocol
+from pong.fanout import fanout
+from pong.matchmaking import bucket_for, matchmaker
+from pong.ownership import ownership
+from pong.scheduler import scheduler
+from pong.bracket import MIN_PLAYERS, SIZES, Bracket
+from pong.chain import CONTRACT_FIELDS, chain_writer
+from pong.state import GameRoom, MatchRoom
+from pong.store import store
+from pong.worker import worker
 from urllib import parse
-from web3 import Web3
-
-# Configuración de Web3 para la blockchain
-ganache_url = "http://ganache:8545"  # URL de Ganache, ajusta si usas otro nodo
-web3 = Web3(Web3.HTTPProvider(ganache_url))
-
-# Verificar conexión
-if not web3.is_connected():
-    print("[ERROR] No se pudo conectar a la blockchain")
-
-# Cargar el ABI del contrato
-with open('/app/build/contracts/Tournament.json') as f:
-    contract_json = json.load(f)
-    contract_abi = contract_json['abi']
-
-# Leer la dirección del contrato desde el archivo
-with open('/app/build/contract_address.txt', 'r') as file:
-    contract_address = file.read().strip()
-contract = web3.eth.contract(address=contract_address, abi=contract_abi)
-
-# Establecer cuenta predeterminada (usamos la primera cuenta de Ganache)
-web3.eth.default_account = web3.eth.accounts[0]
 
 # Estructuras globales para Pong
-player_connections = {}  # Mapea IDs de usuario a sus conexiones (PongConsumer)
-waiting_players = []     # Lista de IDs de usuario en espera
-active_games = {}       # Mapea room_ids a datos del juego
+# La cola de espera está en Redis (pong.matchmaking) y la comparten todos los workers
+active_games = {}       # Mapea room_ids a su GameRoom (solo las que simula este worker)
 
 # Estructuras globales para torneos
-tournament_rooms = {}    # Mapea token de torneo a datos del torneo
-# Mapea IDs de usuario a sus conexiones (TournamentConsumer)
-tournament_connections = {}
-match_states = {}  # Mapea room_ids a datos del juego
+# Solo los torneos de los que este worker es propietario (pong.ownership). Son
+# la copia local de pong.store: tras modificarlos hay que llamar a store.save()
+tournament_rooms = store.tournaments    # Mapea token de torneo a datos del torneo
+match_states = store.matches  # Mapea room_ids a su MatchRoom
+round_clocks = {}  # Mapea token a (ronda en curso, perf_counter de su arranque)
+participants_cache = {}  # Mapea token a {user_id: (caducidad, info del participante)}
+# post_save lo limpia desde el hilo que guarda el usuario
+participants_lock = threading.Lock()
+# Tareas lanzadas sin esperarlas: se guarda la referencia hasta que terminan
+background_tasks = set()
+
+
+def run_in_background(coro):
+    """Lanza una tarea sin esperarla y registra su error si falla."""
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(finish_background_task)
+    return task
+
+
+def finish_background_task(task):
+    background_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        print(f"[ERROR] Error en una tarea en segundo plano: {task.exception()!r}")
 
 # Función para enviar datos a la blockchain
 
 
 async def save_tournament_to_blockchain(tournament_data):
+    """
+    Deja el resultado en la cola de pong.chain, que lo envía en segundo plano
+    sin bloquear las partidas mientras se mina la transacción.
+    """
     try:
-        # Usar los IDs de los jugadores desde los partidos en lugar de participants
-        match1_players = tournament_data['matches']['match1']['players']
-        match2_players = tournament_data['matches']['match2']['players']
-
-        blockchain_data = {
-            "player_id_1": str(match1_players[0]),  # Primer jugador de match1
-            "player_id_2": str(match1_players[1]),  # Segundo jugador de match1
-            "player_id_3": str(match2_players[0]),  # Primer jugador de match2
-            "player_id_4": str(match2_players[1]),  # Segundo jugador de match2
-            "score_match_1_2": f"{tournament_data['matches']['match1']['player1_score']}-{tournament_data['matches']['match1']['player2_score']}",
-            "score_match_3_4": f"{tournament_data['matches']['match2']['player1_score']}-{tournament_data['matches']['match2']['player2_score']}",
-            "score_match_final": f"{tournament_data['matches']['final']['player1_score']}-{tournament_data['matches']['final']['player2_score']}"
+        # El contrato guarda las semifinales (nodos 2 y 3 del cuadro) y la
+        # final; un bye se guarda como jugador 0
+        bracket = tournament_data['bracket']
+        semifinalists = [int(p) if p is not None else 0 for p in bracket.slots[4:8]]
+        blockchain_data = dict(zip(CONTRACT_FIELDS, [
+            *semifinalists, *bracket.score(2), *bracket.score(3), *bracket.score(1)]))
+
+        await chain_writer.enqueue(blockchain_data)
+    except Exception as e:
+        print(f"[ERROR] Error al poner el torneo en cola para la blockchain: {e}")
+
+
+def apply_paddle_input(room_id, player_id, player, position):
+    """Aplica un movimiento de paleta en el worker propietario de la sala."""
+    game_data = active_games.get(room_id)
+    # Hasta su primer tick la sala no está en la física (GAME_STARTS_PER_TICK)
+    if game_data is None or room_id not in scheduler.physics:
+        return
+    if player == 'player1' and player_id == game_data.player1_id:
+        scheduler.physics.set_paddle(room_id, 'left', position)
+    elif player == 'player2' and player_id == game_data.player2_id:
+        scheduler.physics.set_paddle(room_id, 'right', position)
+
+
+async def abandon_game(room_id, player_id):
+    """Termina la partida por la desconexión de un jugador (en el worker propietario)."""
+    if room_id not in active_games:
+        return
+    scheduler.unregister(room_id)
+    await fanout.group_send(
+        get_channel_layer(),
+        room_id,
+        {
+            'type': 'player_disconnected',
+            'player_id': player_id
         }
+    )
+    del active_games[room_id]
+    await ownership.release(room_id)
+    print(f"[DEBUG] Juego {room_id} terminado por desconexión")
+
+
+def user_info(user):
+    """Datos públicos de un jugador para el mensaje game_start."""
+    return {
+        'id': user.internal_id,
+        'intra_id': user.intra_id,
+        'intra_login': user.internal_login or user.intra_login,
+        'intra_picture': user.intra_picture
+    }
+
+
+@database_sync_to_async
+def create_games(pairs, room_ids):
+    """
+    Crea las partidas de un lote de parejas con un único bulk_create y una
+    única consulta de jugadores. Devuelve [(room_id, pareja, info1, info2)].
+    """
+    user_ids = {player[0] for pair in pairs for player in pair}
+    users = {user.internal_id: user
+             for user in User.objects.filter(internal_id__in=user_ids)}
+    games = []
+    for pair, room_id in zip(pairs, room_ids):
+        (player1_id, _, _), (player2_id, _, _) = pair
+        if player1_id not in users or player2_id not in users:
+            print(f"[WARNING] Pareja con usuarios inexistentes: {pair}")
+            continue
+        # bulk_create no llama a Game.save(), así que el room_id viene dado
+        game = Game(room_id=room_id,
+                    player1=users[player1_id], player2=users[player2_id])
+        games.append((game, pair))
+    Game.objects.bulk_create([game for game, _ in games])
+    return [(game.room_id, pair, user_info(game.player1), user_info(game.player2))
+            for game, pair in games]
+
+
+async def start_games(pairs):
+    """
+    Arranca en este worker las partidas de las parejas que ha sacado el
+    bucle de matchmaking. Los jugadores pueden estar conectados a cualquier
+    worker.
+    """
+    # Salas que el anillo asigna a este worker, que es quien las va a simular
+    room_ids = [ownership.local_key(Game.generate_room_id) for _ in pairs]
+    try:
+        games = await create_games(pairs, room_ids)
+    except Exception as e:
+        print(f"[ERROR] Error creando {len(pairs)} partidas: {e}")
+        for pair in pairs:
+            for player_id, channel_name, bucket in pair:
+                await matchmaker.enqueue(player_id, channel_name, bucket)
+        return
+
+    channel_layer = get_channel_layer()
+    for room_id, pair, player1_info, player2_info in games:
+        (player1_id, channel1, bucket1), (player2_id, channel2, bucket2) = pair
+        try:
+            await ownership.claim(room_id)
+            await channel_layer.group_add(room_id, channel1)
+            await channel_layer.group_add(room_id, channel2)
+
+            # La posición de bola y paletas vive en scheduler.physics
+            active_games[room_id] = GameRoom(player1_id, player2_id)
+            scheduler.register(
+                room_id, lambda event, room_id=room_id: on_game_tick(room_id, event),
+                engine.PONG, on_game_error)
+
+            for channel in (channel1, channel2):
+                await channel_layer.send(channel, {
+                    'type': 'match_found',
+                    'room_id': room_id,
+                    'owner': worker.channel_name
+                })
+            # Por la misma vía que los snapshots para que llegue antes que ellos
+            await fanout.group_send(
+                channel_layer,
+                room_id,
+                {
+                    'type': 'game_start',
+                    'room_id': room_id,
+                    'player1': player1_info,
+                    'player2': player2_info
+                }
+            )
+            print(f"[DEBUG] Partida iniciada: {room_id}")
+        except Exception as e:
+            scheduler.unregister(room_id)
+            active_games.pop(room_id, None)
+            await matchmaker.enqueue(player1_id, channel1, bucket1)
+            await matchmaker.enqueue(player2_id, channel2, bucket2)
+            print(f"[ERROR] Error en matchmaking: {e}")
 
-        # Enviar transacción al contrato
-        tx_hash = contract.functions.saveMatch(
-            blockchain_data["player_id_1"],
-            blockchain_data["player_id_2"],
-            blockchain_data["player_id_3"],
-            blockchain_data["player_id_4"],
-            blockchain_data["score_match_1_2"],
-            blockchain_data["score_match_3_4"],
-            blockchain_data["score_match_final"]
-        ).transact()
-
-        # Esperar a que la transacción sea minada
-        receipt = web3.eth.wait_for_transaction_receipt(tx_hash)
+
+def on_game_tick(room_id, event):
+    """Genera los mensajes de la sala tras el paso de física del planificador."""
+    game_data = active_games.get(room_id)
+    if game_data is None:
+        scheduler.unregister(room_id)
+        return None
+
+    # Un único snapshot por tick con bola, paletas y marcador
+    messages = [(room_id, protocol.snapshot(
+        game_data, scheduler.physics, room_id, event))]
+    if event is None:
+        return messages
+
+    score1, score2 = scheduler.physics.scores(room_id)
+    game_data.player1_score = score1
+    game_data.player2_score = score2
+    if event == FINISHED:
+        winner = 1 if score1 >= engine.PONG.win_score else 2
+        messages.append((room_id, {
+            'type': 'game_over',
+            'winner': winner,
+            'player1_id': game_data.player1_id,
+            'player2_id': game_data.player2_id,
+            'player1_score': score1,
+            'player2_score': score2
+        }))
+        scheduler.unregister(room_id)
+        del active_games[room_id]
+        run_in_background(ownership.release(room_id))
+        run_in_background(save_game_results(room_id, game_data))
+    return messages
+
+
+def on_game_error(room_id):
+    """
+    Termina sin ganador una partida cuyo tick ha fallado o cuyo proceso de
+    simulación ha caído; el planificador ya la ha quitado.
+    """
+    game_data = active_games.pop(room_id, None)
+    if game_data is None:
+        return
+    run_in_background(fanout.group_send(
+        get_channel_layer(),
+        room_id,
+        {
+            'type': 'game_over',
+            'winner': 0,
+            'player1_id': game_data.player1_id,
+            'player2_id': game_data.player2_id,
+            'player1_score': game_data.player1_score,
+            'player2_score': game_data.player2_score,
+            'message': 'La partida se ha interrumpido por un error del servidor'
+        }
+    ))
+    run_in_background(ownership.release(room_id))
+    run_in_background(save_game_results(room_id, game_data))
+    print(f"[DEBUG] Juego {room_id} descartado tras un error")
+
+
+@database_sync_to_async
+def save_game_results(room_id, game_data):
+    """Guarda los resultados de la partida en los modelos Game y History."""
+    game = Game.objects.filter(room_id=room_id).first()
+    if game:
+        game.player1_score = game_data.player1_score
+        game.player2_score = game_data.player2_score
+        game.is_active = False
+        game.save()
+        print(f"[DEBUG] Resultados guardados para {room_id} en Game")
+
+        # Determinar el ganador
+        winner = None
+        if game_data.player1_score >= engine.PONG.win_score:
+            winner = User.objects.get(internal_id=game_data.player1_id)
+        elif game_data.player2_score >= engine.PONG.win_score:
+            winner = User.objects.get(internal_id=game_data.player2_id)
+
+        # Guardar en el modelo History
+        History.objects.create(
+            room_id=room_id,
+            player1=User.objects.get(internal_id=game_data.player1_id),
+            player2=User.objects.get(internal_id=game_data.player2_id),
+            player1_score=game_data.player1_score,
+            player2_score=game_data.player2_score,
+            winner=winner
+        )
+        print(f"[DEBUG] Historial guardado para {room_id} en History")
+
+
+async def on_paddle_input(message):
+    apply_paddle_input(message['room_id'], message['player_id'],
+                       message['player'], message['paddle_position'])
+
+
+async def on_player_left(message):
+    await abandon_game(message['room_id'], message['player_id'])
+
+
+# Mensajes de jugadores conectados a otros workers
+worker.on('paddle_input', on_paddle_input)
+worker.on('player_left', on_player_left)
+
+
+# Torneos: el estado de un torneo y el de sus partidos vive en el worker
+# propietario de su token (pong.ownership). Las conexiones que caen en otro
+# worker le reenvían sus acciones y reciben las respuestas por el channel layer.
+
+
+def match_token(match_id):
+    """Token del torneo al que pertenece un partido ('<token>-<partido>')."""
+    return match_id.split('-')[0]
+
+
+def match_group(match_id):
+    return f"match_{match_id}"
+
+
+async def send_to_channel(channel_name, payload):
+    """Envía un mensaje a una conexión de torneo, esté en el worker que esté."""
+    await get_channel_layer().send(channel_name, {'type': 'relay', 'payload': payload})
+
+
+async def send_to_player(tournament_data, player_id, payload):
+    channel_name = tournament_data['channels'].get(player_id)
+    if channel_name:
+        await send_to_channel(channel_name, payload)
+
+
+async def join_tournament_group(token, channel_name):
+    channel_layer = get_channel_layer()
+    await channel_layer.group_add(token, channel_name)
+    await channel_layer.send(channel_name, {'type': 'tournament_joined', 'token': token})
+
+
+def participant_info(user):
+    return {
+        'id': user.internal_id,
+        'intra_login': user.internal_login or user.intra_login,
+        'intra_picture': user.intra_picture,
+        'games_won': user.games_won,
+        'total_points': user.total_points
+    }
+
+
+@database_sync_to_async
+def fetch_participants_info(participant_ids):
+    """Info de varios participantes con una sola consulta."""
+    users = User.objects.filter(internal_id__in=participant_ids)
+    info = {user.internal_id: participant_info(user) for user in users}
+    for user_id in participant_ids:
+        info.setdefault(user_id, {
+            'id': user_id,
+            'intra_login': f'User {user_id}',
+            'intra_picture': None,
+            'games_won': 0,
+            'total_points': 0
+        })
+    return info
+
+
+async def get_participants_info(token, participant_ids):
+    """
+    Info de los participantes de un torneo. Se guarda por torneo, así que
+    solo se consulta la base de datos por los que aún no se han pedido o
+    llevan más de USER_CACHE_TTL_S en caché (los cambios guardados en otro
+    worker no llegan a invalidate_participant_info).
+    """
+    now = time.monotonic()
+    with participants_lock:
+        cache = participants_cache.setdefault(token, {})
+        info = {user_id: entry for user_id, (expires, entry) in cache.items() if expires > now}
+    missing = [user_id for user_id in participant_ids if user_id not in info]
+    if missing:
+        fetched = await fetch_participants_info(missing)
+        expires = now + settings.USER_CACHE_TTL_S
+        with participants_lock:
+            cache.update({user_id: (expires, entry) for user_id, entry in fetched.items()})
+        info.update(fetched)
+    return [info[user_id] for user_id in participant_ids]
+
+
+@receiver(post_save, sender=User)
+def invalidate_participant_info(sender, instance, **kwargs):
+    # Se ejecuta en el hilo que guarda el usuario (perfil o estadísticas)
+    with participants_lock:
+        for cache in participants_cache.values():
+            cache.pop(instance.internal_id, None)
+
+
+async def send_tournament_info(token):
+    tournament_data = tournament_rooms.get(token)
+    if tournament_data is None:
+        return
+    participants_info = await get_participants_info(token, tournament_data['participants'])
+    print(
+        f"[DEBUG] Enviando actualización al grupo - Token: {token}, Creator ID: {tournament_data['creator']}")
+    await get_channel_layer().group_send(
+        token,
+        {
+            'type': 'tournament_info',
+            'token': token,
+            'participants': participants_info,
+            'max_players': tournament_data['max_players'],
+            'status': tournament_data['status'],
+            'creator': tournament_data['creator'],
+        }
+    )
+
+
+async def send_tournament_results(token, tournament_data, winner_id):
+    """Envía al grupo del torneo el cuadro completo con `winner_id` como campeón."""
+    bracket = tournament_data['bracket']
+    players = [player for player in bracket.slots[bracket.size:] if player is not None]
+    info = {participant['id']: participant
+            for participant in await get_participants_info(token, players)}
+    rounds = []
+    for round_number in range(1, bracket.rounds + 1):
+        matches = []
+        for node in bracket.nodes(round_number):
+            if bracket.is_bye(node):
+                continue
+            matches.append({
+                'match_id': f"{token}-m{node}",
+                'players': [info[p] for p in bracket.players(node) if p is not None],
+                'winner': info.get(bracket.winner(node)),
+                'score': list(bracket.score(node))
+            })
+        rounds.append(matches)
+    results = {
+        'participants': await get_participants_info(token, tournament_data['participants']),
+        'rounds': rounds,
+        'final': rounds[-1][0],
+        'winner': info.get(winner_id)
+    }
+    await get_channel_layer().group_send(
+        token,
+        {
+            'type': 'tournament_results',
+            'results': results
+        }
+    )
+
+
+def match_node(match_id):
+    """Nodo del cuadro de un partido ('<token>-m<nodo>'), o None si no lo es."""
+    key = match_id.split('-')[-1]
+    if key[:1] != 'm' or not key[1:].isdigit():
+        return None
+    return int(key[1:])
+
+
+def walkover_score(bracket, node, winner_id):
+    """Marcador de un partido ganado sin jugar (5-0 para `winner_id`)."""
+    player1, _ = bracket.players(node)
+    win_score = engine.TOURNAMENT.win_score
+    return (win_score, 0) if winner_id == player1 else (0, win_score)
+
+
+def report_round(token, round_number, rounds):
+    """Muestra cuánto ha durado una ronda desde que se arrancaron sus partidos."""
+    clock = round_clocks.get(token)
+    if clock is None or clock[0] != round_number:
+        return
+    del round_clocks[token]
+    elapsed = time.perf_counter() - clock[1]
+    print(f"[DEBUG] Ronda {round_number}/{rounds} de {token} completada en {elapsed:.1f} s")
+
+
+async def delete_tournament(token):
+    del tournament_rooms[token]
+    round_clocks.pop(token, None)
+    with participants_lock:
+        participants_cache.pop(token, None)
+    store.save(token)
+    await ownership.release(token)
+    print(f"[DEBUG] Torneo {token} eliminado por falta de participantes")
+
+
+async def on_tournament_create(message):
+    token = message['token']
+    user_id = message['user_id']
+    max_players = message.get('max_players')
+    if max_players not in SIZES:
+        max_players = SIZES[0]
+    tournament_rooms[token] = {
+        'creator': user_id,
+        'participants': [user_id],
+        'channels': {user_id: message['channel']},  # Conexión de cada participante
+        'max_players': max_players,
+        'status': 'waiting',
+        'channel_group': token,
+        'round': 0,         # Última ronda iniciada
+        'bracket': None,    # pong.bracket.Bracket desde que empieza
+    }
+    store.save(token)
+    await ownership.claim(token)
+    print(f"[DEBUG] Torneo creado por {user_id}: {token}")
+    await join_tournament_group(token, message['channel'])
+    await send_tournament_info(token)
+
+
+async def on_tournament_join(message):
+    token = message['token']
+    user_id = message['user_id']
+    channel_name = message['channel']
+
+    tournament_data = await store.load(token)
+    if tournament_data is None:
+        await send_to_channel(channel_name, {
+            'type': 'error',
+            'message': 'Token de torneo inválido'
+        })
+        return
+
+    print(
+        f"[DEBUG] Intento de unión - User ID: {user_id}, Tournament: {token}, Current Participants: {tournament_data['participants']}")
+
+    if user_id in tournament_data['participants'] and tournament_data['status'] != 'waiting':
+        # Vuelve tras perder su conexión sin desconectarse (reinicio del worker)
+        tournament_data['channels'][user_id] = channel_name
+        store.save(token)
+        await join_tournament_group(token, channel_name)
+        print(f"[DEBUG] {user_id} ha vuelto al torneo {token}")
+        await send_tournament_info(token)
+        return
+
+    if tournament_data['status'] != 'waiting':
+        await send_to_channel(channel_name, {
+            'type': 'error',
+            'message': 'El torneo ya ha comenzado o ha terminado'
+        })
+        return
+
+    if len(tournament_data['participants']) >= tournament_data['max_players']:
+        await send_to_channel(channel_name, {
+            'type': 'error',
+            'message': 'El torneo está lleno'
+        })
+        return
+
+    if user_id in tournament_data['participants']:
         print(
-            f"[DEBUG] Torneo guardado en blockchain. Tx Hash: {tx_hash.hex()}")
-        return receipt
-    except Exception as e:
-        print(f"[ERROR] Error al guardar en blockchain: {e}")
+            f"[DEBUG] Error: Usuario {user_id} ya está en participants: {tournament_data['participants']}")
+        await send_to_channel(channel_name, {
+            'type': 'error',
+            'message': 'Ya estás en este torneo'
+        })
+        return
+
+    tournament_data['participants'].append(user_id)
+    tournament_data['channels'][user_id] = channel_name
+    store.save(token)
+    await join_tournament_group(token, channel_name)
+    print(
+        f"[DEBUG] {user_id} se unió al torneo {token}, New Participants: {tournament_data['participants']}")
+    await send_tournament_info(token)
+
+
+async def on_tournament_leave(message):
+    """El jugador deja un torneo para crear o unirse a otro."""
+    token = message['token']
+    user_id = message['user_id']
+    await get_channel_layer().group_discard(token, message['channel'])
+    tournament_data = await store.load(token)
+    if tournament_data is None or user_id not in tournament_data['participants']:
+        return
+
+    tournament_data['participants'].remove(user_id)
+    tournament_data['channels'].pop(user_id, None)
+    print(f"[DEBUG] {user_id} ha salido del torneo {token}")
+
+    if tournament_data['creator'] == user_id and tournament_data['participants']:
+        tournament_data['creator'] = tournament_data['participants'][0]
+        print(
+            f"[DEBUG] Nuevo creador del torneo {token}: {tournament_data['creator']}")
+    store.save(token)
+
+    await send_tournament_info(token)
+
+    if not tournament_data['participants']:
+        await delete_tournament(token)
+
+
+async def on_tournament_start(message):
+    token = message['token']
+    user_id = message['user_id']
+    channel_name = message['channel']
+
+    tournament_data = await store.load(token)
+    if tournament_data is None:
+        await send_to_channel(channel_name, {
+            'type': 'error',
+            'message': 'El torneo no existe'
+        })
+        return
+
+    if user_id != tournament_data['creator']:
+        await send_to_channel(channel_name, {
+            'type': 'error',
+            'message': 'Solo el creador puede iniciar el torneo'
+        })
+        return
+
+    if len(tournament_data['participants']) < MIN_PLAYERS:
+        await send_to_channel(channel_name, {
+            'type': 'error',
+            'message': f'Se necesitan al menos {MIN_PLAYERS} jugadores para iniciar el torneo'
+        })
+        return
+
+    print(f"[DEBUG] Iniciando torneo {token} por {user_id}")
+    tournament_data['status'] = 'in_progress'
+    # Los huecos hasta el tamaño del cuadro son byes
+    bracket = Bracket.seed(tournament_data['participants'])
+    tournament_data['bracket'] = bracket
+    store.save(token)
+    print(
+        f"[DEBUG] Cuadro de {bracket.size} para {len(bracket.leaves)} jugadores, {bracket.rounds} rondas")
+    await send_tournament_info(token)
+    await start_round(token, tournament_data, 1)
+
+
+async def on_tournament_disconnect(message):
+    token = message['token']
+    user_id = message['user_id']
+    channel_layer = get_channel_layer()
+    tournament_data = await store.load(token)
+    if tournament_data is None:
+        return
+
+    tournament_data['channels'].pop(user_id, None)
+    store.save(token)
+    if user_id in tournament_data['participants']:
+        tournament_data['participants'].remove(user_id)
+        print(
+            f"[DEBUG] {user_id} ha salido del torneo {token}, Participants: {tournament_data['participants']}")
+
+        if tournament_data['creator'] == user_id and tournament_data['participants']:
+            tournament_data['creator'] = tournament_data['participants'][0]
+            print(
+                f"[DEBUG] Nuevo creador del torneo {token}: {tournament_data['creator']}")
+
+        if tournament_data['status'] == 'in_progress':
+            await handle_tournament_disconnect(token, tournament_data, user_id)
+        elif tournament_data['status'] == 'waiting':
+            await send_tournament_info(token)
+
+        if not tournament_data['participants']:
+            await delete_tournament(token)
+    await channel_layer.group_discard(token, message['channel'])
+
+
+async def handle_tournament_disconnect(token, tournament_data, user_id):
+    """Maneja la desconexión de un jugador en un torneo en curso."""
+    bracket = tournament_data['bracket']
+    node = bracket.current_match(user_id)
+    if node is None or not bracket.is_ready(node):
+        # Sin partido pendiente, o su rival aún no se conoce: si no ha vuelto
+        # cuando empiece esa ronda, start_round() le da el partido por perdido
+        print(
+            f"[DEBUG] No se encontró match activo para {user_id} en {token}")
+        return
+
+    match_id = f"{token}-m{node}"
+    opponent_id = bracket.opponent(node, user_id)
+
+    # Si la partida está en curso (estado existe en match_states)
+    if match_id in match_states:
+        state = match_states[match_id]
+        state.running = False
+        scheduler.unregister(match_id)
+
+        # Asegurar que todos los IDs sean strings
+        winner_id = str(opponent_id)
+        state_player1_id = str(state.player1_id)
+        state_player2_id = str(state.player2_id)
+
+        # Asignar victoria al oponente con 5-0
+        state.player1_score = engine.TOURNAMENT.win_score if state_player1_id == winner_id else 0
+        state.player2_score = engine.TOURNAMENT.win_score if state_player2_id == winner_id else 0
+
+        winner = 1 if state_player1_id == winner_id else 2
+        print(
+            f"[DEBUG] Asignando ganador - Desconectado: {user_id}, Winner_id: {winner_id}, Player1_id: {state_player1_id}, Player2_id: {state_player2_id}, Winner: {winner}")
+
+        await get_channel_layer().group_send(
+            match_group(match_id),
+            {
+                'type': 'game_over',
+                'winner': winner,
+                'player1_id': state_player1_id,
+                'player2_id': state_player2_id,
+                'player1_score': state.player1_score,
+                'player2_score': state.player2_score,
+                'message': 'El oponente se ha desconectado. ¡Has ganado!'
+            }
+        )
+        await record_match_result(
+            match_id, int(winner_id), state.player1_score, state.player2_score)
+        # No eliminamos match_states[match_id] aquí; lo hace on_match_leave
+
+    # Si la partida aún no ha comenzado
+    else:
+        score1, score2 = walkover_score(bracket, node, opponent_id)
+        print(
+            f"[DEBUG] {match_id} marcado como perdido por desconexión. Ganador: {opponent_id}")
+        await record_match_result(match_id, opponent_id, score1, score2)
+
+
+async def record_match_result(match_id, winner_id, player1_score, player2_score):
+    """Anota el resultado de un partido y hace avanzar el torneo."""
+    token = match_token(match_id)
+    tournament_data = await store.load(token)
+    if tournament_data is None or tournament_data['bracket'] is None:
+        return
+    bracket = tournament_data['bracket']
+    node = match_node(match_id)
+    if node is None or not 1 <= node < bracket.size:
+        print(f"[DEBUG] Match {match_id} no encontrado en torneo {token}")
+        return
+    if not bracket.record(node, winner_id, player1_score, player2_score):
+        return
+    store.save(token)
+    print(
+        f"[DEBUG] Ganador de {match_id}: {winner_id}, Puntuación: {player1_score}-{player2_score}")
+    round_number = bracket.round_of(node)
+    if bracket.round_finished(round_number):
+        report_round(token, round_number, bracket.rounds)
+
+    if node == 1:
+        tournament_data['status'] = 'finished'
+        await send_tournament_results(token, tournament_data, winner_id)
+        with participants_lock:
+            participants_cache.pop(token, None)
+        print(f"[DEBUG] Torneo {token} finalizado. Resultados enviados.")
+
+        # Enviar los resultados a la blockchain
+        await save_tournament_to_blockchain(tournament_data)
+
+    elif bracket.round_finished(round_number) and tournament_data['status'] == 'in_progress':
+        # La cuenta atrás de la ronda no debe bloquear los mensajes del worker
+        run_in_background(start_round(token, tournament_data, round_number + 1))
+
+
+async def resolve_absences(token, tournament_data, round_number):
+    """
+    Da por perdidos los partidos de la ronda cuyos jugadores no están
+    conectados. Devuelve False si con ello el torneo ha terminado.
+    """
+    bracket = tournament_data['bracket']
+    connected = tournament_data['channels']
+    for node in bracket.nodes(round_number):
+        if not bracket.is_ready(node):
+            continue
+        players = bracket.players(node)
+        missing = [p for p in players if p not in connected]
+        if not missing:
+            continue
+        if len(missing) == 2 and node == 1:
+            print(
+                f"[DEBUG] Ambos finalistas desconectados, torneo {token} cancelado")
+            tournament_data['status'] = 'finished'
+            store.save(token)
+            break
+        # Si faltan los dos pasa el primero, que tampoco jugará la siguiente
+        winner_id = players[1] if missing == [players[0]] else players[0]
+        print(
+            f"[DEBUG] {missing} desconectados antes de {token}-m{node}. Ganador: {winner_id}")
+        await record_match_result(
+            f"{token}-m{node}", winner_id, *walkover_score(bracket, node, winner_id))
+    return tournament_data['status'] != 'finished'
+
+
+async def start_round(token, tournament_data, round_number, resume=False):
+    """
+    Arranca a la vez todos los partidos de una ronda. A partir de la segunda
+    hay una cuenta atrás, y quien no esté conectado pierde su partido sin
+    jugarlo. La física de los partidos no empieza toda en el mismo tick: el
+    planificador admite como mucho GAME_STARTS_PER_TICK salas nuevas por tick.
+    Con `resume` vuelve a lanzar la ronda en curso (ver resume_tournament).
+    """
+    if tournament_data['round'] >= round_number and not resume:
+        return
+    tournament_data['round'] = round_number
+    store.save(token)
+    bracket = tournament_data['bracket']
+    connected = tournament_data['channels']
+    is_final = round_number == bracket.rounds
+
+    def pending():
+        return [(node, player_id) for node in bracket.nodes(round_number)
+                if bracket.is_ready(node) for player_id in bracket.players(node)]
+
+    if round_number > 1:
+        await asyncio.sleep(3)
+
+        # Verificar conexiones antes del countdown
+        if not await resolve_absences(token, tournament_data, round_number):
+            return
+        await asyncio.gather(*[
+            send_to_player(tournament_data, player_id, {
+                'type': 'prepare_for_final',
+                'final_match_id': f"{token}-m{node}",
+                'final': is_final
+            })
+            for node, player_id in pending()
+        ])
+        await asyncio.sleep(1)
+
+        for i in range(5, 0, -1):
+            if not await resolve_absences(token, tournament_data, round_number):
+                return
+            await asyncio.gather(*[
+                send_to_player(tournament_data, player_id, {
+                    'type': 'countdown_to_final',
+                    'seconds': i,
+                    'final_match_id': f"{token}-m{node}",
+                    'final': is_final
+                })
+                for node, player_id in pending() if player_id in connected
+            ])
+            await asyncio.sleep(1)
+
+    matches = pending()
+    started = time.perf_counter()
+    round_clocks[token] = (round_number, started)
+    await asyncio.gather(*[
+        send_to_player(tournament_data, player_id, {
+            'type': 'start_tournament',
+            'match_id': f"{token}-m{node}",
+            'opponent_id': bracket.opponent(node, player_id),
+            'user_id': player_id
+        })
+        for node, player_id in matches
+    ])
+    launch_ms = (time.perf_counter() - started) * 1000
+    print(
+        f"[DEBUG] Ronda {round_number}/{bracket.rounds} de {token} iniciada: "
+        f"{len(matches) // 2} partidos en {launch_ms:.1f} ms")
+    # Una ronda de solo byes (o de ausentes) ya está decidida
+    if bracket.round_finished(round_number) and tournament_data['status'] == 'in_progress':
+        report_round(token, round_number, bracket.rounds)
+        # Tampoco aquí: quien llama puede ser el bucle de mensajes del worker
+        run_in_background(start_round(token, tournament_data, round_number + 1))
+
+
+def resume_tournament(token, tournament_data):
+    """
+    Retoma un torneo recuperado de Redis cuyo propietario anterior cayó entre
+    el final de una ronda y el arranque de la siguiente: la ronda guardada
+    no tiene ningún partido empezado y nadie más la va a lanzar.
+    """
+    bracket = tournament_data['bracket']
+    if tournament_data['status'] != 'in_progress' or bracket is None:
+        return
+    round_number = tournament_data['round']
+    if round_number == 0:
+        run_in_background(start_round(token, tournament_data, 1))
+        return
+    if bracket.round_finished(round_number):
+        if round_number < bracket.rounds:
+            run_in_background(start_round(token, tournament_data, round_number + 1))
+        return
+    pending = [node for node in bracket.nodes(round_number) if bracket.is_ready(node)]
+    if any(f"{token}-m{node}" in match_states for node in pending):
+        return
+    print(f"[DEBUG] Ronda {round_number} de {token} sin partidos empezados; se vuelve a lanzar")
+    run_in_background(start_round(token, tournament_data, round_number, resume=True))
+
+
+store.on_restore(resume_tournament)
+
+
+async def authorize_match(match_id, user_id):
+    """
+    Comprueba que el usuario juega este partido y que aún no se ha decidido,
+    y crea su estado si aún no existe. Se ejecuta en el propietario del torneo.
+    """
+    token = match_token(match_id)
+    tournament_data = await store.load(token)
+    bracket = tournament_data and tournament_data['bracket']
+    node = match_node(match_id)
+    if not bracket or node is None or not 1 <= node < bracket.size or not bracket.is_ready(node):
+        print(f"[DEBUG] {match_id} no existe o ya se ha jugado")
+        return False
+    expected_players = bracket.players(node)
+    user_id_str = str(user_id)
+    if user_id_str not in [str(p) for p in expected_players]:
+        print(
+            f"[DEBUG] {user_id_str} no autorizado para {match_id}. Expected: {expected_players}")
+        return False
+
+    # Inicializar estado del juego si no existe
+    if match_id not in match_states:
+        player1_id = str(expected_players[0])
+        player2_id = str(expected_players[1])
+        # La posición de bola y paletas vive en scheduler.physics
+        match_states[match_id] = MatchRoom(player1_id, player2_id)
+        store.save(token)
+    return True
+
+
+@database_sync_to_async
+def get_player_info(user_id):
+    try:
+        user = User.objects.get(internal_id=user_id)
+        return {
+            'id': user.internal_id,
+            'intra_id': user.intra_id,
+            'intra_login': user.internal_login or user.intra_login,
+            'intra_picture': user.intra_picture,
+            'user_id': user.internal_id  # Asegúrate de incluir user_id
+        }
+    except User.DoesNotExist:
+        return {'id': user_id, 'intra_login': f'Usuario {user_id}', 'intra_picture': None, 'user_id': user_id}
+
+
+async def on_match_connect(message):
+    """Autoriza una conexión de partido que ha caído en otro worker."""
+    channel_layer = get_channel_layer()
+    match_id = message['match_id']
+    if not await authorize_match(match_id, message['user_id']):
+        await channel_layer.send(message['channel'], {'type': 'match_rejected'})
+        return
+    # El grupo se añade aquí para que el game_start no pueda adelantarse
+    await channel_layer.group_add(match_group(match_id), message['channel'])
+    await channel_layer.send(message['channel'], {'type': 'match_accepted'})
+
+
+async def on_match_join(message):
+    match_id = message['match_id']
+    user_id_str = message['user_id']
+    await store.load(match_token(match_id))
+    state = match_states.get(match_id)
+    if not state:
+        print(f"[DEBUG] No hay estado para {match_id}")
+        return
+    if user_id_str not in (state.player1_id, state.player2_id):
+        print(f"[WARNING] {user_id_str} no juega {match_id}; join ignorado")
+        return
+
+    if user_id_str not in state.players:
+        player_number = 1 if user_id_str == state.player1_id else 2
+        state.players[user_id_str] = player_number
+        state.ready += 1
+        print(
+            f"[DEBUG] {user_id_str} se unió como player{player_number}, Ready: {state.ready}")
+
+        if state.ready == 2 and not state.running:
+            state.running = True
+            player1_info = await get_player_info(state.player1_id)
+            player2_info = await get_player_info(state.player2_id)
+            # Por la misma vía que los snapshots para que llegue antes que ellos
+            await fanout.group_send(
+                get_channel_layer(),
+                match_group(match_id),
+                {
+                    'type': 'game_start',
+                    'room_id': match_id,
+                    'player1': player1_info,
+                    'player2': player2_info
+                }
+            )
+            scheduler.register(
+                match_id, lambda event: on_match_tick(match_id, event),
+                engine.TOURNAMENT, on_match_error)
+            print(f"[DEBUG] Partida {match_id} iniciada")
+
+
+async def on_match_input(message):
+    match_id = message['match_id']
+    user_id_str = message['user_id']
+    state = match_states.get(match_id)
+    if not state or match_id not in scheduler.physics:
+        return
+    if user_id_str not in (state.player1_id, state.player2_id):
+        return
+    direction = message.get('direction')
+    paddle_step = engine.TOURNAMENT.paddle_step
+    is_player1 = user_id_str == state.player1_id
+    side = 'left' if is_player1 else 'right'
+    position = scheduler.physics.paddle(match_id, side)
+
+    if direction == 'up':
+        position = max(0, position - paddle_step)
+    elif direction == 'down':
+        position = min(1, position + paddle_step)
+
+    # El snapshot confirma el último input procesado para que el
+    # cliente reconcilie su predicción
+    input_seq = message.get('seq')
+    if isinstance(input_seq, int):
+        if is_player1:
+            state.player1_input = input_seq & 0xffffffff
+        else:
+            state.player2_input = input_seq & 0xffffffff
+    # La nueva posición sale en el siguiente snapshot del planificador
+    scheduler.physics.set_paddle(match_id, side, position)
+
+    print(
+        f"[DEBUG] Moviendo paleta {side} de {user_id_str} a {position}")
+
+
+async def on_match_leave(message):
+    match_id = message['match_id']
+    user_id_str = message['user_id']
+    await store.load(match_token(match_id))
+    state = match_states.get(match_id)
+    if state is None or user_id_str not in state.players:
+        return
+
+    del state.players[user_id_str]
+    state.ready -= 1
+
+    if state.running:
+        # Partida en curso: dar victoria al oponente con 5-0
+        state.running = False
+        scheduler.unregister(match_id)
+
+        winner_id = state.player1_id if user_id_str == state.player2_id else state.player2_id
+        state.player1_score = engine.TOURNAMENT.win_score if state.player1_id == winner_id else 0
+        state.player2_score = engine.TOURNAMENT.win_score if state.player2_id == winner_id else 0
+
+        await get_channel_layer().group_send(
+            match_group(match_id),
+            {
+                'type': 'game_over',
+                'winner': 1 if state.player1_id == winner_id else 2,
+                'player1_id': state.player1_id,
+                'player2_id': state.player2_id,
+                'player1_score': state.player1_score,
+                'player2_score': state.player2_score,
+                'message': 'El oponente se ha desconectado. ¡Has ganado!'
+            }
+        )
+        await record_match_result(
+            match_id, int(winner_id), state.player1_score, state.player2_score)
+        del match_states[match_id]
+        store.save(match_token(match_id))
+        print(
+            f"[DEBUG] {match_id} terminado por desconexión. Ganador: {winner_id}")
+    elif state.ready == 0:
+        del match_states[match_id]
+        store.save(match_token(match_id))
+        print(
+            f"[DEBUG] Estado de {match_id} eliminado por desconexión total")
+
+
+def on_match_tick(match_id, event):
+    """Genera los mensajes del partido tras el paso de física del planificador."""
+    state = match_states.get(match_id)
+    if state is None or not state.running:
+        scheduler.unregister(match_id)
         return None
 
+    # Un único snapshot por tick con bola, paletas y marcador
+    group = match_group(match_id)
+    messages = [(group, protocol.snapshot(
+        state, scheduler.physics, match_id, event))]
+    if event is None:
+        return messages
+
+    score1, score2 = scheduler.physics.scores(match_id)
+    state.player1_score = score1
+    state.player2_score = score2
+    store.save(match_token(match_id))
+
+    # Finalizar partida si alguien llega a 5 puntos
+    if event == FINISHED:
+        winner = 1 if score1 >= engine.TOURNAMENT.win_score else 2
+        winner_id = state.player1_id if winner == 1 else state.player2_id
+        messages.append((group, {
+            'type': 'game_over',
+            'winner': winner,
+            'player1_id': state.player1_id,
+            'player2_id': state.player2_id,
+            'player1_score': score1,
+            'player2_score': score2
+        }))
+        state.running = False
+        scheduler.unregister(match_id)
+        del match_states[match_id]
+        run_in_background(record_match_result(
+            match_id, int(winner_id), score1, score2))
+        run_in_background(save_match_results(match_id, state))
+    return messages
+
+
+def on_match_error(match_id):
+    """
+    Descarta el estado de un partido cuyo tick ha fallado o cuyo proceso de
+    simulación ha caído y avisa a los jugadores: el partido sigue pendiente
+    en el cuadro y empieza de nuevo cuando vuelven a entrar.
+    """
+    state = match_states.pop(match_id, None)
+    if state is None:
+        return
+    store.save(match_token(match_id))
+    run_in_background(fanout.group_send(
+        get_channel_layer(),
+        match_group(match_id),
+        {
+            'type': 'game_over',
+            'winner': 0,
+            'player1_id': state.player1_id,
+            'player2_id': state.player2_id,
+            'player1_score': state.player1_score,
+            'player2_score': state.player2_score,
+            'message': 'El partido se ha interrumpido por un error del servidor. '
+                       'Vuelve a entrar para jugarlo de nuevo'
+        }
+    ))
+    print(f"[DEBUG] Partido {match_id} descartado tras un error")
+
+
+@database_sync_to_async
+def save_match_results(match_id, state):
+    game = Game.objects.filter(room_id=match_id).first()
+    if not game:
+        player1 = User.objects.get(internal_id=state.player1_id)
+        player2 = User.objects.get(internal_id=state.player2_id)
+        game = Game(player1=player1, player2=player2, room_id=match_id)
+    game.player1_score = state.player1_score
+    game.player2_score = state.player2_score
+    game.is_active = False
+    game.save()
+    print(f"[DEBUG] Resultados guardados para {match_id}")
+
+
+# Acciones de torneo que llegan de conexiones en otros workers
+worker.on('tournament_create', on_tournament_create)
+worker.on('tournament_join', on_tournament_join)
+worker.on('tournament_leave', on_tournament_leave)
+worker.on('tournament_start', on_tournament_start)
+worker.on('tournament_disconnect', on_tournament_disconnect)
+worker.on('match_connect', on_match_connect)
+worker.on('match_join', on_match_join)
+worker.on('match_input', on_match_input)
+worker.on('match_leave', on_match_leave)
+
 
 class PongConsumer(AsyncWebsocketConsumer):
     async def connect(self):
@@ -100,16 +1157,28 @@ class PongConsumer(AsyncWebsocketConsumer):
             await self.close(code=4002)
             return
 
-        await self.accept()
+        # Frames binarios si el cliente los pide; si no, JSON
+        self.binary = protocol.SUBPROTOCOL in self.scope.get('subprotocols', [])
+        self.stream = protocol.SnapshotStream(self.binary)
+        await self.accept(protocol.SUBPROTOCOL if self.binary else None)
         self.room_id = None
+        self.owner_channel = None  # Canal del worker que simula la partida
         self.session_id = f"session_{id(self)}"
-        player_connections[self.user.internal_id] = self
+        await ownership.start()
+        matchmaker.start(start_games)
         print(f"[DEBUG] Conexión registrada para {self.user.internal_id}")
 
-        if self.user.internal_id not in waiting_players:
-            waiting_players.append(self.user.internal_id)
+        # Medir la latencia antes de entrar en cola; se encola al recibir el 'pong'
+        self.bucket = None
+        self.ping_sent = time.monotonic()
+        await self.send(text_data=json.dumps({'type': 'ping'}))
+
+    async def join_queue(self, rtt_ms):
+        """Pone al jugador en el bucket de su nivel y latencia."""
+        self.bucket = bucket_for(self.user.games_won, rtt_ms)
+        if await matchmaker.enqueue(self.user.internal_id, self.channel_name, self.bucket):
             print(
-                f"[DEBUG] Jugador {self.user.internal_id} añadido a la cola: {waiting_players}")
+                f"[DEBUG] Jugador {self.user.internal_id} añadido a la cola ({self.bucket}, {rtt_ms:.0f} ms)")
             await self.send(text_data=json.dumps({
                 'type': 'waiting',
                 'message': 'Esperando a otro jugador...'
@@ -121,8 +1190,6 @@ class PongConsumer(AsyncWebsocketConsumer):
                 'message': 'Ya estás en cola, esperando a otro jugador...'
             }))
 
-        await self.check_matchmaking()
-
     async def disconnect(self, close_code):
         """Maneja la desconexión de un jugador de Pong."""
         if not hasattr(self, 'user'):
@@ -132,52 +1199,48 @@ class PongConsumer(AsyncWebsocketConsumer):
 
         print(
             f"[DEBUG] Desconexión de {self.user.internal_id}. Código: {close_code}")
-        if self.user.internal_id in player_connections:
-            del player_connections[self.user.internal_id]
-
-        if self.user.internal_id in waiting_players:
-            waiting_players.remove(self.user.internal_id)
-            print(f"[DEBUG] {self.user.internal_id} eliminado de la cola")
-
-        if self.room_id and self.room_id in active_games:
-            if 'ball_task' in active_games[self.room_id]:
-                active_games[self.room_id]['ball_task'].cancel()
-            await self.channel_layer.group_discard(self.room_id, self.channel_name)
-            await self.channel_layer.group_send(
-                self.room_id,
-                {
-                    'type': 'player_disconnected',
-                    'player_id': self.user.internal_id
-                }
-            )
+        await matchmaker.leave(self.user.internal_id, self.channel_name)
+
+        if self.room_id:
+            await fanout.group_discard(self.room_id, self)
             if self.room_id in active_games:
-                del active_games[self.room_id]
-                print(
-                    f"[DEBUG] Juego {self.room_id} terminado por desconexión")
+                await abandon_game(self.room_id, self.user.internal_id)
+            elif self.owner_channel:
+                await worker.send(self.owner_channel, {
+                    'type': 'player_left',
+                    'room_id': self.room_id,
+                    'player_id': self.user.internal_id
+                })
 
     async def receive(self, text_data):
         """Maneja mensajes recibidos del frontend para Pong."""
         data = json.loads(text_data)
         action = data.get('action')
 
-        if action == 'move_paddle':
-            if not self.room_id or self.room_id not in active_games:
+        if action == 'ack':
+            self.stream.ack(data.get('seq'))
+
+        elif action == 'pong':
+            if self.bucket is None and not self.room_id:
+                await self.join_queue((time.monotonic() - self.ping_sent) * 1000)
+
+        elif action == 'move_paddle':
+            if not self.room_id:
                 print(
                     f"[WARNING] Intento de mover paleta sin sala activa: {data}")
                 return
-            game_data = active_games[self.room_id]
-            if data['player'] == 'player1' and self.user.internal_id == game_data['player1_id']:
-                game_data['left_paddle'] = data['paddle_position']
-            elif data['player'] == 'player2' and self.user.internal_id == game_data['player2_id']:
-                game_data['right_paddle'] = data['paddle_position']
-            await self.channel_layer.group_send(
-                self.room_id,
-                {
-                    'type': 'update_paddle',
+            # La nueva posición sale en el siguiente snapshot del planificador
+            if self.room_id in active_games:
+                apply_paddle_input(self.room_id, self.user.internal_id,
+                                   data['player'], data['paddle_position'])
+            elif self.owner_channel:
+                await worker.send(self.owner_channel, {
+                    'type': 'paddle_input',
+                    'room_id': self.room_id,
+                    'player_id': self.user.internal_id,
                     'player': data['player'],
                     'paddle_position': data['paddle_position']
-                }
-            )
+                })
         elif action == 'game_over':
             user_id = data.get('player_id')
             if user_id == self.user.internal_id:
@@ -186,214 +1249,6 @@ class PongConsumer(AsyncWebsocketConsumer):
                 await self.update_user_stats(self.user, points_scored, has_won)
                 print(f"[DEBUG] Estadísticas actualizadas para {user_id}")
 
-    async def check_matchmaking(self):
-        """Empareja jugadores para una partida de Pong."""
-        if len(waiting_players) < 2:
-            return
-
-        player1_id = waiting_players.pop(0)
-        player2_id = None
-        for i, pid in enumerate(waiting_players):
-            if pid != player1_id:
-                player2_id = waiting_players.pop(i)
-                break
-
-        if not player2_id:
-            waiting_players.insert(0, player1_id)
-            return
-
-        try:
-            game = await self.create_game(player1_id, player2_id)
-            room_id = game.room_id
-            player1_conn = player_connections.get(player1_id)
-            player2_conn = player_connections.get(player2_id)
-
-            if player1_conn and player2_conn:
-                player1_conn.room_id = room_id
-                player2_conn.room_id = room_id
-                await player1_conn.channel_layer.group_add(room_id, player1_conn.channel_name)
-                await player2_conn.channel_layer.group_add(room_id, player2_conn.channel_name)
-
-                player1_info = await self.get_user_info(player1_id)
-                player2_info = await self.get_user_info(player2_id)
-
-                base_speed = 0.015
-                active_games[room_id] = {
-                    'ball_x': 0.5, 'ball_y': 0.5,
-                    'ball_dx': base_speed * random.choice([-1, 1]),
-                    'ball_dy': base_speed * 0.8 * random.choice([-1, 1]),
-                    'player1_score': 0, 'player2_score': 0,
-                    'left_paddle': 0.5, 'right_paddle': 0.5,
-                    'player1_id': player1_id, 'player2_id': player2_id
-                }
-                active_games[room_id]['ball_task'] = asyncio.create_task(
-                    self.move_ball(room_id))
-
-                await self.channel_layer.group_send(
-                    room_id,
-                    {
-                        'type': 'game_start',
-                        'room_id': room_id,
-                        'player1': player1_info,
-                        'player2': player2_info
-                    }
-                )
-                print(f"[DEBUG] Partida iniciada: {room_id}")
-            else:
-                waiting_players.extend([player1_id, player2_id])
-                print(
-                    f"[ERROR] Conexiones no encontradas: P1={player1_id}, P2={player2_id}")
-        except Exception as e:
-            waiting_players.extend([player1_id, player2_id])
-            print(f"[ERROR] Error en matchmaking: {e}")
-
-    async def move_ball(self, room_id):
-        """Maneja el movimiento de la pelota en una partida de Pong."""
-        try:
-            game_data = active_games[room_id]
-            paddle_height = 0.2
-            base_speed = 0.015
-            update_interval = 0.02
-
-            while room_id in active_games:
-                game_data['ball_x'] += game_data['ball_dx']
-                game_data['ball_y'] += game_data['ball_dy']
-
-                if game_data['ball_y'] <= 0 or game_data['ball_y'] >= 1:
-                    game_data['ball_dy'] = -game_data['ball_dy'] * 1.02
-                    game_data['ball_y'] = max(
-                        0.01, min(0.99, game_data['ball_y']))
-
-                if (game_data['ball_x'] <= 0.025 and game_data['ball_x'] >= -0.01 and
-                    game_data['ball_y'] >= game_data['left_paddle'] - paddle_height/2 and
-                        game_data['ball_y'] <= game_data['left_paddle'] + paddle_height/2):
-                    game_data['ball_dx'] = -game_data['ball_dx'] * 1.1
-                    game_data['ball_x'] = 0.025
-                    relative_intersection = (
-                        game_data['ball_y'] - game_data['left_paddle']) / (paddle_height/2)
-                    game_data['ball_dy'] = base_speed * \
-                        1.5 * relative_intersection
-
-                if (game_data['ball_x'] >= 0.99 and game_data['ball_x'] <= 1.01 and
-                    game_data['ball_y'] >= game_data['right_paddle'] - paddle_height/2 and
-                        game_data['ball_y'] <= game_data['right_paddle'] + paddle_height/2):
-                    game_data['ball_dx'] = -game_data['ball_dx'] * 1.1
-                    game_data['ball_x'] = 0.99
-                    relative_intersection = (
-                        game_data['ball_y'] - game_data['right_paddle']) / (paddle_height/2)
-                    game_data['ball_dy'] = base_speed * \
-                        1.5 * relative_intersection
-
-                if game_data['ball_x'] < 0:
-                    game_data['player2_score'] += 1
-                    await self.channel_layer.group_send(
-                        room_id,
-                        {'type': 'update_score',
-                            'player1_score': game_data['player1_score'], 'player2_score': game_data['player2_score']}
-                    )
-                    self.reset_ball(game_data, base_speed)
-                    await asyncio.sleep(1)
-
-                if game_data['ball_x'] > 1:
-                    game_data['player1_score'] += 1
-                    await self.channel_layer.group_send(
-                        room_id,
-                        {'type': 'update_score',
-                            'player1_score': game_data['player1_score'], 'player2_score': game_data['player2_score']}
-                    )
-                    self.reset_ball(game_data, base_speed)
-                    await asyncio.sleep(1)
-
-                if game_data['player1_score'] >= 3 or game_data['player2_score'] >= 3:
-                    winner = 1 if game_data['player1_score'] >= 3 else 2
-                    await self.channel_layer.group_send(
-                        room_id,
-                        {
-                            'type': 'game_over',
-                            'winner': winner,
-                            'player1_id': game_data['player1_id'],
-                            'player2_id': game_data['player2_id'],
-                            'player1_score': game_data['player1_score'],
-                            'player2_score': game_data['player2_score']
-                        }
-                    )
-                    await self.save_game_results(room_id, game_data)
-                    del active_games[room_id]
-                    return
-
-                await self.channel_layer.group_send(
-                    room_id,
-                    {'type': 'update_ball', 'ball_position_x':
-                        game_data['ball_x'], 'ball_position_y': game_data['ball_y']}
-                )
-                await asyncio.sleep(update_interval)
-
-        except asyncio.CancelledError:
-            print(f"[DEBUG] Tarea de pelota cancelada para {room_id}")
-        except Exception as e:
-            print(f"[ERROR] Error en move_ball: {e}")
-            if room_id in active_games:
-                del active_games[room_id]
-
-    def reset_ball(self, game_data, base_speed):
-        """Reinicia la pelota al centro con una nueva dirección."""
-        game_data['ball_x'] = 0.5
-        game_data['ball_y'] = 0.5
-        game_data['ball_dx'] = base_speed * random.choice([-1, 1])
-        game_data['ball_dy'] = base_speed * 0.8 * random.choice([-1, 1])
-
-    @database_sync_to_async
-    def create_game(self, player1_id, player2_id):
-        """Crea una partida en la base de datos."""
-        player1 = User.objects.get(internal_id=player1_id)
-        player2 = User.objects.get(internal_id=player2_id)
-        game = Game(player1=player1, player2=player2)
-        game.save()
-        return game
-
-    @database_sync_to_async
-    def save_game_results(self, room_id, game_data):
-        """Guarda los resultados de la partida en los modelos Game y History."""
-        game = Game.objects.filter(room_id=room_id).first()
-        if game:
-            game.player1_score = game_data['player1_score']
-            game.player2_score = game_data['player2_score']
-            game.is_active = False
-            game.save()
-            print(f"[DEBUG] Resultados guardados para {room_id} en Game")
-
-            # Determinar el ganador
-            winner = None
-            if game_data['player1_score'] >= 3:
-                winner = User.objects.get(internal_id=game_data['player1_id'])
-            elif game_data['player2_score'] >= 3:
-                winner = User.objects.get(internal_id=game_data['player2_id'])
-
-            # Guardar en el modelo History
-            History.objects.create(
-                room_id=room_id,
-                player1=User.objects.get(internal_id=game_data['player1_id']),
-                player2=User.objects.get(internal_id=game_data['player2_id']),
-                player1_score=game_data['player1_score'],
-                player2_score=game_data['player2_score'],
-                winner=winner
-            )
-            print(f"[DEBUG] Historial guardado para {room_id} en History")
-
-    @database_sync_to_async
-    def get_user_info(self, user_id):
-        """Obtiene información del usuario."""
-        try:
-            user = User.objects.get(internal_id=user_id)
-            return {
-                'id': user.internal_id,
-                'intra_id': user.intra_id,
-                'intra_login': user.internal_login or user.intra_login,
-                'intra_picture': user.intra_picture
-            }
-        except User.DoesNotExist:
-            return {'id': user_id, 'intra_login': f'Usuario {user_id}', 'intra_picture': '/static/default-avatar.png'}
-
     @database_sync_to_async
     def update_user_stats(self, user, points_scored, has_won):
         """Actualiza estadísticas del usuario."""
@@ -410,24 +1265,31 @@ class PongConsumer(AsyncWebsocketConsumer):
             'room_id': event['room_id'],
             'player1': event['player1'],
             'player2': event['player2'],
-            'user_id': str(self.user.internal_id)
+            'user_id': str(self.user.internal_id),
+            'snapshot_scale': protocol.SCALE
         }))
 
-    async def update_paddle(self, event):
-        """Actualiza la posición de la paleta."""
-        await self.send(text_data=json.dumps(event))
-
-    async def update_ball(self, event):
-        """Actualiza la posición de la pelota."""
-        await self.send(text_data=json.dumps(event))
+    async def snapshot(self, event):
+        """Envía los cambios de la sala (bola, paletas y marcador) del último tick."""
+        data = self.stream.encode(event)
+        if data is None:
+            return
+        if self.binary:
+            await self.send(bytes_data=data)
+        else:
+            await self.send(text_data=data)
 
-    async def update_score(self, event):
-        """Actualiza la puntuación."""
-        await self.send(text_data=json.dumps(event))
+    async def match_found(self, event):
+        """Recibe la sala asignada por el worker que ha hecho el emparejamiento."""
+        self.room_id = event['room_id']
+        self.owner_channel = event['owner']
+        await fanout.group_add(self.room_id, self, expected=2)
 
     async def player_disconnected(self, event):
         """Notifica la desconexión de un jugador."""
-        if self.room_id in active_games:
+        if self.room_id:
+            # La sala ha terminado: su grupo ya no recibe nada
+            await fanout.group_discard(self.room_id, self)
             await self.send(text_data=json.dumps({
                 'type': 'error',
                 'message': 'El otro jugador se ha desconectado'
@@ -435,8 +1297,11 @@ class PongConsumer(AsyncWebsocketConsumer):
 
     async def game_over(self, event):
         """Notifica el fin de la partida."""
+        if self.room_id:
+            await fanout.group_discard(self.room_id, self)
         winner = event.get('winner', 0)
-        message = f'¡Jugador {winner} ha ganado!' if winner else 'Partida finalizada sin ganador'
+        message = (f'¡Jugador {winner} ha ganado!' if winner
+                   else event.get('message', 'Partida finalizada sin ganador'))
         await self.send(text_data=json.dumps({
             'type': 'game_over',
             'winner': winner,
@@ -468,10 +1333,21 @@ class TournamentConsumer(AsyncWebsocketConsumer):
             return
 
         await self.accept()
-        tournament_connections[self.user.internal_id] = self
-        print(
-            f"[DEBUG] Conexión registrada - Tournament Connections: {list(tournament_connections.keys())}")
+        await ownership.start()
+        # Envía los resultados que quedaron en cola antes de un reinicio
+        chain_writer.start()
         self.tournament_token = None
+        print(f"[DEBUG] Conexión de torneo registrada - User ID: {self.user.internal_id}")
+
+    def tournament_message(self, message_type, token, **extra):
+        """Mensaje para el worker propietario del torneo."""
+        return {
+            'type': message_type,
+            'token': token,
+            'user_id': self.user.internal_id,
+            'channel': self.channel_name,
+            **extra
+        }
 
     async def start_tournament(self, event):
         # Ignorar el mensaje en el backend, ya que lo maneja el frontend
@@ -480,235 +1356,23 @@ class TournamentConsumer(AsyncWebsocketConsumer):
         pass
 
     async def disconnect(self, close_code):
-        if self.user.internal_id in tournament_connections:
-            del tournament_connections[self.user.internal_id]
-            print(
-                f"[DEBUG] Conexión eliminada - User ID: {self.user.internal_id}, Remaining Connections: {list(tournament_connections.keys())}")
-
-        if self.tournament_token and self.tournament_token in tournament_rooms:
-            tournament_data = tournament_rooms[self.tournament_token]
-            if self.user.internal_id in tournament_data['participants']:
-                tournament_data['participants'].remove(self.user.internal_id)
-                print(
-                    f"[DEBUG] {self.user.internal_id} ha salido del torneo {self.tournament_token}, Participants: {tournament_data['participants']}")
-
-                # Si es la final y el usuario es un finalista
-                if tournament_data['status'] == 'final':
-                    finalists = tournament_data['matches']['final']['players']
-                    user_id_str = str(self.user.internal_id)
-                    final_match_id = f"{self.tournament_token}-final"
-                    if user_id_str in [str(p) for p in finalists]:
-                        # Si el partido no ha comenzado o está en countdown
-                        if (tournament_data['matches']['final']['winner'] is None and
-                                (final_match_id not in match_states or not match_states[final_match_id]['running'])):
-                            winner_id = next(
-                                p for p in finalists if str(p) != user_id_str)
-                            tournament_data['matches']['final']['winner'] = winner_id
-                            tournament_data['matches']['final']['player1_score'] = 5 if str(
-                                winner_id) == str(finalists[0]) else 0
-                            tournament_data['matches']['final']['player2_score'] = 5 if str(
-                                winner_id) == str(finalists[1]) else 0
-                            tournament_data['status'] = 'finished'
-
-                            # Limpiar estado si existe
-                            if final_match_id in match_states:
-                                if 'ball_task' in match_states[final_match_id]:
-                                    match_states[final_match_id]['ball_task'].cancel(
-                                    )
-                                del match_states[final_match_id]
-
-                            # Enviar resultados finales directamente
-                            results = {
-                                'participants': await self.get_participants_info(tournament_data['participants']),
-                                'match1': {
-                                    'players': await self.get_participants_info(tournament_data['matches']['match1']['players']),
-                                    'winner': await self.get_participant_info(tournament_data['matches']['match1']['winner'])
-                                },
-                                'match2': {
-                                    'players': await self.get_participants_info(tournament_data['matches']['match2']['players']),
-                                    'winner': await self.get_participant_info(tournament_data['matches']['match2']['winner'])
-                                },
-                                'final': {
-                                    'players': await self.get_participants_info(tournament_data['matches']['final']['players']),
-                                    'winner': await self.get_participant_info(winner_id)
-                                }
-                            }
-                            await self.channel_layer.group_send(
-                                self.tournament_token,
-                                {
-                                    'type': 'tournament_results',
-                                    'results': results
-                                }
-                            )
-                            print(
-                                f"[DEBUG] Finalista {user_id_str} desconectado antes/durante countdown. Resultados enviados. Ganador: {winner_id}")
-                            # Enviar a blockchain en caso de desconexión en final
-                            await save_tournament_to_blockchain(tournament_data)
-                            await self.channel_layer.group_discard(self.tournament_token, self.channel_name)
-                            return  # Salir para evitar más procesamiento
-
-                # Resto del manejo existente
-                if tournament_data['creator'] == self.user.internal_id and tournament_data['participants']:
-                    tournament_data['creator'] = tournament_data['participants'][0]
-                    print(
-                        f"[DEBUG] Nuevo creador del torneo {self.tournament_token}: {tournament_data['creator']}")
-
-                if tournament_data['status'] in ['in_progress', 'final', 'finished']:
-                    await self.handle_tournament_disconnect(tournament_data)
-                else:
-                    await self.send_tournament_info()
-
-                if not tournament_data['participants']:
-                    del tournament_rooms[self.tournament_token]
-                    print(
-                        f"[DEBUG] Torneo {self.tournament_token} eliminado por falta de participantes")
-            await self.channel_layer.group_discard(self.tournament_token, self.channel_name)
-
-    async def handle_tournament_disconnect(self, tournament_data):
-        """Maneja la desconexión de un jugador en un torneo en curso."""
-        user_id_str = str(self.user.internal_id)
-        match_found = False
-
-        # Revisar todos los matches del torneo
-        for match_key in ['match1', 'match2', 'final']:
-            match_data = tournament_data['matches'][match_key]
-            players = match_data['players']
-            if user_id_str in [str(p) for p in players]:
-                match_found = True
-                match_id = f"{self.tournament_token}-{match_key}"
-                # Grupo específico del match
-                match_group_name = f"match_{match_id}"
-
-                # Si el match ya tiene ganador, ignorar
-                if match_data['winner']:
-                    print(
-                        f"[DEBUG] {match_id} ya tiene ganador: {match_data['winner']}, ignorando desconexión")
-                    continue
-
-                # Determinar oponente
-                opponent_id = next(p for p in players if str(p) != user_id_str)
-
-                # Si la partida está en curso (estado existe en match_states)
-                if match_id in match_states:
-                    state = match_states[match_id]
-                    state['running'] = False
-                    if 'ball_task' in state:
-                        state['ball_task'].cancel()
-
-                    # Asegurar que todos los IDs sean strings
-                    winner_id = str(opponent_id)
-                    state_player1_id = str(state['player1_id'])
-                    state_player2_id = str(state['player2_id'])
-
-                    # Asignar victoria al oponente con 5-0
-                    state['player1_score'] = 5 if state_player1_id == winner_id else 0
-                    state['player2_score'] = 5 if state_player2_id == winner_id else 0
-
-                    winner = 1 if state_player1_id == winner_id else 2
-                    print(
-                        f"[DEBUG] Asignando ganador - Desconectado: {user_id_str}, Winner_id: {winner_id}, Player1_id: {state_player1_id}, Player2_id: {state_player2_id}, Winner: {winner}")
-
-                    await self.channel_layer.group_send(
-                        match_group_name,
-                        {
-                            'type': 'game_over',
-                            'winner': winner,
-                            'player1_id': state_player1_id,
-                            'player2_id': state_player2_id,
-                            'player1_score': state['player1_score'],
-                            'player2_score': state['player2_score'],
-                            'message': 'El oponente se ha desconectado. ¡Has ganado!'
-                        }
-                    )
-                    await self.channel_layer.group_send(
-                        self.tournament_token,
-                        {
-                            'type': 'match_result',
-                            'match_id': match_id,
-                            'winner_id': int(winner_id),
-                            'player1_score': state['player1_score'],
-                            'player2_score': state['player2_score']
-                        }
-                    )
-                    # No eliminamos match_states[match_id] aquí; lo dejamos a TournamentMatchConsumer
-
-                # Si la partida aún no ha comenzado
-                else:
-                    match_data['winner'] = opponent_id
-                    match_data['player1_score'] = 5 if str(
-                        opponent_id) == str(players[0]) else 0
-                    match_data['player2_score'] = 5 if str(
-                        opponent_id) == str(players[1]) else 0
-                    print(
-                        f"[DEBUG] {match_id} marcado como perdido por desconexión. Ganador: {opponent_id}")
-                    await self.channel_layer.group_send(
-                        self.tournament_token,
-                        {
-                            'type': 'match_result',
-                            'match_id': match_id,
-                            'winner_id': int(opponent_id),
-                            'player1_score': match_data['player1_score'],
-                            'player2_score': match_data['player2_score']
-                        }
-                    )
-                    # Notificar al oponente si está conectado
-                    if opponent_id in tournament_connections:
-                        await tournament_connections[opponent_id].send(text_data=json.dumps({
-                            'type': 'start_tournament',
-                            'match_id': match_id,
-                            'opponent_id': user_id_str,
-                            'user_id': opponent_id
-                        }))
-
-        if not match_found:
-            print(
-                f"[DEBUG] No se encontró match activo para {user_id_str} en {self.tournament_token}")
+        if not hasattr(self, 'user'):
+            return
+        print(
+            f"[DEBUG] Conexión de torneo eliminada - User ID: {self.user.internal_id}")
+        if self.tournament_token:
+            await ownership.route(self.tournament_token, self.tournament_message(
+                'tournament_disconnect', self.tournament_token))
 
     async def receive(self, text_data):
         data = json.loads(text_data)
         action = data.get('action')
 
-        async def leave_existing_tournament():
-            if self.tournament_token and self.tournament_token in tournament_rooms:
-                old_tournament = tournament_rooms[self.tournament_token]
-                if self.user.internal_id in old_tournament['participants']:
-                    old_tournament['participants'].remove(
-                        self.user.internal_id)
-                    print(
-                        f"[DEBUG] {self.user.internal_id} ha salido del torneo {self.tournament_token}")
-
-                    if old_tournament['creator'] == self.user.internal_id and old_tournament['participants']:
-                        old_tournament['creator'] = old_tournament['participants'][0]
-                        print(
-                            f"[DEBUG] Nuevo creador del torneo {self.tournament_token}: {old_tournament['creator']}")
-
-                    await self.send_tournament_info()
-
-                    if not old_tournament['participants']:
-                        del tournament_rooms[self.tournament_token]
-                        print(
-                            f"[DEBUG] Torneo {self.tournament_token} eliminado por falta de participantes")
-                self.tournament_token = None
-
         if action == 'create_tournament':
-            await leave_existing_tournament()
-            self.tournament_token = str(uuid.uuid4())[:8]
-            tournament_rooms[self.tournament_token] = {
-                'creator': self.user.internal_id,
-                'participants': [self.user.internal_id],
-                'max_players': 4,
-                'status': 'waiting',
-                'channel_group': self.tournament_token,
-                'matches': {
-                    'match1': {'players': [], 'winner': None, 'player1_score': 0, 'player2_score': 0},
-                    'match2': {'players': [], 'winner': None, 'player1_score': 0, 'player2_score': 0},
-                    'final': {'players': [], 'winner': None, 'player1_score': 0, 'player2_score': 0},
-                }
-            }
-            print(
-                f"[DEBUG] Torneo creado por {self.user.internal_id}: {self.tournament_token}")
-            await self.channel_layer.group_add(self.tournament_token, self.channel_name)
-            await self.send_tournament_info()
+            # Token que el anillo asigna a este worker para no tener que reenviar
+            token = ownership.local_key(lambda: str(uuid.uuid4())[:8])
+            await ownership.route(token, self.tournament_message(
+                'tournament_create', token, max_players=data.get('max_players')))
 
         elif action == 'join_tournament':
             tournament_token = data.get('token')
@@ -718,49 +1382,8 @@ class TournamentConsumer(AsyncWebsocketConsumer):
                     'message': 'Falta el token del torneo'
                 }))
                 return
-
-            if tournament_token not in tournament_rooms:
-                await self.send(text_data=json.dumps({
-                    'type': 'error',
-                    'message': 'Token de torneo inválido'
-                }))
-                return
-
-            tournament_data = tournament_rooms[tournament_token]
-            print(
-                f"[DEBUG] Intento de unión - User ID: {self.user.internal_id}, Tournament: {tournament_token}, Current Participants: {tournament_data['participants']}")
-
-            if tournament_data['status'] != 'waiting':
-                await self.send(text_data=json.dumps({
-                    'type': 'error',
-                    'message': 'El torneo ya ha comenzado o ha terminado'
-                }))
-                return
-
-            if len(tournament_data['participants']) >= tournament_data['max_players']:
-                await self.send(text_data=json.dumps({
-                    'type': 'error',
-                    'message': 'El torneo está lleno'
-                }))
-                return
-
-            if self.user.internal_id in tournament_data['participants']:
-                print(
-                    f"[DEBUG] Error: Usuario {self.user.internal_id} ya está en participants: {tournament_data['participants']}")
-                await self.send(text_data=json.dumps({
-                    'type': 'error',
-                    'message': 'Ya estás en este torneo'
-                }))
-                return
-
-            await leave_existing_tournament()
-
-            tournament_data['participants'].append(self.user.internal_id)
-            self.tournament_token = tournament_token
-            await self.channel_layer.group_add(tournament_token, self.channel_name)
-            print(
-                f"[DEBUG] {self.user.internal_id} se unió al torneo {tournament_token}, New Participants: {tournament_data['participants']}")
-            await self.send_tournament_info()
+            await ownership.route(tournament_token, self.tournament_message(
+                'tournament_join', tournament_token))
 
         elif action == 'start_tournament':
             tournament_token = data.get('token')
@@ -770,110 +1393,19 @@ class TournamentConsumer(AsyncWebsocketConsumer):
                     'message': 'Token de torneo inválido o no coincide'
                 }))
                 return
+            await ownership.route(tournament_token, self.tournament_message(
+                'tournament_start', tournament_token))
 
-            if tournament_token not in tournament_rooms:
-                await self.send(text_data=json.dumps({
-                    'type': 'error',
-                    'message': 'El torneo no existe'
-                }))
-                return
-
-            tournament_data = tournament_rooms[tournament_token]
-            if self.user.internal_id != tournament_data['creator']:
-                await self.send(text_data=json.dumps({
-                    'type': 'error',
-                    'message': 'Solo el creador puede iniciar el torneo'
-                }))
-                return
-
-            if len(tournament_data['participants']) != 4:
-                await self.send(text_data=json.dumps({
-                    'type': 'error',
-                    'message': 'Se necesitan exactamente 4 jugadores para iniciar el torneo'
-                }))
-                return
-
-            print(
-                f"[DEBUG] Iniciando torneo {tournament_token} por {self.user.internal_id}")
-            tournament_data['status'] = 'in_progress'
-
-            # Lista de IDs: [1, 2, 3, 4]
-            participants = tournament_data['participants']
-            match1_players = participants[:2]  # [1, 2]
-            match2_players = participants[2:]  # [3, 4]
-
-            tournament_data['matches']['match1']['players'] = match1_players
-            tournament_data['matches']['match2']['players'] = match2_players
-
-            match1_id = f"{tournament_token}-match1"
-            match2_id = f"{tournament_token}-match2"
-
-            # Enviar mensajes a los jugadores de match1
-            for player_id in match1_players:
-                opponent_id = match1_players[0] if player_id != match1_players[0] else match1_players[1]
-                if player_id in tournament_connections:
-                    await tournament_connections[player_id].send(text_data=json.dumps({
-                        'type': 'start_tournament',
-                        'match_id': match1_id,
-                        'opponent_id': opponent_id,
-                        'user_id': player_id
-                    }))
-
-            # Enviar mensajes a los jugadores de match2
-            for player_id in match2_players:
-                opponent_id = match2_players[0] if player_id != match2_players[0] else match2_players[1]
-                if player_id in tournament_connections:
-                    await tournament_connections[player_id].send(text_data=json.dumps({
-                        'type': 'start_tournament',
-                        'match_id': match2_id,
-                        'opponent_id': opponent_id,
-                        'user_id': player_id
-                    }))
-
-            print(
-                f"[DEBUG] Matches iniciados: {match1_id} ({match1_players}), {match2_id} ({match2_players})")
-            await self.send_tournament_info()
+    async def tournament_joined(self, event):
+        """El propietario confirma que el jugador está en el torneo."""
+        previous = self.tournament_token
+        self.tournament_token = event['token']
+        if previous and previous != self.tournament_token:
+            await ownership.route(previous, self.tournament_message('tournament_leave', previous))
 
-    async def send_tournament_info(self):
-        if self.tournament_token and self.tournament_token in tournament_rooms:
-            tournament_data = tournament_rooms[self.tournament_token]
-            participants_info = await self.get_participants_info(tournament_data['participants'])
-            print(
-                f"[DEBUG] Enviando actualización al grupo - Token: {self.tournament_token}, Creator ID: {tournament_data['creator']}")
-            await self.channel_layer.group_send(
-                self.tournament_token,
-                {
-                    'type': 'tournament_info',
-                    'token': self.tournament_token,
-                    'participants': participants_info,
-                    'max_players': tournament_data['max_players'],
-                    'status': tournament_data['status'],
-                    'creator': tournament_data['creator'],
-                }
-            )
-
-    @database_sync_to_async
-    def get_participants_info(self, participant_ids):
-        participants = []
-        for user_id in participant_ids:
-            try:
-                user = User.objects.get(internal_id=user_id)
-                participants.append({
-                    'id': user.internal_id,
-                    'intra_login': user.internal_login or user.intra_login,
-                    'intra_picture': user.intra_picture,
-                    'games_won': user.games_won,
-                    'total_points': user.total_points
-                })
-            except User.DoesNotExist:
-                participants.append({
-                    'id': user_id,
-                    'intra_login': f'User {user_id}',
-                    'intra_picture': None,
-                    'games_won': 0,
-                    'total_points': 0
-                })
-        return participants
+    async def relay(self, event):
+        """Mensaje del propietario del torneo para este jugador."""
+        await self.send(text_data=json.dumps(event['payload']))
 
     async def tournament_info(self, event):
         show_start_button = (self.user.internal_id == event['creator'])
@@ -889,198 +1421,6 @@ class TournamentConsumer(AsyncWebsocketConsumer):
             'show_start_button': show_start_button
         }))
 
-    async def match_result(self, event):
-        match_id = event['match_id']
-        winner_id = event['winner_id']
-        player1_score = event.get('player1_score', 0)
-        player2_score = event.get('player2_score', 0)
-        if self.tournament_token and self.tournament_token in tournament_rooms:
-            tournament_data = tournament_rooms[self.tournament_token]
-            match_key = match_id.split('-')[-1]
-            if match_key in tournament_data['matches']:
-                if tournament_data['matches'][match_key]['winner'] is None:
-                    tournament_data['matches'][match_key]['winner'] = winner_id
-                    tournament_data['matches'][match_key]['player1_score'] = player1_score
-                    tournament_data['matches'][match_key]['player2_score'] = player2_score
-                    print(
-                        f"[DEBUG] Ganador de {match_id}: {winner_id}, Puntuación: {player1_score}-{player2_score}")
-
-                if match_key == 'final' and tournament_data['status'] != 'finished':
-                    tournament_data['status'] = 'finished'
-                    tournament_data['matches']['final']['player1_score'] = player1_score
-                    tournament_data['matches']['final']['player2_score'] = player2_score
-
-                    results = {
-                        'participants': await self.get_participants_info(tournament_data['participants']),
-                        'match1': {
-                            'players': await self.get_participants_info(tournament_data['matches']['match1']['players']),
-                            'winner': await self.get_participant_info(tournament_data['matches']['match1']['winner'])
-                        },
-                        'match2': {
-                            'players': await self.get_participants_info(tournament_data['matches']['match2']['players']),
-                            'winner': await self.get_participant_info(tournament_data['matches']['match2']['winner'])
-                        },
-                        'final': {
-                            'players': await self.get_participants_info(tournament_data['matches']['final']['players']),
-                            'winner': await self.get_participant_info(winner_id)
-                        }
-                    }
-                    await self.channel_layer.group_send(
-                        self.tournament_token,
-                        {
-                            'type': 'tournament_results',
-                            'results': results
-                        }
-                    )
-                    print(
-                        f"[DEBUG] Torneo {self.tournament_token} finalizado. Resultados enviados.")
-
-                    # Enviar los resultados a la blockchain
-                    await save_tournament_to_blockchain(tournament_data)
-
-                elif (tournament_data['matches']['match1']['winner'] is not None and
-                      tournament_data['matches']['match2']['winner'] is not None and
-                      tournament_data['status'] == 'in_progress'):
-                    await self.start_final(tournament_data)
-            else:
-                print(
-                    f"[DEBUG] Match {match_id} no encontrado en torneo {self.tournament_token}")
-
-    async def start_final(self, tournament_data):
-        tournament_data['status'] = 'final'
-        finalists = [
-            tournament_data['matches']['match1']['winner'],
-            tournament_data['matches']['match2']['winner']
-        ]
-        tournament_data['matches']['final']['players'] = finalists
-        final_match_id = f"{self.tournament_token}-final"
-
-        await asyncio.sleep(3)
-
-        # Verificar conexiones antes del countdown
-        missing_players = [
-            p for p in finalists if p not in tournament_connections]
-        if missing_players:
-            print(
-                f"[DEBUG] Jugadores desconectados antes del countdown: {missing_players}")
-            if len(missing_players) == 1:
-                winner_id = finalists[0] if missing_players[0] == finalists[1] else finalists[1]
-                tournament_data['matches']['final']['winner'] = winner_id
-                tournament_data['matches']['final']['player1_score'] = 5 if str(
-                    winner_id) == str(finalists[0]) else 0
-                tournament_data['matches']['final']['player2_score'] = 5 if str(
-                    winner_id) == str(finalists[1]) else 0
-                tournament_data['status'] = 'finished'
-                # Enviar resultados directamente
-                results = {
-                    'participants': await self.get_participants_info(tournament_data['participants']),
-                    'match1': {
-                        'players': await self.get_participants_info(tournament_data['matches']['match1']['players']),
-                        'winner': await self.get_participant_info(tournament_data['matches']['match1']['winner'])
-                    },
-                    'match2': {
-                        'players': await self.get_participants_info(tournament_data['matches']['match2']['players']),
-                        'winner': await self.get_participant_info(tournament_data['matches']['match2']['winner'])
-                    },
-                    'final': {
-                        'players': await self.get_participants_info(tournament_data['matches']['final']['players']),
-                        'winner': await self.get_participant_info(winner_id)
-                    }
-                }
-                await self.channel_layer.group_send(
-                    self.tournament_token,
-                    {
-                        'type': 'tournament_results',
-                        'results': results
-                    }
-                )
-                print(
-                    f"[DEBUG] Torneo {self.tournament_token} finalizado por desconexión antes del countdown. Resultados enviados.")
-                # Enviar a blockchain
-                await save_tournament_to_blockchain(tournament_data)
-                return
-            elif len(missing_players) == 2:
-                print(
-                    f"[DEBUG] Ambos finalistas desconectados, torneo {self.tournament_token} cancelado")
-                tournament_data['status'] = 'finished'
-                return
-
-        # Resto del código (countdown y start_tournament)
-        tasks = []
-        for player_id in finalists:
-            tasks.append(
-                tournament_connections[player_id].send(text_data=json.dumps({
-                    'type': 'prepare_for_final',
-                    'final_match_id': final_match_id
-                }))
-            )
-        await asyncio.gather(*tasks)
-        await asyncio.sleep(1)
-
-        for i in range(5, 0, -1):
-            tasks = []
-            for player_id in finalists:
-                if player_id in tournament_connections:
-                    tasks.append(
-                        tournament_connections[player_id].send(text_data=json.dumps({
-                            'type': 'countdown_to_final',
-                            'seconds': i,
-                            'final_match_id': final_match_id
-                        }))
-                    )
-            if len(tasks) < 2:
-                missing_players = [
-                    p for p in finalists if p not in tournament_connections]
-                winner_id = finalists[0] if missing_players[0] == finalists[1] else finalists[1]
-                tournament_data['matches']['final']['winner'] = winner_id
-                tournament_data['matches']['final']['player1_score'] = 5 if str(
-                    winner_id) == str(finalists[0]) else 0
-                tournament_data['matches']['final']['player2_score'] = 5 if str(
-                    winner_id) == str(finalists[1]) else 0
-                tournament_data['status'] = 'finished'
-                results = {
-                    'participants': await self.get_participants_info(tournament_data['participants']),
-                    'match1': {
-                        'players': await self.get_participants_info(tournament_data['matches']['match1']['players']),
-                        'winner': await self.get_participant_info(tournament_data['matches']['match1']['winner'])
-                    },
-                    'match2': {
-                        'players': await self.get_participants_info(tournament_data['matches']['match2']['players']),
-                        'winner': await self.get_participant_info(tournament_data['matches']['match2']['winner'])
-                    },
-                    'final': {
-                        'players': await self.get_participants_info(tournament_data['matches']['final']['players']),
-                        'winner': await self.get_participant_info(winner_id)
-                    }
-                }
-                await self.channel_layer.group_send(
-                    self.tournament_token,
-                    {
-                        'type': 'tournament_results',
-                        'results': results
-                    }
-                )
-                print(
-                    f"[DEBUG] Torneo {self.tournament_token} finalizado por desconexión durante countdown. Resultados enviados.")
-                # Enviar a blockchain
-                await save_tournament_to_blockchain(tournament_data)
-                return
-            await asyncio.gather(*tasks)
-            await asyncio.sleep(1)
-
-        for player_id in finalists:
-            if player_id in tournament_connections:
-                await tournament_connections[player_id].send(text_data=json.dumps({
-                    'type': 'start_tournament',
-                    'match_id': final_match_id,
-                    'opponent_id': finalists[0] if player_id == finalists[1] else finalists[1],
-                    'user_id': player_id
-                }))
-                print(
-                    f"[DEBUG] Enviado start_tournament a {player_id} para {final_match_id}")
-
-        print(f"[DEBUG] Final iniciada: {final_match_id} ({finalists})")
-
     async def countdown_to_final(self, event):
         await self.send(text_data=json.dumps({
             'type': 'countdown_to_final',
@@ -1094,32 +1434,14 @@ class TournamentConsumer(AsyncWebsocketConsumer):
             'results': event['results']
         }))
 
-    @database_sync_to_async
-    def get_participant_info(self, user_id):
-        try:
-            user = User.objects.get(internal_id=user_id)
-            return {
-                'id': user.internal_id,
-                'intra_login': user.internal_login or user.intra_login,
-                'intra_picture': user.intra_picture,
-                'games_won': user.games_won,
-                'total_points': user.total_points
-            }
-        except User.DoesNotExist:
-            return {
-                'id': user_id,
-                'intra_login': f'User {user_id}',
-                'intra_picture': None,
-                'games_won': 0,
-                'total_points': 0
-            }
-
 
 class TournamentMatchConsumer(AsyncWebsocketConsumer):
     async def connect(self):
         self.match_id = self.scope['url_route']['kwargs']['match_id']
-        self.tournament_token = self.match_id.split('-')[0]
-        self.room_group_name = f'match_{self.match_id}'
+        self.tournament_token = match_token(self.match_id)
+        self.room_group_name = match_group(self.match_id)
+        self.owner_channel = None
+        self.accepted = False  # Autorizado por el propietario del partido
 
         session = self.scope.get('session', {})
         self.user_id = session.get('user_id')
@@ -1128,144 +1450,66 @@ class TournamentMatchConsumer(AsyncWebsocketConsumer):
             await self.close(code=4001)
             return
 
-        # Verificar autorización
-        tournament_data = tournament_rooms.get(self.tournament_token, {})
-        match_key = self.match_id.split('-')[-1]
-        expected_players = tournament_data.get(
-            'matches', {}).get(match_key, {}).get('players', [])
-        user_id_str = str(self.user_id)
-        if user_id_str not in [str(p) for p in expected_players]:
-            print(
-                f"[DEBUG] {user_id_str} no autorizado para {self.match_id}. Expected: {expected_players}")
-            await self.close(code=4003)
-            return
+        # El partido lo simula el worker propietario de su torneo
+        await ownership.start()
+        self.owner_channel = await ownership.owner(self.tournament_token)
 
-        # Inicializar estado del juego si no existe
-        if self.match_id not in match_states:
-            player1_id = str(expected_players[0])
-            player2_id = str(expected_players[1])
-            match_states[self.match_id] = {
-                'ball_x': 0.5, 'ball_y': 0.5,
-                'ball_dx': 0.008 * random.choice([-1, 1]),
-                'ball_dy': 0.008 * 0.8 * random.choice([-1, 1]),
-                'player1_score': 0, 'player2_score': 0,
-                'left_paddle': 0.5, 'right_paddle': 0.5,
-                'player1_id': player1_id, 'player2_id': player2_id,
-                'players': {},
-                'ready': 0,
-                'running': False,
-            }
-
-        await self.channel_layer.group_add(self.room_group_name, self.channel_name)
-        await self.accept()
+        # Frames binarios si el cliente los pide; si no, JSON
+        self.binary = protocol.SUBPROTOCOL in self.scope.get('subprotocols', [])
+        self.stream = protocol.SnapshotStream(self.binary)
+        if ownership.is_local(self.owner_channel):
+            if not await authorize_match(self.match_id, self.user_id):
+                await self.close(code=4003)
+                return
+            await fanout.group_add(self.room_group_name, self, expected=2)
+            self.accepted = True
+            await self.accept(protocol.SUBPROTOCOL if self.binary else None)
+        else:
+            # El propietario responde con match_accepted o match_rejected;
+            # hasta entonces se ignoran las acciones del jugador
+            await self.accept(protocol.SUBPROTOCOL if self.binary else None)
+            await worker.send(self.owner_channel, self.match_message('match_connect'))
         print(f"[DEBUG] Jugador {self.user_id} conectado a {self.match_id}")
 
+    def match_message(self, message_type, **extra):
+        """Mensaje para el worker propietario del partido."""
+        return {
+            'type': message_type,
+            'match_id': self.match_id,
+            'user_id': str(self.user_id),
+            'channel': self.channel_name,
+            **extra
+        }
+
+    async def to_owner(self, message):
+        if ownership.is_local(self.owner_channel):
+            await worker.handle(message)
+        else:
+            await worker.send(self.owner_channel, message)
+
     async def disconnect(self, close_code):
-        await self.channel_layer.group_discard(self.room_group_name, self.channel_name)
-        if self.match_id in match_states:
-            state = match_states[self.match_id]
-            user_id_str = str(self.user_id)
-            if user_id_str in state['players']:
-                del state['players'][user_id_str]
-                state['ready'] -= 1
-
-                if state['running']:
-                    # Partida en curso: dar victoria al oponente con 5-0
-                    state['running'] = False
-                    if 'ball_task' in state:
-                        state['ball_task'].cancel()
-
-                    winner_id = state['player1_id'] if user_id_str == state['player2_id'] else state['player2_id']
-                    state['player1_score'] = 5 if state['player1_id'] == winner_id else 0
-                    state['player2_score'] = 5 if state['player2_id'] == winner_id else 0
-
-                    await self.channel_layer.group_send(
-                        self.room_group_name,
-                        {
-                            'type': 'game_over',
-                            'winner': 1 if state['player1_id'] == winner_id else 2,
-                            'player1_id': state['player1_id'],
-                            'player2_id': state['player2_id'],
-                            'player1_score': state['player1_score'],
-                            'player2_score': state['player2_score'],
-                            'message': 'El oponente se ha desconectado. ¡Has ganado!'
-                        }
-                    )
-                    await self.channel_layer.group_send(
-                        self.tournament_token,
-                        {
-                            'type': 'match_result',
-                            'match_id': self.match_id,
-                            'winner_id': int(winner_id),
-                            'player1_score': state['player1_score'],
-                            'player2_score': state['player2_score']
-                        }
-                    )
-                    del match_states[self.match_id]
-                    print(
-                        f"[DEBUG] {self.match_id} terminado por desconexión. Ganador: {winner_id}")
-                elif state['ready'] == 0:
-                    del match_states[self.match_id]
-                    print(
-                        f"[DEBUG] Estado de {self.match_id} eliminado por desconexión total")
+        await fanout.group_discard(self.room_group_name, self)
+        if self.owner_channel:
+            await self.to_owner(self.match_message('match_leave'))
 
     async def receive(self, text_data):
         data = json.loads(text_data)
         action = data.get('action')
-        state = match_states.get(self.match_id)
-        if not state:
-            print(f"[DEBUG] No hay estado para {self.match_id}")
-            return
-
         user_id_str = str(self.user_id)
 
-        if action == 'join':
-            if user_id_str not in state['players']:
-                player_number = 1 if user_id_str == state['player1_id'] else 2
-                state['players'][user_id_str] = player_number
-                state['ready'] += 1
-                print(
-                    f"[DEBUG] {self.user_id} se unió como player{player_number}, Ready: {state['ready']}")
-
-                if state['ready'] == 2 and not state['running']:
-                    state['running'] = True
-                    player1_info = await self.get_user_info(state['player1_id'])
-                    player2_info = await self.get_user_info(state['player2_id'])
-                    await self.channel_layer.group_send(
-                        self.room_group_name,
-                        {
-                            'type': 'game_start',
-                            'room_id': self.match_id,
-                            'player1': player1_info,
-                            'player2': player2_info
-                        }
-                    )
-                    state['ball_task'] = asyncio.create_task(self.move_ball())
-                    print(f"[DEBUG] Partida {self.match_id} iniciada")
+        if action == 'ack':
+            self.stream.ack(data.get('seq'))
 
-        elif action == 'move':
-            direction = data.get('direction')
-            paddle_step = 0.025  # Misma velocidad que el frontend
-            is_player1 = user_id_str == state['player1_id']
-            paddle_key = 'left_paddle' if is_player1 else 'right_paddle'
+        elif action in ('join', 'move') and not self.accepted:
+            print(f"[DEBUG] {action} de {self.user_id} antes de ser aceptado en {self.match_id}")
 
-            if direction == 'up':
-                state[paddle_key] = max(0, state[paddle_key] - paddle_step)
-            elif direction == 'down':
-                state[paddle_key] = min(1, state[paddle_key] + paddle_step)
+        elif action == 'join':
+            await self.to_owner(self.match_message('match_join'))
 
-            print(
-                f"[DEBUG] Moviendo {paddle_key} de {user_id_str} a {state[paddle_key]}")
-
-            # Enviar actualización de ambas paletas a todos los clientes
-            await self.channel_layer.group_send(
-                self.room_group_name,
-                {
-                    'type': 'update_paddle',
-                    'left_paddle': state['left_paddle'],
-                    'right_paddle': state['right_paddle']
-                }
-            )
+        elif action == 'move':
+            # La nueva posición sale en el siguiente snapshot del propietario
+            await self.to_owner(self.match_message(
+                'match_input', direction=data.get('direction'), seq=data.get('seq')))
 
         elif action == 'game_over':
             if user_id_str == data.get('player_id'):
@@ -1274,145 +1518,17 @@ class TournamentMatchConsumer(AsyncWebsocketConsumer):
                 await self.update_user_stats(await self.get_user(self.user_id), points_scored, has_won)
                 print(f"[DEBUG] Estadísticas actualizadas para {self.user_id}")
 
-    async def move_ball(self):
-        try:
-            state = match_states[self.match_id]
-            paddle_height = 0.2
-            base_speed = 0.008
-            update_interval = 0.016  # Reducido de 0.02 a 0.016 para actualizaciones más frecuentes
-
-            while state['running']:
-                state['ball_x'] += state['ball_dx']
-                state['ball_y'] += state['ball_dy']
-
-                # Lógica de rebote en los bordes superior e inferior
-                if state['ball_y'] <= 0 or state['ball_y'] >= 1:
-                    state['ball_dy'] = -state['ball_dy'] * 1.02
-                    state['ball_y'] = max(0.01, min(0.99, state['ball_y']))
-
-                # Colisión con la paleta izquierda (player1)
-                if (state['ball_x'] <= 0.03 and state['ball_x'] >= -0.01 and
-                    state['ball_y'] >= state['left_paddle'] - paddle_height/2 and
-                        state['ball_y'] <= state['left_paddle'] + paddle_height/2):
-                    state['ball_dx'] = -state['ball_dx'] * 1.1
-                    state['ball_x'] = 0.03
-                    relative_intersection = (
-                        state['ball_y'] - state['left_paddle']) / (paddle_height/2)
-                    state['ball_dy'] = base_speed * 1.5 * relative_intersection
-
-                # Colisión con la paleta derecha (player2)
-                if (state['ball_x'] >= 0.97 and state['ball_x'] <= 1.01 and
-                    state['ball_y'] >= state['right_paddle'] - paddle_height/2 and
-                        state['ball_y'] <= state['right_paddle'] + paddle_height/2):
-                    state['ball_dx'] = -state['ball_dx'] * 1.1
-                    state['ball_x'] = 0.97
-                    relative_intersection = (
-                        state['ball_y'] - state['right_paddle']) / (paddle_height/2)
-                    state['ball_dy'] = base_speed * 1.5 * relative_intersection
-
-                # Punto para player2 si la bola pasa por la izquierda
-                if state['ball_x'] < 0:
-                    state['player2_score'] += 1
-                    await self.channel_layer.group_send(
-                        self.room_group_name,
-                        {'type': 'update_score',
-                            'player1_score': state['player1_score'], 'player2_score': state['player2_score']}
-                    )
-                    self.reset_ball(state, base_speed)
-                    await asyncio.sleep(1)
-
-                # Punto para player1 si la bola pasa por la derecha
-                if state['ball_x'] > 1:
-                    state['player1_score'] += 1
-                    await self.channel_layer.group_send(
-                        self.room_group_name,
-                        {'type': 'update_score',
-                            'player1_score': state['player1_score'], 'player2_score': state['player2_score']}
-                    )
-                    self.reset_ball(state, base_speed)
-                    await asyncio.sleep(1)
-
-                # Finalizar partida si alguien llega a 5 puntos
-                if state['player1_score'] >= 5 or state['player2_score'] >= 5:
-                    winner = 1 if state['player1_score'] >= 5 else 2
-                    winner_id = state['player1_id'] if winner == 1 else state['player2_id']
-                    await self.channel_layer.group_send(
-                        self.room_group_name,
-                        {
-                            'type': 'game_over',
-                            'winner': winner,
-                            'player1_id': state['player1_id'],
-                            'player2_id': state['player2_id'],
-                            'player1_score': state['player1_score'],
-                            'player2_score': state['player2_score']
-                        }
-                    )
-                    await self.channel_layer.group_send(
-                        self.tournament_token,
-                        {
-                            'type': 'match_result',
-                            'match_id': self.match_id,
-                            'winner_id': int(winner_id),
-                            'player1_score': state['player1_score'],
-                            'player2_score': state['player2_score']
-                        }
-                    )
-                    await self.save_game_results(self.match_id, state)
-                    del match_states[self.match_id]
-                    return
-
-                # Enviar actualización de la bola a los clientes
-                await self.channel_layer.group_send(
-                    self.room_group_name,
-                    {'type': 'update_ball',
-                        'ball_position_x': state['ball_x'], 'ball_position_y': state['ball_y']}
-                )
-                await asyncio.sleep(update_interval)
-
-        except asyncio.CancelledError:
-            print(f"[DEBUG] Tarea de pelota cancelada para {self.match_id}")
-        except Exception as e:
-            print(f"[ERROR] Error en move_ball: {e}")
-            if self.match_id in match_states:
-                del match_states[self.match_id]
+    async def match_accepted(self, event):
+        await fanout.group_add(self.room_group_name, self, expected=2)
+        self.accepted = True
 
-    def reset_ball(self, state, base_speed):
-        state['ball_x'] = 0.5
-        state['ball_y'] = 0.5
-        state['ball_dx'] = base_speed * random.choice([-1, 1])
-        state['ball_dy'] = base_speed * 0.8 * random.choice([-1, 1])
+    async def match_rejected(self, event):
+        await self.close(code=4003)
 
     @database_sync_to_async
     def get_user(self, user_id):
         return User.objects.get(internal_id=user_id)
 
-    @database_sync_to_async
-    def save_game_results(self, match_id, state):
-        game = Game.objects.filter(room_id=match_id).first()
-        if not game:
-            player1 = User.objects.get(internal_id=state['player1_id'])
-            player2 = User.objects.get(internal_id=state['player2_id'])
-            game = Game(player1=player1, player2=player2, room_id=match_id)
-        game.player1_score = state['player1_score']
-        game.player2_score = state['player2_score']
-        game.is_active = False
-        game.save()
-        print(f"[DEBUG] Resultados guardados para {match_id}")
-
-    @database_sync_to_async
-    def get_user_info(self, user_id):
-        try:
-            user = User.objects.get(internal_id=user_id)
-            return {
-                'id': user.internal_id,
-                'intra_id': user.intra_id,
-                'intra_login': user.internal_login or user.intra_login,
-                'intra_picture': user.intra_picture,
-                'user_id': user.internal_id  # Asegúrate de incluir user_id
-            }
-        except User.DoesNotExist:
-            return {'id': user_id, 'intra_login': f'Usuario {user_id}', 'intra_picture': None, 'user_id': user_id}
-
     @database_sync_to_async
     def update_user_stats(self, user, points_scored, has_won):
         user.games_played += 1
@@ -1427,21 +1543,18 @@ class TournamentMatchConsumer(AsyncWebsocketConsumer):
             'room_id': event['room_id'],
             'player1': event['player1'],
             'player2': event['player2'],
-            'user_id': str(self.user_id)
+            'user_id': str(self.user_id),
+            'snapshot_scale': protocol.SCALE
         }))
 
-    async def update_paddle(self, event):
-        await self.send(text_data=json.dumps({
-            'type': 'update_paddle',
-            'left_paddle': event['left_paddle'],
-            'right_paddle': event['right_paddle']
-        }))
-
-    async def update_ball(self, event):
-        await self.send(text_data=json.dumps(event))
-
-    async def update_score(self, event):
-        await self.send(text_data=json.dumps(event))
+    async def snapshot(self, event):
+        data = self.stream.encode(event)
+        if data is None:
+            return
+        if self.binary:
+            await self.send(bytes_data=data)
+        else:
+            await self.send(text_data=data)
 
     async def player_disconnected(self, event):
         await self.send(text_data=json.dumps({
@@ -1451,7 +1564,8 @@ class TournamentMatchConsumer(AsyncWebsocketConsumer):
 
     async def game_over(self, event):
         winner = event.get('winner', 0)
-        message = f'¡Jugador {winner} ha ganado!' if winner else 'Partida finalizada sin ganador'
+        message = (f'¡Jugador {winner} ha ganado!' if winner
+                   else event.get('message', 'Partida finalizada sin ganador'))
         await self.send(text_data=json.dumps({
             'type': 'game_over',
             'winner': winner,
@@ -0,0 +1,132 @@
+"""
+Reglas de la física de Pong compartidas por PongConsumer y
+TournamentMatchConsumer. Este módulo no depende de Django ni de NumPy para
+poder perfilarlo y medirlo de forma aislada (ver pong/benchmark.py).
+"""
+import random
+
+PADDLE_HEIGHT = 0.2
+HALF_PADDLE = PADDLE_HEIGHT / 2
+POINT_PAUSE = 1.0  # Segundos de pausa tras cada punto
+
+# Resultado de step()
+MOVED = 0
+SCORED = 1
+FINISHED = 2
+PAUSED = 3
+
+# Generador congruencial para que el saque sea determinista dado el estado
+LCG_MULTIPLIER = 1103515245
+LCG_INCREMENT = 12345
+LCG_MASK = 0x7fffffff
+
+
+class GameConfig:
+    """Constantes de un modo de juego."""
+    __slots__ = ('base_speed', 'interval', 'left_limit',
+                 'right_limit', 'win_score', 'paddle_step')
+
+    def __init__(self, base_speed, interval, left_limit, right_limit, win_score, paddle_step=0.025):
+        self.base_speed = base_speed    # Velocidad de la bola por intervalo
+        self.interval = interval        # Intervalo en el que se expresa la velocidad
+        self.left_limit = left_limit    # X de la cara de la paleta izquierda
+        self.right_limit = right_limit  # X de la cara de la paleta derecha
+        self.win_score = win_score
+        self.paddle_step = paddle_step  # Desplazamiento por pulsación (igual que el frontend)
+
+
+PONG = GameConfig(base_speed=0.015, interval=0.02,
+                  left_limit=0.025, right_limit=0.99, win_score=3)
+TOURNAMENT = GameConfig(base_speed=0.008, interval=0.016,
+                        left_limit=0.03, right_limit=0.97, win_score=5)
+
+
+class GameState:
+    """Estado físico de una partida."""
+    __slots__ = ('config', 'ball_x', 'ball_y', 'ball_dx', 'ball_dy',
+                 'left_paddle', 'right_paddle', 'player1_score',
+                 'player2_score', 'pause', 'seed')
+
+    def __init__(self, config, seed=None):
+        self.config = config
+        self.left_paddle = 0.5
+        self.right_paddle = 0.5
+        self.player1_score = 0
+        self.player2_score = 0
+        self.pause = 0.0
+        self.seed = random.getrandbits(31) if seed is None else seed
+        serve(self)
+
+
+def serve(state):
+    """Devuelve la bola al centro con una dirección pseudoaleatoria."""
+    seed = (state.seed * LCG_MULTIPLIER + LCG_INCREMENT) & LCG_MASK
+    state.seed = seed
+    speed = state.config.base_speed
+    state.ball_x = 0.5
+    state.ball_y = 0.5
+    state.ball_dx = speed if seed & 0x10000 else -speed
+    state.ball_dy = speed * 0.8 if seed & 0x20000 else -speed * 0.8
+
+
+def step(state, dt):
+    """
+    Avanza la partida dt segundos. Es determinista (mismo estado y dt dan el
+    mismo resultado) y no crea objetos: devuelve MOVED, SCORED, FINISHED o
+    PAUSED.
+    """
+    if state.pause > 0:
+        state.pause -= dt
+        return PAUSED
+
+    config = state.config
+    # Las velocidades están expresadas por el intervalo original de cada modo
+    scale = dt / config.interval
+    x = state.ball_x + state.ball_dx * scale
+    y = state.ball_y + state.ball_dy * scale
+
+    # Rebote en los bordes superior e inferior
+    if y <= 0 or y >= 1:
+        state.ball_dy *= -1.02
+        y = max(0.01, min(0.99, y))
+
+    # Colisión con la paleta izquierda (player1)
+    paddle = state.left_paddle
+    if (-0.01 <= x <= config.left_limit and
+            paddle - HALF_PADDLE <= y <= paddle + HALF_PADDLE):
+        state.ball_dx *= -1.1
+        x = config.left_limit
+        state.ball_dy = config.base_speed * 1.5 * (y - paddle) / HALF_PADDLE
+
+    # Colisión con la paleta derecha (player2)
+    paddle = state.right_paddle
+    if (config.right_limit <= x <= 1.01 and
+            paddle - HALF_PADDLE <= y <= paddle + HALF_PADDLE):
+        state.ball_dx *= -1.1
+        x = config.right_limit
+        state.ball_dy = config.base_speed * 1.5 * (y - paddle) / HALF_PADDLE
+
+    state.ball_x = x
+    state.ball_y = y
+    if 0 <= x <= 1:
+        return MOVED
+
+    # Punto para player2 si la bola sale por la izquierda, para player1 por la derecha
+    if x < 0:
+        state.player2_score += 1
+    else:
+        state.player1_score += 1
+    serve(state)
+    state.pause = POINT_PAUSE
+    if state.player1_score >= config.win_score or state.player2_score >= config.win_score:
+        return FINISHED
+    return SCORED
+
+
+def winner(state):
+    """1 o 2 según quién haya llegado a la puntuación de victoria, 0 si nadie."""
+    if state.player1_score >= state.config.win_score:
+        return 1
+    if state.player2_score >= state.config.win_score:
+        return 2
+    return 0
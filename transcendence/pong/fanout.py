@@ -0,0 +1,72 @@
+from channels.consumer import get_handler_name
+
+
+class LocalFanout:
+    """
+    Registro de los consumers de cada grupo que viven en este proceso. Cuando
+    todos los miembros esperados de un grupo están aquí, los mensajes se
+    entregan llamando directamente a su handler en lugar de hacer un viaje de
+    ida y vuelta a Redis. Si falta alguno (está en otro worker o aún no se ha
+    conectado), se usa el channel layer como siempre.
+    """
+
+    def __init__(self):
+        self.groups = {}    # Mapea grupos a {channel_name: consumer}
+        self.expected = {}  # Mapea grupos al número de miembros esperados
+        self.local_sends = 0
+        self.layer_sends = 0
+
+    async def group_add(self, group, consumer, expected=None):
+        """
+        Añade el consumer al grupo en el channel layer y en el registro local.
+        Sin `expected` el grupo siempre se envía por el channel layer.
+        """
+        await consumer.channel_layer.group_add(group, consumer.channel_name)
+        self.groups.setdefault(group, {})[consumer.channel_name] = consumer
+        if expected:
+            self.expected[group] = expected
+
+    async def group_discard(self, group, consumer):
+        await consumer.channel_layer.group_discard(group, consumer.channel_name)
+        members = self.groups.get(group)
+        if members is None:
+            return
+        members.pop(consumer.channel_name, None)
+        if not members:
+            del self.groups[group]
+            self.expected.pop(group, None)
+
+    def local_members(self, group):
+        """Consumers del grupo si están todos en este proceso, si no None."""
+        members = self.groups.get(group)
+        expected = self.expected.get(group)
+        if not members or expected is None or len(members) < expected:
+            return None
+        return list(members.values())
+
+    async def group_send(self, channel_layer, group, message):
+        members = self.local_members(group)
+        if members is None:
+            self.layer_sends += 1
+            await channel_layer.group_send(group, message)
+            return
+
+        self.local_sends += 1
+        handler_name = get_handler_name(message)
+        for consumer in members:
+            try:
+                await getattr(consumer, handler_name)(message)
+            except Exception as e:
+                print(
+                    f"[ERROR] Error entregando {message['type']} a {consumer.channel_name}: {e}")
+
+    def stats(self):
+        return {
+            'local_groups': len(self.groups),
+            'local_sends': self.local_sends,
+            'layer_sends': self.layer_sends,
+        }
+
+
+# Instancia única por proceso
+fanout = LocalFanout()
@@ -0,0 +1,307 @@
+"""
+Dónde se guardan los resultados de los torneos. pong.chain y las vistas usan
+el libro elegido con BLOCKCHAIN_BACKEND:
+
+- 'web3': el contrato Tournament en Ganache (pong.blockchain).
+- 'memory': una copia del contrato en memoria del proceso, que se pierde al
+  reiniciar y no se comparte entre workers (con varios, el historial es una
+  mezcla de los libros de todos; pensado para un solo worker).
+- 'sqlite': la misma copia en un fichero SQLite (BLOCKCHAIN_SQLITE_PATH) que
+  comparten todos los procesos de la máquina.
+
+Los dos últimos se comportan como el contrato (claves de idempotencia,
+lecturas por rangos, un bloque por transacción) y tardan
+BLOCKCHAIN_LATENCY_MS en cada llamada, para probar y medir los torneos y el
+historial sin Ganache ni Truffle.
+
+Las entradas son tuplas con los campos de Match en el orden del contrato
+(pong.chain.CONTRACT_FIELDS) y las transacciones se identifican con un hash
+en hexadecimal.
+"""
+import asyncio
+import sqlite3
+import threading
+import time
+from django.conf import settings
+from web3 import Web3
+from web3.exceptions import TimeExhausted
+from pong.blockchain import blockchain
+
+# Columnas de la tabla de torneos del libro SQLite, en el orden del contrato
+LEDGER_COLUMNS = ('player_id_1', 'player_id_2', 'player_id_3', 'player_id_4',
+                  'score_1', 'score_2', 'score_3', 'score_4',
+                  'score_final_1', 'score_final_2')
+
+
+class Ledger:
+    """
+    Interfaz de los libros. Las llamadas son asíncronas salvo match(), que
+    usan las vistas.
+    """
+
+    # Si todos los workers ven el mismo libro. Si no, pong.chain no borra la
+    # copia compartida en TournamentRecord cuando no coincide con el suyo
+    shared = True
+
+    async def save_matches(self, keys, entries):
+        """Guarda cada entrada con su clave, omitiendo las claves ya guardadas. Devuelve el hash."""
+        raise NotImplementedError
+
+    async def wait_for_receipt(self, tx_hash, timeout):
+        """
+        Recibo de una transacción: {'status', 'block_number', 'saved'}, con
+        saved = {clave: índice} de las entradas que guardó. None si no se ha
+        minado en `timeout` segundos.
+        """
+        raise NotImplementedError
+
+    async def index_of(self, key):
+        """Índice de la entrada guardada con esa clave, o None."""
+        raise NotImplementedError
+
+    async def match_count(self):
+        raise NotImplementedError
+
+    async def get_matches(self, offset, limit):
+        """Hasta `limit` entradas a partir de `offset`."""
+        raise NotImplementedError
+
+    def match(self, index):
+        """Una entrada, de forma síncrona."""
+        raise NotImplementedError
+
+
+class Web3Ledger(Ledger):
+    """El contrato Tournament a través del cliente compartido de pong.blockchain."""
+
+    async def save_matches(self, keys, entries):
+        contract = await blockchain.async_contract()
+        tx_hash = await contract.functions.saveMatches(keys, entries).transact()
+        return Web3.to_hex(tx_hash)
+
+    async def wait_for_receipt(self, tx_hash, timeout):
+        contract = await blockchain.async_contract()
+        try:
+            receipt = await blockchain.async_web3.eth.wait_for_transaction_receipt(
+                tx_hash, timeout=timeout)
+        except TimeExhausted:
+            return None
+        # Cada evento MatchSaved dice en qué posición ha quedado la clave guardada
+        return {
+            'status': receipt['status'],
+            'block_number': receipt['blockNumber'],
+            'saved': {event['args']['key']: event['args']['index']
+                      for event in contract.events.MatchSaved().process_receipt(receipt)},
+        }
+
+    async def index_of(self, key):
+        contract = await blockchain.async_contract()
+        saved = await contract.functions.indexOf(key).call()
+        return saved - 1 if saved else None
+
+    async def match_count(self):
+        contract = await blockchain.async_contract()
+        return await contract.functions.matchCount().call()
+
+    async def get_matches(self, offset, limit):
+        contract = await blockchain.async_contract()
+        return await contract.functions.getMatches(offset, limit).call()
+
+    def match(self, index):
+        return blockchain.contract().functions.matches(index).call()
+
+
+class LocalLedger(Ledger):
+    """
+    Base de los libros locales: cada llamada espera la latencia simulada y
+    ejecuta la operación síncrona en un hilo, como haría una petición al nodo.
+    """
+
+    def __init__(self, latency_ms=0):
+        self.latency = latency_ms / 1000
+
+    async def call(self, operation, *args):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return await asyncio.to_thread(operation, *args)
+
+    async def save_matches(self, keys, entries):
+        if len(keys) != len(entries):
+            # El contrato revierte la transacción entera
+            raise ValueError("keys and data length mismatch")
+        block_number = await self.call(self.save, keys, [tuple(entry) for entry in entries])
+        return f"0x{block_number:064x}"
+
+    async def wait_for_receipt(self, tx_hash, timeout):
+        # Cada transacción se mina al recibirla, como en Ganache
+        saved = await self.call(self.saved_in, int(tx_hash, 16))
+        if saved is None:
+            return None
+        return {'status': 1, 'block_number': int(tx_hash, 16), 'saved': saved}
+
+    async def index_of(self, key):
+        return await self.call(self.find, key)
+
+    async def match_count(self):
+        return await self.call(self.count)
+
+    async def get_matches(self, offset, limit):
+        return await self.call(self.read, offset, limit)
+
+    def match(self, index):
+        if self.latency:
+            time.sleep(self.latency)
+        entries = self.read(index, 1)
+        if not entries:
+            raise IndexError(f"No hay ningún torneo #{index}")
+        return entries[0]
+
+    # Operaciones de cada libro
+    def save(self, keys, entries):
+        """Guarda las entradas nuevas en un bloque nuevo. Devuelve su número."""
+        raise NotImplementedError
+
+    def saved_in(self, block_number):
+        """{clave: índice} de las entradas guardadas en el bloque, o None si no existe."""
+        raise NotImplementedError
+
+    def find(self, key):
+        raise NotImplementedError
+
+    def count(self):
+        raise NotImplementedError
+
+    def read(self, offset, limit):
+        raise NotImplementedError
+
+
+class MemoryLedger(LocalLedger):
+    shared = False
+
+    def __init__(self, latency_ms=0):
+        super().__init__(latency_ms)
+        self.matches = []
+        self.indexes = {}  # Clave -> índice
+        self.blocks = []   # {clave: índice} guardados en cada bloque
+        self.lock = threading.Lock()
+
+    def save(self, keys, entries):
+        with self.lock:
+            saved = {}
+            for key, entry in zip(keys, entries):
+                if key in self.indexes:
+                    continue
+                self.indexes[key] = saved[key] = len(self.matches)
+                self.matches.append(entry)
+            self.blocks.append(saved)
+            return len(self.blocks)
+
+    def saved_in(self, block_number):
+        with self.lock:
+            if not 0 < block_number <= len(self.blocks):
+                return None
+            return dict(self.blocks[block_number - 1])
+
+    def find(self, key):
+        with self.lock:
+            return self.indexes.get(key)
+
+    def count(self):
+        with self.lock:
+            return len(self.matches)
+
+    def read(self, offset, limit):
+        with self.lock:
+            return self.matches[offset:offset + limit]
+
+
+class SqliteLedger(LocalLedger):
+    def __init__(self, path, latency_ms=0):
+        super().__init__(latency_ms)
+        self.path = path
+        self.created = False
+
+    def connect(self):
+        # Una conexión por operación: se llaman desde hilos distintos
+        connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        if not self.created:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("CREATE TABLE IF NOT EXISTS blocks ("
+                               "number INTEGER PRIMARY KEY AUTOINCREMENT)")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS matches ("
+                "idx INTEGER PRIMARY KEY, key BLOB UNIQUE NOT NULL, block INTEGER NOT NULL, "
+                + ", ".join(f"{column} INTEGER NOT NULL" for column in LEDGER_COLUMNS) + ")")
+            connection.execute("CREATE INDEX IF NOT EXISTS matches_block ON matches (block)")
+            self.created = True
+        return connection
+
+    def save(self, keys, entries):
+        connection = self.connect()
+        try:
+            # Escritura exclusiva: los índices no se repiten entre procesos
+            connection.execute("BEGIN IMMEDIATE")
+            block_number = connection.execute("INSERT INTO blocks DEFAULT VALUES").lastrowid
+            index = connection.execute("SELECT COUNT(*) FROM matches").fetchone()[0]
+            for key, entry in zip(keys, entries):
+                inserted = connection.execute(
+                    f"INSERT OR IGNORE INTO matches (idx, key, block, {', '.join(LEDGER_COLUMNS)}) "
+                    f"VALUES (?, ?, ?{', ?' * len(LEDGER_COLUMNS)})",
+                    (index, key, block_number, *entry)).rowcount
+                index += inserted
+            connection.execute("COMMIT")
+            return block_number
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        finally:
+            connection.close()
+
+    def saved_in(self, block_number):
+        if block_number >= 2 ** 63:
+            # Hash de una transacción real (de antes de cambiar de libro)
+            return None
+        connection = self.connect()
+        try:
+            if connection.execute("SELECT 1 FROM blocks WHERE number = ?",
+                                  (block_number,)).fetchone() is None:
+                return None
+            return dict(connection.execute(
+                "SELECT key, idx FROM matches WHERE block = ?", (block_number,)))
+        finally:
+            connection.close()
+
+    def find(self, key):
+        connection = self.connect()
+        try:
+            row = connection.execute("SELECT idx FROM matches WHERE key = ?", (key,)).fetchone()
+            return row[0] if row else None
+        finally:
+            connection.close()
+
+    def count(self):
+        connection = self.connect()
+        try:
+            return connection.execute("SELECT COUNT(*) FROM matches").fetchone()[0]
+        finally:
+            connection.close()
+
+    def read(self, offset, limit):
+        connection = self.connect()
+        try:
+            return [tuple(row) for row in connection.execute(
+                f"SELECT {', '.join(LEDGER_COLUMNS)} FROM matches "
+                "WHERE idx >= ? ORDER BY idx LIMIT ?", (offset, limit))]
+        finally:
+            connection.close()
+
+
+LEDGERS = {
+    'web3': Web3Ledger,
+    'memory': lambda: MemoryLedger(settings.BLOCKCHAIN_LATENCY_MS),
+    'sqlite': lambda: SqliteLedger(settings.BLOCKCHAIN_SQLITE_PATH,
+                                   settings.BLOCKCHAIN_LATENCY_MS),
+}
+
+# Instancia única por proceso
+ledger = LEDGERS[settings.BLOCKCHAIN_BACKEND]()
@@ -0,0 +1,11 @@
+import asyncio
+from django.core.management.base import BaseCommand
+from pong.chain import chain_writer
+
+
+class Command(BaseCommand):
+    help = ("Copia en el historial local los torneos del contrato que aún no "
+            "están. Los workers lo hacen solos; sirve para la primera carga.")
+
+    def handle(self, *args, **options):
+        asyncio.run(chain_writer.sync())
@@ -0,0 +1,193 @@
+"""
+Cola de matchmaking de Pong compartida por todos los workers ASGI en Redis.
+Las operaciones son scripts Lua, así que sacar parejas es atómico: el
+worker que las saca es el único que las recibe y pasa a ser el propietario de
+sus salas.
+
+Los jugadores esperan en buckets según su nivel (partidas ganadas) y su
+latencia medida al conectarse. Cada bucket es un ZSET ordenado por instante
+de entrada y la pertenencia a la cola se consulta en un HASH, así que entrar,
+salir cuestan O(log n) con n jugadores en cola.
+
+El emparejamiento no lo hacen las conexiones: un bucle en segundo plano vacía
+la cola cada MATCHMAKING_INTERVAL_MS y forma todas las parejas posibles de
+una vez.
+"""
+import asyncio
+import time
+import redis.asyncio as redis
+from django.conf import settings
+
+QUEUE_PREFIX = 'pong:queue:'             # Un ZSET por bucket: user_id -> instante de entrada
+BUCKETS_KEY = 'pong:queue:buckets'       # SET de buckets con jugadores
+CHANNELS_KEY = 'pong:queue:channels'     # HASH: user_id -> channel_name
+MEMBERS_KEY = 'pong:queue:members'       # HASH: user_id -> bucket
+
+RATING_BUCKET_SIZE = 5             # Partidas ganadas por bucket de nivel
+MAX_RATING_BUCKET = 20
+RTT_BUCKETS_MS = (50, 150)         # Límites de los buckets de latencia
+
+# KEYS: channels, members, buckets, zset del bucket
+# ARGV: user_id, channel_name, instante, bucket
+# Añade al jugador si no estaba en cola; si ya estaba, actualiza su canal
+ENQUEUE = """
+redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+if redis.call('HSETNX', KEYS[2], ARGV[1], ARGV[4]) == 0 then
+    return 0
+end
+redis.call('ZADD', KEYS[4], ARGV[3], ARGV[1])
+redis.call('SADD', KEYS[3], ARGV[4])
+return 1
+"""
+
+# KEYS: channels, members, buckets, zsets de los buckets con jugadores
+# ARGV: máximo de parejas, nombres de esos buckets en orden
+# Saca de la cola hasta ese número de parejas. Los jugadores se recorren por
+# bucket y por orden de llegada y se emparejan de dos en dos, así que casi
+# todos juegan contra alguien de su bucket y los que sobran contra el del
+# bucket siguiente. Si queda uno suelto, sigue en cola.
+DRAIN = """
+local limit = tonumber(ARGV[1]) * 2
+local players = {}
+local sources = {}
+for i = 4, #KEYS do
+    local members = redis.call('ZRANGE', KEYS[i], 0, limit - #players - 1)
+    for _, member in ipairs(members) do
+        players[#players + 1] = member
+        sources[#sources + 1] = i
+    end
+    if #players >= limit then
+        break
+    end
+end
+if #players % 2 == 1 then
+    players[#players] = nil
+end
+local result = {}
+for j, player in ipairs(players) do
+    local key = KEYS[sources[j]]
+    local bucket = ARGV[sources[j] - 2]
+    redis.call('ZREM', key, player)
+    if redis.call('ZCARD', key) == 0 then
+        redis.call('SREM', KEYS[3], bucket)
+    end
+    result[#result + 1] = player
+    result[#result + 1] = redis.call('HGET', KEYS[1], player)
+    result[#result + 1] = bucket
+    redis.call('HDEL', KEYS[1], player)
+    redis.call('HDEL', KEYS[2], player)
+end
+return result
+"""
+
+# KEYS: channels, members, buckets, zset del bucket
+# ARGV: user_id, channel_name, bucket
+# Saca al jugador solo si sigue en cola con esta conexión (no con una nueva)
+LEAVE = """
+if redis.call('HGET', KEYS[1], ARGV[1]) ~= ARGV[2] or
+        redis.call('HGET', KEYS[2], ARGV[1]) ~= ARGV[3] then
+    return 0
+end
+redis.call('HDEL', KEYS[1], ARGV[1])
+redis.call('HDEL', KEYS[2], ARGV[1])
+redis.call('ZREM', KEYS[4], ARGV[1])
+if redis.call('ZCARD', KEYS[4]) == 0 then
+    redis.call('SREM', KEYS[3], ARGV[3])
+end
+return 1
+"""
+
+
+def bucket_for(games_won, rtt_ms):
+    """Bucket 'nivel:latencia' de un jugador."""
+    rating = min(games_won // RATING_BUCKET_SIZE, MAX_RATING_BUCKET)
+    latency = sum(rtt_ms > limit for limit in RTT_BUCKETS_MS)
+    return f'{rating}:{latency}'
+
+
+def bucket_key(bucket):
+    """Orden de los buckets: por nivel y, dentro de cada nivel, por latencia."""
+    return tuple(map(int, bucket.split(':')))
+
+
+class Matchmaker:
+    def __init__(self):
+        self.redis = None
+        self.task = None
+
+    def client(self):
+        # El cliente se crea dentro del bucle de eventos que lo va a usar
+        if self.redis is None:
+            self.redis = redis.Redis(
+                host=settings.REDIS_HOST,
+                port=settings.REDIS_PORT,
+                password=settings.REDIS_PASSWORD,
+                decode_responses=True,
+            )
+            self.enqueue_script = self.redis.register_script(ENQUEUE)
+            self.drain_script = self.redis.register_script(DRAIN)
+            self.leave_script = self.redis.register_script(LEAVE)
+        return self.redis
+
+    async def enqueue(self, user_id, channel_name, bucket):
+        """Pone al jugador en cola. Devuelve False si ya estaba."""
+        self.client()
+        added = await self.enqueue_script(
+            keys=[CHANNELS_KEY, MEMBERS_KEY, BUCKETS_KEY, QUEUE_PREFIX + bucket],
+            args=[user_id, channel_name, time.time(), bucket])
+        return bool(added)
+
+    async def pop_pairs(self, limit):
+        """
+        Saca de la cola hasta `limit` parejas en una sola llamada. Devuelve
+        una lista de ((player1_id, canal, bucket), (player2_id, canal, bucket)).
+        """
+        client = self.client()
+        buckets = sorted(await client.smembers(BUCKETS_KEY), key=bucket_key)
+        if not buckets:
+            return []
+        flat = await self.drain_script(
+            keys=[CHANNELS_KEY, MEMBERS_KEY, BUCKETS_KEY] +
+            [QUEUE_PREFIX + bucket for bucket in buckets],
+            args=[limit] + buckets)
+        players = [(int(flat[i]), flat[i + 1], flat[i + 2])
+                   for i in range(0, len(flat), 3)]
+        return list(zip(players[0::2], players[1::2]))
+
+    def start(self, on_pairs):
+        """
+        Arranca el bucle de emparejamiento de este proceso (solo la primera
+        vez). `on_pairs` es un handler async(parejas) que crea las partidas.
+        """
+        if self.task is not None and not self.task.done():
+            return
+        self.task = asyncio.create_task(self.run(on_pairs))
+        print("[DEBUG] Bucle de matchmaking iniciado")
+
+    async def run(self, on_pairs):
+        # Cada worker vacía la cola periódicamente; el script es atómico, así
+        # que cada pareja la recibe un único worker, que pasa a ser su propietario
+        interval = settings.MATCHMAKING_INTERVAL_MS / 1000
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                pairs = await self.pop_pairs(settings.MATCHMAKING_BATCH_SIZE)
+                if pairs:
+                    await on_pairs(pairs)
+            except Exception as e:
+                print(f"[ERROR] Error en el bucle de matchmaking: {e}")
+
+    async def leave(self, user_id, channel_name):
+        bucket = await self.client().hget(MEMBERS_KEY, user_id)
+        if bucket is None:
+            return
+        await self.leave_script(
+            keys=[CHANNELS_KEY, MEMBERS_KEY, BUCKETS_KEY, QUEUE_PREFIX + bucket],
+            args=[user_id, channel_name, bucket])
+
+    async def size(self):
+        return await self.client().hlen(MEMBERS_KEY)
+
+
+# Instancia única por proceso
+matchmaker = Matchmaker()
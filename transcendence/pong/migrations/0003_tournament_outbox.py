@@ -0,0 +1,50 @@
+# Generated by Django 4.2.19 on 2026-10-18 10:50
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pong', '0002_history'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TournamentOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('payload', models.JSONField()),
+                ('status', models.CharField(db_index=True, default='pending', max_length=10)),
+                ('attempts', models.IntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('tx_hash', models.CharField(blank=True, max_length=66)),
+                ('block_number', models.BigIntegerField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='TournamentRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('chain_index', models.PositiveIntegerField(unique=True)),
+                ('player_id_1', models.CharField(blank=True, max_length=100)),
+                ('player_id_2', models.CharField(blank=True, max_length=100)),
+                ('player_id_3', models.CharField(blank=True, max_length=100)),
+                ('player_id_4', models.CharField(blank=True, max_length=100)),
+                ('score_match_1_2', models.CharField(max_length=20)),
+                ('score_match_3_4', models.CharField(max_length=20)),
+                ('score_match_final', models.CharField(max_length=20)),
+                ('synced_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-chain_index'],
+            },
+        ),
+    ]
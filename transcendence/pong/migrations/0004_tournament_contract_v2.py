@@ -0,0 +1,18 @@
+# Generated by Django 4.2.19 on 2026-10-18 10:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pong', '0003_tournament_outbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tournamentoutbox',
+            name='chain_index',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
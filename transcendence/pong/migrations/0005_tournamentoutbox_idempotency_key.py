@@ -0,0 +1,31 @@
+import uuid
+from django.db import migrations, models
+
+
+def generate_keys(apps, schema_editor):
+    TournamentOutbox = apps.get_model('pong', 'TournamentOutbox')
+    for entry in TournamentOutbox.objects.all():
+        entry.idempotency_key = uuid.uuid4()
+        entry.save(update_fields=['idempotency_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pong', '0004_tournament_contract_v2'),
+    ]
+
+    operations = [
+        # Primero sin unique para dar una clave distinta a las filas que ya hay
+        migrations.AddField(
+            model_name='tournamentoutbox',
+            name='idempotency_key',
+            field=models.UUIDField(null=True, editable=False),
+        ),
+        migrations.RunPython(generate_keys, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='tournamentoutbox',
+            name='idempotency_key',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, unique=True),
+        ),
+    ]
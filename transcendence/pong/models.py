@@ -1,4 +1,6 @@
+import uuid
 from django.db import models
+from django.utils import timezone
 from users.models import User
 
 class History(models.Model):
@@ -58,3 +60,59 @@ class Game(models.Model):
         """
         import uuid
         return str(uuid.uuid4())
+
+
+class TournamentOutbox(models.Model):
+    """
+    Resultado de un torneo pendiente de guardar en la blockchain. Lo escribe
+    el worker al terminar el torneo y lo vacía pong.chain en segundo plano.
+    """
+    PENDING = 'pending'      # Por enviar (o por reintentar desde next_attempt_at)
+    SENDING = 'sending'      # Reclamado por un worker que está enviando la transacción
+    SENT = 'sent'            # Transacción enviada, esperando su recibo
+    CONFIRMED = 'confirmed'  # Minada con éxito
+    FAILED = 'failed'        # Agotados los reintentos
+
+    # Campos de Match con los nombres del contrato (pong.chain.CONTRACT_FIELDS)
+    payload = models.JSONField()
+    # El contrato ignora un torneo cuya clave ya tiene, así que reenviarlo
+    # tras perder un recibo no lo guarda dos veces
+    idempotency_key = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    status = models.CharField(max_length=10, default=PENDING, db_index=True)
+    attempts = models.IntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    tx_hash = models.CharField(max_length=66, blank=True)
+    block_number = models.BigIntegerField(null=True, blank=True)
+    # Posición en el array matches del contrato, sacada del evento MatchSaved
+    chain_index = models.PositiveIntegerField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Torneo en cola {self.pk} ({self.status}, {self.attempts} intentos)"
+
+    class Meta:
+        ordering = ['id']
+
+
+class TournamentRecord(models.Model):
+    """
+    Copia local de un torneo guardado en el contrato, por su índice en el
+    array matches. La rellena pong.chain y es lo que pagina el historial.
+    """
+    chain_index = models.PositiveIntegerField(unique=True)
+    player_id_1 = models.CharField(max_length=100, blank=True)
+    player_id_2 = models.CharField(max_length=100, blank=True)
+    player_id_3 = models.CharField(max_length=100, blank=True)
+    player_id_4 = models.CharField(max_length=100, blank=True)
+    score_match_1_2 = models.CharField(max_length=20)
+    score_match_3_4 = models.CharField(max_length=20)
+    score_match_final = models.CharField(max_length=20)
+    synced_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Torneo #{self.chain_index} (final {self.score_match_final})"
+
+    class Meta:
+        ordering = ['-chain_index']
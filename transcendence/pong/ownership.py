@@ -0,0 +1,187 @@
+"""
+Reparto de salas entre los workers ASGI. Cada worker se registra en Redis
+con latidos periódicos y todos construyen el mismo anillo de hash consistente
+con los que siguen vivos. El anillo decide qué worker es el propietario de
+cada room_id, match_id o token de torneo: es el único que guarda su estado y
+lo simula, y las conexiones que caen en otro worker le envían sus mensajes
+por el channel layer (ver pong.worker).
+
+Cuando un worker entra en el anillo solo cambian de dueño las claves de sus
+tramos, así que la propiedad de las salas que ya existen se fija en Redis al
+crearlas y no se mueve mientras su worker siga vivo. Si deja de latir, la
+siguiente consulta se la asigna al worker que indica el anillo.
+"""
+import asyncio
+import bisect
+import hashlib
+import time
+import redis.asyncio as redis
+from django.conf import settings
+from pong.worker import worker
+
+WORKERS_KEY = 'pong:workers'  # ZSET: canal del worker -> último latido
+OWNERS_KEY = 'pong:owners'    # HASH: clave de la sala -> canal del propietario
+
+REPLICAS = 64            # Puntos de cada worker en el anillo
+MAX_KEY_ATTEMPTS = 64    # Intentos de local_key() antes de aceptar cualquier clave
+
+# KEYS: owners, workers
+# ARGV: clave, candidato, latido mínimo de un worker vivo
+# Devuelve {propietario, registrada}. Si el propietario registrado ya no late,
+# la sala pasa al candidato; las claves sin registrar no se escriben.
+CLAIM = """
+local owner = redis.call('HGET', KEYS[1], ARGV[1])
+if not owner then
+    return {ARGV[2], 0}
+end
+local beat = redis.call('ZSCORE', KEYS[2], owner)
+if beat and tonumber(beat) >= tonumber(ARGV[3]) then
+    return {owner, 1}
+end
+redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+return {ARGV[2], 1}
+"""
+
+# KEYS: owners
+# ARGV: clave, canal del worker
+# Libera la sala solo si sigue siendo de este worker
+RELEASE = """
+if redis.call('HGET', KEYS[1], ARGV[1]) == ARGV[2] then
+    return redis.call('HDEL', KEYS[1], ARGV[1])
+end
+return 0
+"""
+
+
+def ring_point(value):
+    return int.from_bytes(hashlib.sha1(value.encode()).digest()[:8], 'big')
+
+
+class HashRing:
+    """Anillo de hash consistente con REPLICAS puntos por worker."""
+
+    def __init__(self, nodes=(), replicas=REPLICAS):
+        self.nodes = frozenset(nodes)
+        points = sorted((ring_point(f'{node}#{i}'), node)
+                        for node in self.nodes for i in range(replicas))
+        self.points = [point for point, _ in points]
+        self.owners = [node for _, node in points]
+
+    def lookup(self, key):
+        """Worker al que corresponde `key`, o None si el anillo está vacío."""
+        if not self.points:
+            return None
+        i = bisect.bisect(self.points, ring_point(key)) % len(self.points)
+        return self.owners[i]
+
+
+class Ownership:
+    def __init__(self):
+        self.redis = None
+        self.ring = HashRing()
+        self.owners = {}  # Caché de propietarios registrados: clave -> canal
+        self.task = None
+
+    def client(self):
+        # El cliente se crea dentro del bucle de eventos que lo va a usar
+        if self.redis is None:
+            self.redis = redis.Redis(
+                host=settings.REDIS_HOST,
+                port=settings.REDIS_PORT,
+                password=settings.REDIS_PASSWORD,
+                decode_responses=True,
+            )
+            self.claim_script = self.redis.register_script(CLAIM)
+            self.release_script = self.redis.register_script(RELEASE)
+        return self.redis
+
+    async def start(self):
+        """Arranca el canal del worker y sus latidos (solo la primera vez)."""
+        if self.task is not None and not self.task.done():
+            return
+        await worker.start()
+        await self.heartbeat()
+        self.task = asyncio.create_task(self.run())
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(settings.OWNERSHIP_HEARTBEAT_S)
+            try:
+                await self.heartbeat()
+            except Exception as e:
+                print(f"[ERROR] Error en el latido del worker: {e}")
+
+    async def heartbeat(self):
+        """Renueva el registro de este worker y rehace el anillo con los vivos."""
+        now = time.time()
+        pipe = self.client().pipeline(transaction=False)
+        pipe.zadd(WORKERS_KEY, {worker.channel_name: now})
+        pipe.zremrangebyscore(
+            WORKERS_KEY, '-inf', f'({now - settings.OWNERSHIP_WORKER_TTL_S}')
+        pipe.zrange(WORKERS_KEY, 0, -1)
+        _, _, alive = await pipe.execute()
+        self.update(alive)
+
+    def update(self, alive):
+        alive = frozenset(alive)
+        if alive == self.ring.nodes:
+            return
+        for node in alive - self.ring.nodes:
+            print(f"[DEBUG] Worker {node} se ha unido al anillo")
+        for node in self.ring.nodes - alive:
+            print(f"[WARNING] Worker {node} ha dejado de responder")
+        self.ring = HashRing(alive)
+        # Las salas de los workers caídos se reasignan en la próxima consulta
+        self.owners = {key: owner for key, owner in self.owners.items()
+                       if owner in alive}
+
+    def is_local(self, owner):
+        return owner == worker.channel_name
+
+    def local_key(self, generate):
+        """
+        Genera claves con `generate()` hasta dar con una que el anillo asigna
+        a este worker, para crear salas sin tener que reenviarlas a otro.
+        """
+        for _ in range(MAX_KEY_ATTEMPTS):
+            key = generate()
+            if self.ring.lookup(key) in (None, worker.channel_name):
+                break
+        return key
+
+    async def claim(self, key):
+        """Registra a este worker como propietario de una sala nueva."""
+        await self.client().hset(OWNERS_KEY, key, worker.channel_name)
+        self.owners[key] = worker.channel_name
+
+    async def owner(self, key):
+        """Canal del worker propietario de `key`."""
+        owner = self.owners.get(key)
+        if owner is not None:
+            return owner
+        self.client()
+        candidate = self.ring.lookup(key) or worker.channel_name
+        owner, claimed = await self.claim_script(
+            keys=[OWNERS_KEY, WORKERS_KEY],
+            args=[key, candidate, time.time() - settings.OWNERSHIP_WORKER_TTL_S])
+        if claimed:
+            self.owners[key] = owner
+        return owner
+
+    async def route(self, key, message):
+        """Entrega `message` al handler de worker del propietario de `key`."""
+        owner = await self.owner(key)
+        if self.is_local(owner):
+            await worker.handle(message)
+        else:
+            await worker.send(owner, message)
+
+    async def release(self, key):
+        """Libera una sala terminada de este worker."""
+        self.owners.pop(key, None)
+        self.client()
+        await self.release_script(keys=[OWNERS_KEY], args=[key, worker.channel_name])
+
+
+# Instancia única por proceso
+ownership = Ownership()
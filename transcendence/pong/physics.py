@@ -0,0 +1,366 @@
+import numpy as np
+from pong import engine
+from pong.engine import (HALF_PADDLE, LCG_INCREMENT, LCG_MASK, LCG_MULTIPLIER,
+                         MOVED, POINT_PAUSE, SCORED, FINISHED)
+
+# Arrays por slot: (nombre, tipo, valor inicial)
+FIELDS = (
+    ('ball_x', np.float64, 0.5),
+    ('ball_y', np.float64, 0.5),
+    ('ball_dx', np.float64, 0.0),
+    ('ball_dy', np.float64, 0.0),
+    ('left_paddle', np.float64, 0.5),
+    ('right_paddle', np.float64, 0.5),
+    ('pause', np.float64, 0.0),
+    ('seed', np.int64, 0),
+    ('score1', np.int32, 0),
+    ('score2', np.int32, 0),
+    ('active', np.bool_, False),
+    # Parámetros del modo de juego de cada sala (engine.GameConfig)
+    ('base_speed', np.float64, 0.0),
+    ('interval', np.float64, 1.0),
+    ('left_limit', np.float64, 0.0),
+    ('right_limit', np.float64, 1.0),
+    ('win_score', np.int32, 0),
+)
+
+
+class BatchPhysics:
+    """
+    Estado físico de todas las salas activas guardado como struct-of-arrays.
+    Cada sala ocupa un slot de los arrays y step() aplica las mismas reglas que
+    engine.step() a todas a la vez con operaciones vectorizadas de NumPy;
+    compare_backends() comprueba que las trayectorias no se separan.
+    """
+
+    def __init__(self, capacity=64):
+        self.capacity = 0
+        self.size = 0            # Marca de agua: slots [0, size) en uso o libres
+        self.slots = {}          # Mapea room_ids a su slot
+        self.room_ids = []       # Mapea slots a room_ids (None si está libre)
+        self.free = []           # Slots libres para reutilizar
+        self.xs = []             # Posiciones de la bola del último tick
+        self.ys = []
+        self.moved = []          # Si la sala se movió en el último tick
+        self.inputs = set()      # Salas con paletas movidas desde el último step()
+        self.changed = set()     # Salas con paletas movidas en el último step()
+        self.grow(capacity)
+
+    def grow(self, capacity):
+        """Reserva arrays más grandes conservando los slots existentes."""
+        for name, dtype, fill in FIELDS:
+            new = np.full(capacity, fill, dtype=dtype)
+            if self.capacity:
+                new[:self.capacity] = getattr(self, name)
+            setattr(self, name, new)
+        self.room_ids.extend([None] * (capacity - self.capacity))
+        self.capacity = capacity
+
+    def add(self, room_id, config, seed=None):
+        """Reserva un slot para la sala y saca la bola desde el centro."""
+        if self.free:
+            slot = self.free.pop()
+        else:
+            if self.size == self.capacity:
+                self.grow(self.capacity * 2)
+            slot = self.size
+            self.size += 1
+        state = engine.GameState(config, seed)
+        self.slots[room_id] = slot
+        self.room_ids[slot] = room_id
+        self.base_speed[slot] = config.base_speed
+        self.interval[slot] = config.interval
+        self.left_limit[slot] = config.left_limit
+        self.right_limit[slot] = config.right_limit
+        self.win_score[slot] = config.win_score
+        self.ball_x[slot] = state.ball_x
+        self.ball_y[slot] = state.ball_y
+        self.ball_dx[slot] = state.ball_dx
+        self.ball_dy[slot] = state.ball_dy
+        self.seed[slot] = state.seed
+        self.left_paddle[slot] = 0.5
+        self.right_paddle[slot] = 0.5
+        self.score1[slot] = 0
+        self.score2[slot] = 0
+        self.pause[slot] = 0
+        self.active[slot] = True
+        if slot < len(self.xs):
+            self.xs[slot] = state.ball_x
+            self.ys[slot] = state.ball_y
+            self.moved[slot] = False
+        return slot
+
+    def remove(self, room_id):
+        slot = self.slots.pop(room_id, None)
+        if slot is None:
+            return
+        self.active[slot] = False
+        self.ball_dx[slot] = 0
+        self.ball_dy[slot] = 0
+        self.room_ids[slot] = None
+        self.free.append(slot)
+        self.inputs.discard(room_id)
+        self.changed.discard(room_id)
+
+    def __contains__(self, room_id):
+        return room_id in self.slots
+
+    def __len__(self):
+        return len(self.slots)
+
+    def serve(self, slots):
+        """Versión vectorizada de engine.serve()."""
+        seed = (self.seed[slots] * LCG_MULTIPLIER + LCG_INCREMENT) & LCG_MASK
+        self.seed[slots] = seed
+        speed = self.base_speed[slots]
+        self.ball_x[slots] = 0.5
+        self.ball_y[slots] = 0.5
+        self.ball_dx[slots] = np.where(seed & 0x10000, speed, -speed)
+        self.ball_dy[slots] = np.where(
+            seed & 0x20000, speed * 0.8, -speed * 0.8)
+
+    def set_paddle(self, room_id, side, position):
+        slot = self.slots[room_id]
+        if side == 'left':
+            self.left_paddle[slot] = position
+        else:
+            self.right_paddle[slot] = position
+        self.inputs.add(room_id)
+
+    def paddle(self, room_id, side):
+        slot = self.slots[room_id]
+        paddles = self.left_paddle if side == 'left' else self.right_paddle
+        return float(paddles[slot])
+
+    def paddles(self, room_id):
+        slot = self.slots[room_id]
+        return float(self.left_paddle[slot]), float(self.right_paddle[slot])
+
+    def scores(self, room_id):
+        slot = self.slots[room_id]
+        return int(self.score1[slot]), int(self.score2[slot])
+
+    def position(self, room_id):
+        """Posición de la bola tras el último step()."""
+        slot = self.slots[room_id]
+        if slot < len(self.xs):
+            return self.xs[slot], self.ys[slot]
+        # Sala añadida después del último step()
+        return float(self.ball_x[slot]), float(self.ball_y[slot])
+
+    def has_moved(self, room_id):
+        """Indica si la bola avanzó en el último step() (no estaba en pausa)."""
+        slot = self.slots[room_id]
+        return slot < len(self.moved) and self.moved[slot]
+
+    def paddles_changed(self, room_id):
+        """Indica si alguna paleta se movió antes del último step()."""
+        return room_id in self.changed
+
+    def has_changed(self, room_id):
+        """Indica si la sala tiene algo nuevo que enviar tras el último step()."""
+        return room_id in self.changed or self.has_moved(room_id)
+
+    def step(self, dt):
+        """
+        Avanza todas las salas activas un paso de dt segundos. Devuelve solo
+        las salas con eventos: {room_id: SCORED o FINISHED}.
+        """
+        self.changed, self.inputs = self.inputs, set()
+        n = self.size
+        if n == 0:
+            self.xs, self.ys, self.moved = [], [], []
+            return {}
+
+        x = self.ball_x[:n]
+        y = self.ball_y[:n]
+        dx = self.ball_dx[:n]
+        dy = self.ball_dy[:n]
+        left = self.left_paddle[:n]
+        right = self.right_paddle[:n]
+        base = self.base_speed[:n]
+        pause = self.pause[:n]
+        paused = pause > 0
+        pause[paused] -= dt
+        moving = self.active[:n] & ~paused
+
+        # Las velocidades están expresadas por el intervalo original de cada modo
+        scale = np.where(moving, dt / self.interval[:n], 0.0)
+        x += dx * scale
+        y += dy * scale
+
+        # Rebote en los bordes superior e inferior
+        hit = moving & ((y <= 0) | (y >= 1))
+        if hit.any():
+            dy[hit] *= -1.02
+            y[hit] = np.clip(y[hit], 0.01, 0.99)
+
+        # Colisión con la paleta izquierda (player1)
+        limit = self.left_limit[:n]
+        hit = (moving & (x <= limit) & (x >= -0.01) &
+               (y >= left - HALF_PADDLE) & (y <= left + HALF_PADDLE))
+        if hit.any():
+            dx[hit] *= -1.1
+            x[hit] = limit[hit]
+            dy[hit] = base[hit] * 1.5 * (y[hit] - left[hit]) / HALF_PADDLE
+
+        # Colisión con la paleta derecha (player2)
+        limit = self.right_limit[:n]
+        hit = (moving & (x >= limit) & (x <= 1.01) &
+               (y >= right - HALF_PADDLE) & (y <= right + HALF_PADDLE))
+        if hit.any():
+            dx[hit] *= -1.1
+            x[hit] = limit[hit]
+            dy[hit] = base[hit] * 1.5 * (y[hit] - right[hit]) / HALF_PADDLE
+
+        # Puntos: player2 si la bola sale por la izquierda, player1 por la derecha
+        point2 = moving & (x < 0)
+        point1 = moving & (x > 1)
+        events = {}
+        scored_slots = np.flatnonzero(point1 | point2)
+        if len(scored_slots):
+            self.score1[:n] += point1
+            self.score2[:n] += point2
+            self.serve(scored_slots)
+            pause[scored_slots] = POINT_PAUSE
+            win = self.win_score[scored_slots]
+            done = ((self.score1[scored_slots] >= win) |
+                    (self.score2[scored_slots] >= win))
+            room_ids = self.room_ids
+            for slot, ended in zip(scored_slots.tolist(), done.tolist()):
+                events[room_ids[slot]] = FINISHED if ended else SCORED
+
+        self.xs = x.tolist()
+        self.ys = y.tolist()
+        self.moved = moving.tolist()
+        return events
+
+    def take_lost(self):
+        """Salas perdidas desde la última llamada; en el proceso nunca se pierden."""
+        return []
+
+
+class EnginePhysics:
+    """
+    Backend escalar con la misma interfaz que BatchPhysics: un
+    engine.GameState por sala avanzado con engine.step(). Con pocas salas
+    activas sale más barato que pagar el coste fijo de las llamadas a NumPy.
+    """
+
+    def __init__(self):
+        self.states = {}  # Mapea room_ids a su GameState
+        self.moved = {}   # Mapea room_ids a si la bola avanzó en el último tick
+        self.inputs = set()
+        self.changed = set()
+
+    def add(self, room_id, config, seed=None):
+        self.states[room_id] = engine.GameState(config, seed)
+        self.moved[room_id] = False
+
+    def remove(self, room_id):
+        self.states.pop(room_id, None)
+        self.moved.pop(room_id, None)
+        self.inputs.discard(room_id)
+        self.changed.discard(room_id)
+
+    def __contains__(self, room_id):
+        return room_id in self.states
+
+    def __len__(self):
+        return len(self.states)
+
+    def set_paddle(self, room_id, side, position):
+        state = self.states[room_id]
+        if side == 'left':
+            state.left_paddle = position
+        else:
+            state.right_paddle = position
+        self.inputs.add(room_id)
+
+    def paddle(self, room_id, side):
+        state = self.states[room_id]
+        return state.left_paddle if side == 'left' else state.right_paddle
+
+    def paddles(self, room_id):
+        state = self.states[room_id]
+        return state.left_paddle, state.right_paddle
+
+    def scores(self, room_id):
+        state = self.states[room_id]
+        return state.player1_score, state.player2_score
+
+    def position(self, room_id):
+        state = self.states[room_id]
+        return state.ball_x, state.ball_y
+
+    def has_moved(self, room_id):
+        return self.moved[room_id]
+
+    def paddles_changed(self, room_id):
+        return room_id in self.changed
+
+    def has_changed(self, room_id):
+        return room_id in self.changed or self.moved[room_id]
+
+    def step(self, dt):
+        self.changed, self.inputs = self.inputs, set()
+        events = {}
+        moved = self.moved
+        step = engine.step
+        for room_id, state in self.states.items():
+            result = step(state, dt)
+            moved[room_id] = result == MOVED
+            if result == SCORED or result == FINISHED:
+                events[room_id] = result
+        return events
+
+    def take_lost(self):
+        return []
+
+
+BACKENDS = {
+    'batch': BatchPhysics,
+    'engine': EnginePhysics,
+}
+
+
+def compare_backends(config, rooms=32, steps=3000, dt=1.0 / 60):
+    """
+    Avanza las mismas salas con todos los backends, con las mismas semillas y
+    los mismos movimientos de paleta, y devuelve la primera diferencia entre
+    sus trayectorias (None si coinciden). BatchPhysics repite con NumPy las
+    reglas de engine.step(), así que cualquier cambio en ellas debe mantener
+    esto a None.
+    """
+    backends = [(name, backend()) for name, backend in BACKENDS.items()]
+    for _, physics in backends:
+        for room_id in range(rooms):
+            physics.add(room_id, config, seed=room_id)
+    active = set(range(rooms))
+    for tick in range(steps):
+        for _, physics in backends:
+            for room_id in active:
+                # La mitad de las salas sigue la bola con la paleta izquierda
+                # (rebotes) y el resto la deja quieta (puntos)
+                if room_id % 2 == 0:
+                    physics.set_paddle(room_id, 'left', physics.position(room_id)[1])
+                physics.set_paddle(room_id, 'right', (tick % 100) / 100)
+        results = [(name, physics, physics.step(dt)) for name, physics in backends]
+        expected_name, expected_physics, expected_events = results[0]
+        for name, physics, events in results[1:]:
+            if events != expected_events:
+                return f"tick {tick}: {expected_name} {expected_events} != {name} {events}"
+            for room_id in active:
+                expected = (expected_physics.position(room_id),
+                            expected_physics.paddles(room_id),
+                            expected_physics.scores(room_id))
+                got = (physics.position(room_id), physics.paddles(room_id),
+                       physics.scores(room_id))
+                if got != expected:
+                    return f"tick {tick}, sala {room_id}: {expected_name} {expected} != {name} {got}"
+        for room_id, event in expected_events.items():
+            if event == FINISHED:
+                active.discard(room_id)
+                for _, physics in backends:
+                    physics.remove(room_id)
+    return None
@@ -0,0 +1,175 @@
+"""
+Snapshots del estado de una sala. El planificador envía como mucho uno por
+sala y tick; los mensajes de entrada de los jugadores solo modifican el
+estado.
+
+Cada snapshot lleva solo los campos que han cambiado (bola, paletas,
+marcador), cuantizados a GAME_SNAPSHOT_DECIMALS decimales, y cada
+KEYFRAME_EVERY ticks un keyframe con todos. Los valores viajan como enteros:
+posición * SCALE.
+
+El cliente que se conecta con el subprotocolo SUBPROTOCOL recibe frames
+binarios (little-endian):
+    flags (uint8), seq (uint32)
+    si BALL:   bola x/y (uint16)
+    si PADDLE: paleta izquierda/derecha (uint16) y último input procesado
+               de player1/player2 (uint32)
+    si SCORE:  marcador player1/player2 (uint8)
+El resto recibe el mismo snapshot en JSON.
+
+Con el último input procesado de cada jugador el cliente puede predecir su
+paleta localmente y reconciliarla con la del servidor.
+
+Cada conexión tiene su SnapshotStream, que adapta la frecuencia de envío a
+lo que el cliente confirma haber recibido (acciones 'ack' con el último seq).
+"""
+import json
+import struct
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+SUBPROTOCOL = 'pong.bin.v1'
+
+# Las posiciones van en uint16: con más de 4 decimales 1.0 * SCALE no cabe
+MAX_DECIMALS = 4
+if not 0 <= settings.GAME_SNAPSHOT_DECIMALS <= MAX_DECIMALS:
+    raise ImproperlyConfigured(
+        f"GAME_SNAPSHOT_DECIMALS debe estar entre 0 y {MAX_DECIMALS}, "
+        f"no {settings.GAME_SNAPSHOT_DECIMALS}")
+SCALE = 10 ** settings.GAME_SNAPSHOT_DECIMALS
+MAX_QUANTIZED = 0xffff
+
+# Flags del snapshot
+BALL = 1
+PADDLE = 2
+SCORE = 4
+KEYFRAME = 8
+ALL = BALL | PADDLE | SCORE | KEYFRAME
+
+KEYFRAME_EVERY = settings.GAME_TICK_RATE  # Un keyframe por segundo
+
+# Adaptación de la frecuencia por conexión: el retraso se mide en ticks
+# entre el último snapshot enviado y el último confirmado por el cliente
+BACKLOG_HIGH = 20   # ~330 ms a 60 ticks/s: enviar menos
+BACKLOG_LOW = 8     # Por debajo se vuelve a enviar más
+MAX_SEND_EVERY = 4  # Como mínimo se envía uno de cada MAX_SEND_EVERY ticks
+
+FIELDS = ((BALL, 'HH'), (PADDLE, 'HHII'), (SCORE, 'BB'))
+# Formato del frame para cada combinación de BALL, PADDLE y SCORE
+FRAMES = {
+    mask: struct.Struct('<BI' + ''.join(fmt for flag, fmt in FIELDS if mask & flag))
+    for mask in range(8)
+}
+
+
+def quantize(value):
+    return max(0, min(MAX_QUANTIZED, round(value * SCALE)))
+
+
+def encode_frame(flags, seq, state):
+    """Frame binario con los campos de `flags`; `state` es snapshot()['state']."""
+    values = []
+    if flags & BALL:
+        values += state[0:2]
+    if flags & PADDLE:
+        values += state[2:4]
+        values += state[6:8]
+    if flags & SCORE:
+        values += state[4:6]
+    return FRAMES[flags & 7].pack(flags, seq, *values)
+
+
+def encode_text(flags, seq, state):
+    """Mismo contenido que encode_frame() en JSON."""
+    data = {'type': 'snapshot', 'flags': flags, 'seq': seq}
+    if flags & BALL:
+        data['ball'] = state[0:2]
+    if flags & PADDLE:
+        data['paddles'] = state[2:4]
+        data['inputs'] = state[6:8]
+    if flags & SCORE:
+        data['score'] = state[4:6]
+    return json.dumps(data, separators=(',', ':'))
+
+
+def snapshot(room, physics, room_id, event=None):
+    """
+    Mensaje de grupo con los cambios de la sala tras el último step(). El
+    frame binario y el JSON se codifican aquí una sola vez; las conexiones
+    que van al día envían estos y solo las que se han saltado snapshots
+    recodifican. `room` es su GameRoom o MatchRoom.
+    """
+    room.seq = (room.seq + 1) & 0xffffffff
+    flags = 0
+    if physics.has_moved(room_id):
+        flags |= BALL
+    if physics.paddles_changed(room_id):
+        flags |= PADDLE
+    if event is not None:
+        # Tras un punto la bola vuelve al centro
+        flags |= BALL | SCORE
+    if room.seq % KEYFRAME_EVERY == 0:
+        flags = ALL
+
+    ball_x, ball_y = physics.position(room_id)
+    left_paddle, right_paddle = physics.paddles(room_id)
+    score1, score2 = physics.scores(room_id)
+    state = [quantize(ball_x), quantize(ball_y),
+             quantize(left_paddle), quantize(right_paddle), score1, score2,
+             room.player1_input, room.player2_input]
+    return {
+        'type': 'snapshot',
+        'flags': flags,
+        'seq': room.seq,
+        'state': state,
+        'text': encode_text(flags, room.seq, state),
+        'frame': encode_frame(flags, room.seq, state),
+    }
+
+
+class SnapshotStream:
+    """Envío de snapshots a una conexión."""
+    __slots__ = ('binary', 'pending', 'send_every', 'skipped',
+                 'sent_seq', 'acked_seq')
+
+    def __init__(self, binary):
+        self.binary = binary
+        self.pending = ALL     # Cambios aún no enviados; la primera vez, keyframe
+        self.send_every = 1
+        self.skipped = 0
+        self.sent_seq = 0
+        self.acked_seq = None
+
+    def encode(self, event):
+        """Devuelve lo que hay que enviar para este snapshot, o None si se salta."""
+        flags = event['flags'] | self.pending
+        if flags == 0:
+            return None
+        if self.send_every > 1 and not flags & (SCORE | KEYFRAME):
+            self.skipped += 1
+            if self.skipped < self.send_every:
+                self.pending = flags
+                return None
+        self.skipped = 0
+        self.pending = 0
+        self.sent_seq = event['seq']
+        if flags == event['flags']:
+            return event['frame'] if self.binary else event['text']
+        encode = encode_frame if self.binary else encode_text
+        return encode(flags, event['seq'], event['state'])
+
+    def ack(self, seq):
+        """Ajusta la frecuencia de envío según lo que el cliente lleva recibido."""
+        if not isinstance(seq, int):
+            return
+        self.acked_seq = seq
+        backlog = (self.sent_seq - seq) & 0xffffffff
+        if backlog > 0x7fffffff:
+            # Confirmación de un seq que aún no se ha enviado
+            return
+        if backlog > BACKLOG_HIGH and self.send_every < MAX_SEND_EVERY:
+            self.send_every += 1
+            print(
+                f"[DEBUG] Cliente con {backlog} ticks de retraso, enviando 1 de cada {self.send_every}")
+        elif backlog <= BACKLOG_LOW and self.send_every > 1:
+            self.send_every -= 1
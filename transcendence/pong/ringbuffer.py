@@ -0,0 +1,125 @@
+"""
+Buffer circular en memoria compartida (multiprocessing.shared_memory) para
+pasar frames de un proceso de simulación al proceso ASGI sin serializarlos.
+Tiene un único productor y un único consumidor, así que no necesita locks:
+cada índice lo escribe solo uno de los dos y solo avanza.
+
+Disposición de la memoria:
+    cabecera: índice de escritura, índice de lectura y último paso completo
+              (uint64, cada uno en su propia línea de caché)
+    registros FRAME de tamaño fijo, CAPACITY en total
+
+El consumidor lee los registros como vistas de NumPy sobre la memoria
+compartida (sin copias) y las libera con release() cuando ha terminado.
+"""
+import time
+import numpy as np
+from multiprocessing import shared_memory
+
+FRAME = np.dtype([
+    ('slot', '<u4'),      # Slot de la sala (ver simulation.PooledPhysics)
+    ('seq', '<u4'),       # Paso de simulación que generó el frame
+    ('ball_x', '<f8'),
+    ('ball_y', '<f8'),
+    ('left_paddle', '<f8'),
+    ('right_paddle', '<f8'),
+    ('score1', 'u1'),
+    ('score2', 'u1'),
+    ('moved', 'u1'),      # Si la bola avanzó en ese paso
+    ('event', 'u1'),      # 0, engine.SCORED o engine.FINISHED
+    ('pad', '<u4'),       # Registros de 48 bytes: los float64 quedan alineados
+])
+
+CACHE_LINE = 64
+WRITE, READ, STEP = 0, 1, 2  # Posición de cada contador en la cabecera
+HEADER_SIZE = 3 * CACHE_LINE
+
+
+class FrameRing:
+    """Buffer circular SPSC de registros FRAME."""
+
+    def __init__(self, capacity=None, name=None):
+        """
+        Con `capacity` crea el bloque de memoria; con `name` se conecta a uno
+        existente (en el otro proceso).
+        """
+        if name is None:
+            self.shm = shared_memory.SharedMemory(
+                create=True, size=HEADER_SIZE + capacity * FRAME.itemsize)
+            self.owner = True
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            self.owner = False
+        self.capacity = (self.shm.size - HEADER_SIZE) // FRAME.itemsize
+        # Cada contador en su línea de caché para no compartirla entre procesos
+        self.header = np.ndarray((3, CACHE_LINE // 8), dtype='<u8', buffer=self.shm.buf)
+        self.frames = np.ndarray((self.capacity,), dtype=FRAME,
+                                 buffer=self.shm.buf, offset=HEADER_SIZE)
+        if self.owner:
+            self.header[:] = 0
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def close(self):
+        # Las vistas tienen que desaparecer antes de cerrar la memoria
+        del self.header, self.frames
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+    # Productor
+
+    def free(self):
+        return self.capacity - int(self.header[WRITE, 0] - self.header[READ, 0])
+
+    def write(self, records):
+        """
+        Copia `records` (array FRAME) al buffer y los publica. Si no cabe,
+        espera a que el consumidor libere sitio.
+        """
+        count = len(records)
+        done = 0
+        while done < count:
+            free = self.free()
+            if free == 0:
+                time.sleep(0)
+                continue
+            write = int(self.header[WRITE, 0])
+            start = write % self.capacity
+            chunk = min(count - done, free, self.capacity - start)
+            self.frames[start:start + chunk] = records[done:done + chunk]
+            # Publicar el índice solo después de escribir los registros
+            self.header[WRITE, 0] = write + chunk
+            done += chunk
+
+    def finish_step(self, seq):
+        """Marca el paso `seq` como completo: todos sus frames están publicados."""
+        self.header[STEP, 0] = seq
+
+    # Consumidor
+
+    def step(self):
+        """Último paso completo publicado por el productor."""
+        return int(self.header[STEP, 0])
+
+    def read(self):
+        """
+        Vistas (sin copia) de los registros publicados y no leídos: como mucho
+        dos tramos si dan la vuelta al buffer. Hay que llamar a release() al
+        terminar con ellas.
+        """
+        read = int(self.header[READ, 0])
+        write = int(self.header[WRITE, 0])
+        if read == write:
+            return ()
+        start = read % self.capacity
+        end = start + (write - read)
+        if end <= self.capacity:
+            return (self.frames[start:end],)
+        return (self.frames[start:], self.frames[:end - self.capacity])
+
+    def release(self, views):
+        """Devuelve al productor el sitio de los registros ya procesados."""
+        self.header[READ, 0] += sum(len(view) for view in views)
@@ -0,0 +1,199 @@
+import asyncio
+import time
+from channels.layers import get_channel_layer
+from django.conf import settings
+from pong.fanout import fanout
+from pong.physics import BACKENDS
+from pong.simulation import PooledPhysics
+
+# Si el bucle se retrasa más de este número de ticks, se descartan en lugar
+# de intentar recuperarlos todos de golpe
+MAX_CATCHUP_TICKS = 5
+
+
+class GameScheduler:
+    """
+    Planificador de simulación de paso fijo compartido por todas las salas del
+    proceso. En lugar de una tarea asyncio por partida, una única tarea avanza
+    la física de todas las salas con una llamada vectorizada y después deja
+    que cada sala genere sus mensajes, que se envían en bloque.
+    """
+
+    def __init__(self, tick_rate, backend='batch', processes=0, starts_per_tick=0):
+        self.tick_rate = tick_rate
+        self.interval = 1.0 / tick_rate
+        if processes:
+            # La física corre en procesos aparte (pong.simulation)
+            self.physics = PooledPhysics(processes, backend)
+        else:
+            self.physics = BACKENDS[backend]()
+        # Mapea room_id a su callback: on_tick(evento) -> [(grupo, mensaje)]
+        self.rooms = {}
+        # Mapea room_id a on_error(room_id), que limpia la sala si su
+        # on_tick falla
+        self.error_handlers = {}
+        # Salas registradas que aún esperan su primer tick: room_id ->
+        # (on_tick, config). Se admiten como mucho starts_per_tick por tick
+        # (0 sin límite) para que los partidos de una ronda que empiezan a la
+        # vez no caigan todos en el mismo frame
+        self.starting = {}
+        self.starts_per_tick = starts_per_tick
+        self.task = None
+        self.channel_layer = None
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.ticks = 0
+        self.late_ticks = 0
+        self.skipped_ticks = 0
+        self.last_tick_ms = 0.0
+        self.avg_tick_ms = 0.0
+        self.max_tick_ms = 0.0
+        self.deferred_starts = 0
+
+    def register(self, room_id, on_tick, config, on_error=None):
+        """
+        Añade una sala al planificador con el modo de juego indicado
+        (engine.GameConfig) y arranca el bucle si no está activo. La física
+        de la sala empieza en el primer tick con hueco para ella.
+        """
+        self.starting[room_id] = (on_tick, config)
+        if on_error is not None:
+            self.error_handlers[room_id] = on_error
+        if self.task is None or self.task.done():
+            self.channel_layer = get_channel_layer()
+            self.task = asyncio.create_task(self.run())
+            print(
+                f"[DEBUG] Planificador iniciado a {self.tick_rate} ticks/s")
+
+    def unregister(self, room_id):
+        """Elimina una sala; el bucle se detiene solo cuando no quedan salas."""
+        self.starting.pop(room_id, None)
+        self.rooms.pop(room_id, None)
+        self.error_handlers.pop(room_id, None)
+        self.physics.remove(room_id)
+
+    def stats(self):
+        """Devuelve las métricas de temporización de los ticks."""
+        return {
+            'tick_rate': self.tick_rate,
+            'rooms': len(self.rooms),
+            'starting': len(self.starting),
+            'deferred_starts': self.deferred_starts,
+            'ticks': self.ticks,
+            'late_ticks': self.late_ticks,
+            'skipped_ticks': self.skipped_ticks,
+            'last_tick_ms': round(self.last_tick_ms, 3),
+            'avg_tick_ms': round(self.avg_tick_ms, 3),
+            'max_tick_ms': round(self.max_tick_ms, 3),
+            **fanout.stats(),
+        }
+
+    async def run(self):
+        """Bucle de paso fijo con compensación de deriva."""
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        stats_every = self.tick_rate * 30
+        try:
+            while self.rooms or self.starting:
+                started = time.perf_counter()
+                await self.tick(self.interval)
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                self.record(elapsed_ms)
+                if self.ticks % stats_every == 0:
+                    print(f"[DEBUG] Planificador: {self.stats()}")
+
+                # Programar el siguiente tick respecto al plan, no respecto a
+                # cuándo terminó este, para que los retrasos no se acumulen
+                next_tick += self.interval
+                delay = next_tick - loop.time()
+                if delay < 0:
+                    self.late_ticks += 1
+                    behind = int(-delay / self.interval)
+                    if behind > MAX_CATCHUP_TICKS:
+                        self.skipped_ticks += behind
+                        next_tick += behind * self.interval
+                    delay = 0
+                await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            print("[DEBUG] Planificador cancelado")
+            raise
+        finally:
+            print(f"[DEBUG] Planificador detenido: {self.stats()}")
+
+    async def tick(self, dt):
+        """Avanza todas las salas un paso y envía los mensajes generados."""
+        self.admit()
+        events = self.physics.step(dt)
+        # Salas de un proceso de simulación caído (pong.simulation)
+        for room_id in self.physics.take_lost():
+            print(f"[ERROR] Sala {room_id} perdida con su proceso de simulación")
+            self.fail(room_id)
+        has_changed = self.physics.has_changed
+        sends = []
+        for room_id, on_tick in list(self.rooms.items()):
+            event = events.get(room_id)
+            try:
+                # Las salas en pausa tras un punto y sin movimiento de paletas
+                # no tienen nada que enviar
+                if event is None and not has_changed(room_id):
+                    continue
+                messages = on_tick(event)
+            except Exception as e:
+                print(f"[ERROR] Error en el tick de {room_id}: {e!r}")
+                self.fail(room_id)
+                continue
+            if not messages:
+                continue
+            if len(messages) == 1:
+                group, message = messages[0]
+                sends.append(fanout.group_send(self.channel_layer, group, message))
+            else:
+                sends.append(self.send_in_order(messages))
+
+        if sends:
+            results = await asyncio.gather(*sends, return_exceptions=True)
+            for result in results:
+                if isinstance(result, Exception):
+                    print(f"[ERROR] Error enviando actualización: {result}")
+
+    def fail(self, room_id):
+        """Quita una sala que no puede seguir y deja que su propietario la termine."""
+        on_error = self.error_handlers.get(room_id)
+        self.unregister(room_id)
+        if on_error is not None:
+            # El propietario de la sala avisa a los jugadores y borra su estado
+            try:
+                on_error(room_id)
+            except Exception as e:
+                print(f"[ERROR] Error limpiando {room_id}: {e}")
+
+    def admit(self):
+        """Pasa a la simulación las salas pendientes que caben en este tick."""
+        if not self.starting:
+            return
+        limit = self.starts_per_tick or len(self.starting)
+        for room_id in list(self.starting)[:limit]:
+            on_tick, config = self.starting.pop(room_id)
+            self.physics.add(room_id, config)
+            self.rooms[room_id] = on_tick
+        # Las que quedan esperan al siguiente tick
+        self.deferred_starts += len(self.starting)
+
+    async def send_in_order(self, messages):
+        """Envía varios mensajes de una misma sala respetando su orden."""
+        for group, message in messages:
+            await fanout.group_send(self.channel_layer, group, message)
+
+    def record(self, elapsed_ms):
+        self.ticks += 1
+        self.last_tick_ms = elapsed_ms
+        self.max_tick_ms = max(self.max_tick_ms, elapsed_ms)
+        # Media móvil exponencial para no guardar histórico
+        self.avg_tick_ms += (elapsed_ms - self.avg_tick_ms) * 0.05
+
+
+# Instancia única por proceso
+scheduler = GameScheduler(settings.GAME_TICK_RATE, settings.GAME_PHYSICS_BACKEND,
+                          settings.GAME_SIMULATION_PROCESSES,
+                          settings.GAME_STARTS_PER_TICK)
@@ -0,0 +1,336 @@
+"""
+Modo de simulación en procesos aparte (GAME_SIMULATION_PROCESSES > 0). La
+física de las salas se reparte entre varios procesos, uno por núcleo, para
+que el bucle de la bola no compita por el GIL con las vistas HTTP, los
+handshakes de WebSocket y las llamadas a la base de datos del proceso ASGI.
+
+El planificador sigue marcando el ritmo en el proceso ASGI. En cada tick
+recoge el resultado del paso anterior de cada proceso y le envía el
+siguiente, así que los procesos calculan mientras el bucle asyncio espera al
+próximo tick y los snapshots van un tick por detrás. Nunca se espera a un
+proceso: si aún no ha terminado su paso, sus salas se saltan ese tick.
+
+Las órdenes (altas, bajas y paletas) van por un Pipe. Los resultados vuelven
+como registros de tamaño fijo por un FrameRing en memoria compartida, que
+aquí se leen sin copias y se aplican de golpe con NumPy.
+
+Este módulo no depende de Django para que los procesos hijos arranquen sin
+configurarlo.
+"""
+import multiprocessing
+import random
+import time
+import numpy as np
+from pong import engine
+from pong.physics import BACKENDS
+from pong.ringbuffer import FRAME, FrameRing
+
+RING_CAPACITY = 4096    # Frames por proceso; los pasos más grandes se leen por partes
+STEP_TIMEOUT = 5.0      # Segundos sin completar un paso antes de dar el proceso por caído
+
+
+def simulate(conn, backend, ring_name):
+    """
+    Bucle de un proceso de simulación. Cada mensaje es
+    (dt, altas, bajas, paletas), con las salas identificadas por su slot. Tras
+    cada paso escribe en el buffer un frame por cada sala que se ha movido o
+    ha tenido un evento y marca el paso como completo.
+    """
+    ring = FrameRing(name=ring_name)
+    physics = BACKENDS[backend]()
+    rooms = set()
+    records = np.zeros(64, dtype=FRAME)
+    seq = 0
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        if message is None:
+            break
+        dt, adds, removes, paddles = message
+        for slot in removes:
+            physics.remove(slot)
+            rooms.discard(slot)
+        for slot, config, seed in adds:
+            physics.add(slot, config, seed)
+            rooms.add(slot)
+        for slot, side, position in paddles:
+            if slot in physics:
+                physics.set_paddle(slot, side, position)
+
+        events = physics.step(dt)
+        seq += 1
+        if len(records) < len(rooms):
+            records = np.zeros(len(rooms) * 2, dtype=FRAME)
+        count = 0
+        for slot in rooms:
+            event = events.get(slot, 0)
+            moved = physics.has_moved(slot)
+            if not event and not moved:
+                continue
+            x, y = physics.position(slot)
+            left, right = physics.paddles(slot)
+            score1, score2 = physics.scores(slot)
+            records[count] = (slot, seq, x, y, left, right,
+                              score1, score2, moved, event, 0)
+            count += 1
+        ring.write(records[:count])
+        ring.finish_step(seq)
+    ring.close()
+
+
+class PooledPhysics:
+    """
+    Misma interfaz que los backends de pong.physics, pero la física de cada
+    sala avanza en uno de los procesos de simulación. Aquí solo se guarda una
+    copia por slot, como en BatchPhysics, de lo que se envía en los snapshots.
+    """
+
+    def __init__(self, processes, backend='batch', capacity=64):
+        self.processes = processes
+        self.backend = backend
+        self.conns = []            # Extremo del Pipe de cada proceso
+        self.workers = []
+        self.rings = []            # FrameRing de cada proceso
+        self.loads = []            # Salas asignadas a cada proceso
+        self.pending = []          # (altas, bajas, paletas) por enviar a cada proceso
+        self.sent = []             # Último paso enviado a cada proceso (0 si ninguno)
+        self.sent_at = []          # perf_counter del último envío a cada proceso
+        self.assigned = {}         # Mapea room_ids a su proceso
+        self.slots = {}            # Mapea room_ids a su slot
+        self.room_ids = []         # Mapea slots a room_ids (None si está libre)
+        self.free = []             # Slots libres
+        self.released = []         # Slots liberados de cada proceso cuya baja aún no se ha enviado
+        self.lost = []             # Salas de procesos caídos que el planificador aún no ha recogido
+        self.inputs = set()
+        self.changed = set()
+        self.capacity = 0
+        self.grow(capacity)
+
+    def grow(self, capacity):
+        for name, dtype in (('ball_x', np.float64), ('ball_y', np.float64),
+                            ('left_paddle', np.float64), ('right_paddle', np.float64),
+                            ('score1', np.int32), ('score2', np.int32),
+                            ('moved', np.bool_), ('active', np.bool_)):
+            array = np.zeros(capacity, dtype=dtype)
+            if self.capacity:
+                array[:self.capacity] = getattr(self, name)
+            setattr(self, name, array)
+        self.free.extend(range(capacity - 1, self.capacity - 1, -1))
+        self.room_ids.extend([None] * (capacity - self.capacity))
+        self.capacity = capacity
+
+    def spawn(self):
+        context = multiprocessing.get_context('spawn')
+        ring = FrameRing(RING_CAPACITY)
+        conn, child_conn = context.Pipe()
+        process = context.Process(
+            target=simulate, args=(child_conn, self.backend, ring.name), daemon=True)
+        process.start()
+        child_conn.close()
+        return conn, process, ring
+
+    def start(self):
+        """Arranca los procesos (la primera vez que se añade una sala)."""
+        for _ in range(self.processes):
+            conn, process, ring = self.spawn()
+            self.conns.append(conn)
+            self.workers.append(process)
+            self.rings.append(ring)
+            self.loads.append(0)
+            self.pending.append(([], [], []))
+            self.sent.append(0)
+            self.sent_at.append(0.0)
+            self.released.append([])
+        print(
+            f"[DEBUG] {self.processes} procesos de simulación iniciados ({self.backend})")
+
+    def add(self, room_id, config, seed=None):
+        if not self.conns:
+            self.start()
+        if not self.free:
+            self.grow(self.capacity * 2)
+        # La semilla se fija aquí para que la copia local y el proceso coincidan
+        if seed is None:
+            seed = random.getrandbits(31)
+        state = engine.GameState(config, seed)
+        slot = self.free.pop()
+        index = min(range(self.processes), key=self.loads.__getitem__)
+        self.assigned[room_id] = index
+        self.slots[room_id] = slot
+        self.room_ids[slot] = room_id
+        self.loads[index] += 1
+        self.pending[index][0].append((slot, config, seed))
+        self.ball_x[slot] = state.ball_x
+        self.ball_y[slot] = state.ball_y
+        self.left_paddle[slot] = 0.5
+        self.right_paddle[slot] = 0.5
+        self.score1[slot] = 0
+        self.score2[slot] = 0
+        self.moved[slot] = False
+        self.active[slot] = True
+
+    def remove(self, room_id):
+        index = self.assigned.pop(room_id, None)
+        if index is None:
+            return
+        slot = self.slots.pop(room_id)
+        self.room_ids[slot] = None
+        self.active[slot] = False
+        self.moved[slot] = False
+        self.loads[index] -= 1
+        self.pending[index][1].append(slot)
+        # El slot no se reutiliza hasta que el proceso reciba la baja
+        self.released[index].append(slot)
+        self.inputs.discard(room_id)
+        self.changed.discard(room_id)
+
+    def __contains__(self, room_id):
+        return room_id in self.assigned
+
+    def __len__(self):
+        return len(self.assigned)
+
+    def set_paddle(self, room_id, side, position):
+        slot = self.slots[room_id]
+        if side == 'left':
+            self.left_paddle[slot] = position
+        else:
+            self.right_paddle[slot] = position
+        self.pending[self.assigned[room_id]][2].append((slot, side, position))
+        self.inputs.add(room_id)
+
+    def paddle(self, room_id, side):
+        paddles = self.left_paddle if side == 'left' else self.right_paddle
+        return float(paddles[self.slots[room_id]])
+
+    def paddles(self, room_id):
+        slot = self.slots[room_id]
+        return float(self.left_paddle[slot]), float(self.right_paddle[slot])
+
+    def scores(self, room_id):
+        slot = self.slots[room_id]
+        return int(self.score1[slot]), int(self.score2[slot])
+
+    def position(self, room_id):
+        slot = self.slots[room_id]
+        return float(self.ball_x[slot]), float(self.ball_y[slot])
+
+    def has_moved(self, room_id):
+        return bool(self.moved[self.slots[room_id]])
+
+    def paddles_changed(self, room_id):
+        return room_id in self.changed
+
+    def has_changed(self, room_id):
+        return room_id in self.changed or self.has_moved(room_id)
+
+    def step(self, dt):
+        """
+        Recoge el paso anterior de cada proceso y les envía el siguiente.
+        Devuelve los eventos del paso recogido: {room_id: SCORED o FINISHED}.
+        """
+        self.changed, self.inputs = self.inputs, set()
+        self.moved[:] = False
+        events = {}
+        now = time.perf_counter()
+        for index, conn in enumerate(self.conns):
+            if self.sent[index] and not self.collect(index, events):
+                # Paso anterior sin terminar: el proceso se salta este tick
+                # y sus órdenes esperan al siguiente
+                if not self.workers[index].is_alive():
+                    self.lost.extend(self.restart(index, 'el proceso ha terminado'))
+                elif now - self.sent_at[index] > STEP_TIMEOUT:
+                    self.lost.extend(self.restart(index, 'no completa el paso'))
+                continue
+            try:
+                conn.send((dt, *self.pending[index]))
+            except OSError as e:
+                self.lost.extend(self.restart(index, e))
+                continue
+            self.pending[index] = ([], [], [])
+            self.sent[index] += 1
+            self.sent_at[index] = now
+            # Las bajas ya están enviadas, así que sus slots se pueden reutilizar
+            self.free.extend(self.released[index])
+            self.released[index] = []
+        return events
+
+    def take_lost(self):
+        """
+        Salas que se han perdido al caer su proceso desde la última llamada.
+        Ya no están en la simulación; el planificador las da por terminadas.
+        """
+        lost, self.lost = self.lost, []
+        return lost
+
+    def collect(self, index, events):
+        """
+        Aplica los frames ya publicados del último paso enviado al proceso
+        `index`, sin esperar al resto. Devuelve si el paso está completo.
+        """
+        ring = self.rings[index]
+        # Los frames de un paso se publican antes de marcarlo como completo
+        done = ring.step() >= self.sent[index]
+        views = ring.read()
+        for view in views:
+            self.apply(view, events)
+        ring.release(views)
+        return done
+
+    def apply(self, frames, events):
+        slots = frames['slot']
+        active = self.active[slots]
+        if not active.all():
+            # Salas eliminadas mientras el proceso calculaba su paso
+            frames = frames[active]
+            slots = frames['slot']
+        # Las paletas de los frames no se aplican: la copia local ya tiene los
+        # movimientos que el proceso aún no ha recibido
+        self.ball_x[slots] = frames['ball_x']
+        self.ball_y[slots] = frames['ball_y']
+        self.score1[slots] = frames['score1']
+        self.score2[slots] = frames['score2']
+        self.moved[slots] = frames['moved'] != 0
+        codes = frames['event']
+        for i in np.flatnonzero(codes).tolist():
+            events[self.room_ids[int(slots[i])]] = int(codes[i])
+
+    def close(self):
+        """Detiene los procesos y libera la memoria compartida."""
+        for conn, process, ring in zip(self.conns, self.workers, self.rings):
+            try:
+                conn.send(None)
+            except OSError:
+                pass
+            process.join(1)
+            if process.is_alive():
+                process.kill()
+            ring.close()
+        self.conns, self.workers, self.rings = [], [], []
+        self.loads, self.pending, self.sent, self.sent_at = [], [], [], []
+        self.released = []
+
+    def restart(self, index, error):
+        """
+        Sustituye un proceso caído. Sus salas se pierden como si cayera el
+        worker: se quitan de la simulación y se devuelven sus room_ids.
+        """
+        print(f"[ERROR] Proceso de simulación {index} caído: {error}")
+        lost = [room_id for room_id, assigned in self.assigned.items() if assigned == index]
+        for room_id in lost:
+            self.remove(room_id)
+        # El proceso nuevo no conoce esos slots: se pueden reutilizar ya
+        self.free.extend(self.released[index])
+        self.released[index] = []
+        self.workers[index].kill()
+        self.rings[index].close()
+        conn, process, ring = self.spawn()
+        self.conns[index] = conn
+        self.workers[index] = process
+        self.rings[index] = ring
+        self.loads[index] = 0
+        self.pending[index] = ([], [], [])
+        self.sent[index] = 0
+        return lost
@@ -0,0 +1,33 @@
+"""
+Estado de sala que no pertenece a la física (jugadores y marcador). Usa
+__slots__ en lugar de diccionarios para que miles de salas abiertas por
+worker ocupen poco y el acceso a atributos sea directo. La posición de bola y
+paletas vive en scheduler.physics.
+"""
+
+
+class GameRoom:
+    """Partida de Pong (active_games)."""
+    __slots__ = ('player1_id', 'player2_id', 'player1_score', 'player2_score',
+                 'seq', 'player1_input', 'player2_input')
+
+    def __init__(self, player1_id, player2_id):
+        self.player1_id = player1_id
+        self.player2_id = player2_id
+        self.player1_score = 0
+        self.player2_score = 0
+        self.seq = 0  # Número de secuencia del último frame enviado
+        # Último input (seq del cliente) procesado de cada jugador
+        self.player1_input = 0
+        self.player2_input = 0
+
+
+class MatchRoom(GameRoom):
+    """Partida de torneo (match_states)."""
+    __slots__ = ('players', 'ready', 'running')
+
+    def __init__(self, player1_id, player2_id):
+        super().__init__(player1_id, player2_id)
+        self.players = {}     # Mapea IDs de usuario conectados a su número de jugador
+        self.ready = 0
+        self.running = False
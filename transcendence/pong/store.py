@@ -0,0 +1,230 @@
+"""
+Copia en Redis de los torneos en curso para que sobrevivan a un reinicio del
+worker. Cada torneo es un HASH con su cuadro y el estado de sus partidos, y
+lo retoma el worker que pase a ser su propietario (pong.ownership) cuando el
+anterior deja de latir.
+
+Las lecturas salen de la copia local (tournament_rooms y match_states en
+pong.consumers). Los handlers marcan el torneo que modifican con save() y un
+bucle escribe cada TOURNAMENT_FLUSH_MS todos los marcados en un único
+pipeline. Después publica sus tokens para que los demás workers descarten la
+copia que tengan de ellos.
+
+Los datos se guardan como listas msgpack que empiezan por SCHEMA_VERSION; una
+versión distinta se ignora como si el torneo no existiera.
+
+Al recuperar un torneo de Redis se llama al handler registrado con
+on_restore(), que retoma lo que el propietario anterior dejó a medias.
+"""
+import asyncio
+import msgpack
+import redis.asyncio as redis
+from django.conf import settings
+from pong.bracket import Bracket
+from pong.state import MatchRoom
+from pong.worker import worker
+
+TOURNAMENT_PREFIX = 'pong:tournament:'             # Un HASH por torneo
+TOURNAMENT_FIELD = b'tournament'                   # Campo con los datos del torneo
+MATCH_PREFIX = 'match:'                            # Campo de cada partido: match:<match_id>
+INVALIDATE_CHANNEL = 'pong:tournament:invalidate'  # Pub/sub: [worker, tokens escritos]
+
+SCHEMA_VERSION = 2
+
+
+def pack_tournament(data):
+    """
+    [versión, creador, participantes, canales, máximo, estado, ronda,
+     tamaño del cuadro (0 sin empezar), nodos del cuadro, marcadores]
+    """
+    bracket = data['bracket']
+    return msgpack.packb([
+        SCHEMA_VERSION,
+        data['creator'],
+        data['participants'],
+        list(data['channels'].items()),
+        data['max_players'],
+        data['status'],
+        data['round'],
+        bracket.size if bracket else 0,
+        bracket.slots if bracket else None,
+        bracket.scores if bracket else None,
+    ])
+
+
+def unpack_tournament(token, blob):
+    fields = msgpack.unpackb(blob)
+    if fields[0] != SCHEMA_VERSION:
+        return None
+    (_, creator, participants, channels, max_players, status, round_number,
+     size, slots, scores) = fields
+    return {
+        'creator': creator,
+        'participants': participants,
+        'channels': dict(channels),
+        'max_players': max_players,
+        'status': status,
+        'channel_group': token,
+        'round': round_number,
+        'bracket': Bracket(size, slots, scores) if size else None,
+    }
+
+
+def pack_match(state):
+    """[versión, jugador 1, jugador 2, marcador 1, marcador 2]"""
+    return msgpack.packb([SCHEMA_VERSION, state.player1_id, state.player2_id,
+                          state.player1_score, state.player2_score])
+
+
+def unpack_match(blob):
+    # Las conexiones y la física no sobreviven al worker: los jugadores
+    # vuelven a unirse al partido como si fuera nuevo
+    fields = msgpack.unpackb(blob)
+    if fields[0] != SCHEMA_VERSION:
+        return None
+    _, player1_id, player2_id, score1, score2 = fields
+    state = MatchRoom(player1_id, player2_id)
+    state.player1_score = score1
+    state.player2_score = score2
+    return state
+
+
+class TournamentStore:
+    def __init__(self):
+        self.redis = None
+        self.tournaments = {}  # Copia local: token -> datos del torneo
+        self.matches = {}      # Copia local: match_id -> MatchRoom
+        self.dirty = set()     # Tokens modificados desde la última escritura
+        self.task = None
+        self.listener = None
+        self.restore_handler = None
+
+    def on_restore(self, handler):
+        """Registra handler(token, datos), al que se llama con cada torneo recuperado."""
+        self.restore_handler = handler
+
+    def client(self):
+        # El cliente se crea dentro del bucle de eventos que lo va a usar
+        if self.redis is None:
+            self.redis = redis.Redis(
+                host=settings.REDIS_HOST,
+                port=settings.REDIS_PORT,
+                password=settings.REDIS_PASSWORD,
+            )
+        return self.redis
+
+    def start(self):
+        """
+        Arranca la escritura diferida y las invalidaciones (solo la primera
+        vez). Se llama al usar el almacén desde los handlers del worker.
+        """
+        if self.task is not None and not self.task.done():
+            return
+        self.task = asyncio.create_task(self.run())
+        self.listener = asyncio.create_task(self.listen())
+
+    def save(self, token):
+        """Marca el torneo (y sus partidos) para la próxima escritura."""
+        self.start()
+        self.dirty.add(token)
+
+    async def run(self):
+        interval = settings.TOURNAMENT_FLUSH_MS / 1000
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"[ERROR] Error guardando torneos en Redis: {e}")
+
+    async def flush(self):
+        """Escribe los torneos marcados; los que ya no existen se borran."""
+        if not self.dirty:
+            return
+        tokens, self.dirty = self.dirty, set()
+        matches = {}
+        for match_id, state in self.matches.items():
+            token = match_id.split('-')[0]
+            if token in tokens:
+                matches.setdefault(token, {})[MATCH_PREFIX + match_id] = pack_match(state)
+
+        # Cada torneo se reescribe entero para no dejar partidos ya terminados
+        pipe = self.client().pipeline(transaction=True)
+        for token in tokens:
+            key = TOURNAMENT_PREFIX + token
+            pipe.delete(key)
+            data = self.tournaments.get(token)
+            if data is None:
+                continue
+            pipe.hset(key, mapping={TOURNAMENT_FIELD: pack_tournament(data),
+                                    **matches.get(token, {})})
+            pipe.expire(key, settings.TOURNAMENT_TTL_S)
+        pipe.publish(INVALIDATE_CHANNEL, msgpack.packb([worker.channel_name, list(tokens)]))
+        try:
+            await pipe.execute()
+        except Exception:
+            # Se reintentan en la próxima pasada
+            self.dirty |= tokens
+            raise
+
+    async def load(self, token):
+        """
+        Datos del torneo: la copia local o, si este worker no la tiene (acaba
+        de arrancar o de heredar el torneo), la guardada en Redis. None si no
+        existe.
+        """
+        data = self.tournaments.get(token)
+        if data is not None or token in self.dirty:
+            # Marcado y sin copia local: borrado pero aún no escrito
+            return data
+        self.start()
+        fields = await self.client().hgetall(TOURNAMENT_PREFIX + token)
+        if token in self.tournaments:
+            # Otra carga del mismo torneo terminó mientras se esperaba a Redis
+            return self.tournaments[token]
+        blob = fields.pop(TOURNAMENT_FIELD, None)
+        if blob is None:
+            return None
+        data = unpack_tournament(token, blob)
+        if data is None:
+            print(f"[WARNING] Torneo {token} guardado con otra versión; se ignora")
+            return None
+        self.tournaments[token] = data
+        for field, blob in fields.items():
+            match_id = field.decode()[len(MATCH_PREFIX):]
+            state = unpack_match(blob)
+            if state is not None:
+                self.matches.setdefault(match_id, state)
+        print(f"[DEBUG] Torneo {token} recuperado de Redis ({data['status']})")
+        if self.restore_handler is not None:
+            self.restore_handler(token, data)
+        return data
+
+    async def listen(self):
+        while True:
+            try:
+                pubsub = self.client().pubsub()
+                await pubsub.subscribe(INVALIDATE_CHANNEL)
+                async for message in pubsub.listen():
+                    if message['type'] != 'message':
+                        continue
+                    origin, tokens = msgpack.unpackb(message['data'])
+                    if origin != worker.channel_name:
+                        self.invalidate(tokens)
+            except Exception as e:
+                print(f"[ERROR] Error en las invalidaciones de torneos: {e}")
+                await asyncio.sleep(1)
+
+    def invalidate(self, tokens):
+        """Descarta la copia local de torneos que ha escrito otro worker."""
+        tokens = set(tokens)
+        for token in tokens & self.tournaments.keys():
+            del self.tournaments[token]
+            self.dirty.discard(token)
+            print(f"[DEBUG] Torneo {token} modificado por otro worker; copia local descartada")
+        for match_id in [m for m in self.matches if m.split('-')[0] in tokens]:
+            del self.matches[match_id]
+
+
+# Instancia única por proceso
+store = TournamentStore()
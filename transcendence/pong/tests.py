@@ -1,3 +1,55 @@
-from django.test import TestCase
+import asyncio
+from django.test import SimpleTestCase
+from pong import engine
+from pong.physics import compare_backends
+from pong.scheduler import GameScheduler
 
-# Create your tests here.
+
+class PhysicsBackendsTest(SimpleTestCase):
+    def test_backends_match_engine(self):
+        # BatchPhysics repite las reglas de engine.step() con NumPy
+        for config in (engine.PONG, engine.TOURNAMENT):
+            self.assertIsNone(compare_backends(config))
+
+
+class PooledPhysicsTest(SimpleTestCase):
+    def test_dead_process_ends_only_its_rooms(self):
+        asyncio.run(self.kill_process())
+
+    async def wait_for(self, condition, timeout=20):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while not condition():
+            self.assertLess(loop.time(), deadline)
+            await asyncio.sleep(0.01)
+
+    async def kill_process(self):
+        scheduler = GameScheduler(60, processes=2)
+        ticked = set()
+        lost = []
+        for room_id in ('a', 'b', 'c', 'd'):
+            scheduler.register(room_id, lambda event, room_id=room_id: ticked.add(room_id),
+                               engine.PONG, lost.append)
+        try:
+            await self.wait_for(lambda: len(ticked) == 4)
+            physics = scheduler.physics
+            index = physics.assigned['a']
+            dead = sorted(room_id for room_id, assigned in physics.assigned.items()
+                          if assigned == index)
+            alive = set(physics.assigned) - set(dead)
+            physics.workers[index].kill()
+
+            # Las salas del proceso muerto terminan con su on_error y las
+            # demás siguen avanzando con el planificador en marcha
+            await self.wait_for(lambda: lost)
+            self.assertEqual(sorted(lost), dead)
+            self.assertEqual(set(scheduler.rooms), alive)
+            ticked.clear()
+            await self.wait_for(lambda: ticked == alive)
+            self.assertFalse(scheduler.task.done())
+        finally:
+            for room_id in list(scheduler.rooms):
+                scheduler.unregister(room_id)
+            if scheduler.task is not None:
+                await scheduler.task
+            scheduler.physics.close()
@@ -0,0 +1,52 @@
+import asyncio
+from channels.layers import get_channel_layer
+
+
+class Worker:
+    """
+    Canal propio de este proceso ASGI. El worker que simula una sala (su
+    propietario) recibe aquí los mensajes de los jugadores conectados a otros
+    workers, por ejemplo los movimientos de paleta.
+    """
+
+    def __init__(self):
+        self.channel_name = None
+        self.channel_layer = None
+        self.task = None
+        self.handlers = {}  # Mapea tipos de mensaje a handlers async(mensaje)
+
+    def on(self, message_type, handler):
+        self.handlers[message_type] = handler
+
+    async def start(self):
+        """Crea el canal del worker y empieza a escucharlo (solo la primera vez)."""
+        if self.task is not None and not self.task.done():
+            return
+        self.channel_layer = get_channel_layer()
+        self.channel_name = await self.channel_layer.new_channel('pong.worker.')
+        self.task = asyncio.create_task(self.listen())
+        print(f"[DEBUG] Worker escuchando en {self.channel_name}")
+
+    async def listen(self):
+        while True:
+            message = await self.channel_layer.receive(self.channel_name)
+            await self.handle(message)
+
+    async def handle(self, message):
+        """Ejecuta el handler del mensaje (también para mensajes locales)."""
+        handler = self.handlers.get(message.get('type'))
+        if handler is None:
+            print(f"[WARNING] Mensaje de worker no reconocido: {message}")
+            return
+        try:
+            await handler(message)
+        except Exception as e:
+            print(f"[ERROR] Error procesando {message.get('type')}: {e}")
+
+    async def send(self, channel_name, message):
+        """Envía un mensaje al canal de otro worker (o de este mismo)."""
+        await self.channel_layer.send(channel_name, message)
+
+
+# Instancia única por proceso
+worker = Worker()
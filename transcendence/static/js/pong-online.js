@@ -30,6 +30,61 @@
     const PADDLE_INTERPOLATION_SPEED = 0.3;
     const BALL_INTERPOLATION_SPEED = 0.5;
 
+    // Snapshots (pong/protocol.py): flags y seq, seguidos solo de los campos
+    // que han cambiado. Las posiciones llegan como enteros (posición * snapshotScale)
+    const BINARY_PROTOCOL = 'pong.bin.v1';
+    const SNAPSHOT_BALL = 1;
+    const SNAPSHOT_PADDLE = 2;
+    const SNAPSHOT_SCORE = 4;
+    const ACK_EVERY = 10;  // Confirmar cada 10 snapshots para que el servidor ajuste el ritmo
+    let snapshotScale = 1000;
+    let snapshotsSinceAck = 0;
+
+    function decodeFrame(buffer) {
+        const view = new DataView(buffer);
+        const data = { type: 'snapshot', flags: view.getUint8(0), seq: view.getUint32(1, true) };
+        let offset = 5;
+        if (data.flags & SNAPSHOT_BALL) {
+            data.ball = [view.getUint16(offset, true), view.getUint16(offset + 2, true)];
+            offset += 4;
+        }
+        if (data.flags & SNAPSHOT_PADDLE) {
+            data.paddles = [view.getUint16(offset, true), view.getUint16(offset + 2, true)];
+            data.inputs = [view.getUint32(offset + 4, true), view.getUint32(offset + 8, true)];
+            offset += 12;
+        }
+        if (data.flags & SNAPSHOT_SCORE) {
+            data.score = [view.getUint8(offset), view.getUint8(offset + 1)];
+        }
+        return data;
+    }
+
+    function applySnapshot(data) {
+        if (data.flags & SNAPSHOT_BALL) {
+            handleWebSocketMessage({
+                type: 'update_ball',
+                ball_position_x: data.ball[0] / snapshotScale,
+                ball_position_y: data.ball[1] / snapshotScale
+            });
+        }
+        if (data.flags & SNAPSHOT_PADDLE) {
+            handleWebSocketMessage({ type: 'update_paddle', player: 'player1', paddle_position: data.paddles[0] / snapshotScale });
+            handleWebSocketMessage({ type: 'update_paddle', player: 'player2', paddle_position: data.paddles[1] / snapshotScale });
+        }
+        if (data.flags & SNAPSHOT_SCORE) {
+            handleWebSocketMessage({
+                type: 'update_score',
+                player1_score: data.score[0],
+                player2_score: data.score[1]
+            });
+        }
+        snapshotsSinceAck++;
+        if (snapshotsSinceAck >= ACK_EVERY && socket && socket.readyState === WebSocket.OPEN) {
+            snapshotsSinceAck = 0;
+            socket.send(JSON.stringify({ action: 'ack', seq: data.seq }));
+        }
+    }
+
     function cleanupOnlineGame() {
         console.log("[DEBUG] Limpiando estado del juego online...");
         if (animationFrameId) {
@@ -180,7 +235,8 @@
         }
         const wsUrl = `wss://${window.location.host}/ws/pong/`;
         console.log(`[DEBUG] Conectando a WebSocket: ${wsUrl}`);
-        socket = new WebSocket(wsUrl);
+        socket = new WebSocket(wsUrl, [BINARY_PROTOCOL]);
+        socket.binaryType = 'arraybuffer';
         socket.onopen = function (event) {
             console.log("[DEBUG] Conexión WebSocket abierta.");
             setTimeout(function () {
@@ -194,6 +250,10 @@
             }, 100);
         };
         socket.onmessage = function (event) {
+            if (event.data instanceof ArrayBuffer) {
+                applySnapshot(decodeFrame(event.data));
+                return;
+            }
             console.log("[DEBUG] Mensaje recibido del servidor:", event.data);
             const data = JSON.parse(event.data);
             handleWebSocketMessage(data);
@@ -256,6 +316,7 @@
                 console.log("[DEBUG] Mensaje completo recibido:", JSON.stringify(data));
                 isWaitingForOpponent = false;
                 roomId = data.room_id;
+                snapshotScale = data.snapshot_scale || snapshotScale;
 
                 // Convertir todo a string para evitar problemas de tipo
                 const userId = String(data.user_id);
@@ -300,6 +361,15 @@
                 }
                 break;
 
+            case 'ping':
+                // El servidor mide la latencia antes de meternos en la cola
+                socket.send(JSON.stringify({ action: 'pong' }));
+                break;
+
+            case 'snapshot':
+                applySnapshot(data);
+                break;
+
             case 'update_paddle':
                 const isMyPaddle = (playerNumber === 1 && data.player === 'player1') ||
                     (playerNumber === 2 && data.player === 'player2');
@@ -22,7 +22,6 @@
     let matchId = null;
     let gameInitialized = false;
     let keysPressed = {};
-    let lastPaddleUpdate = 0;
     let lastFrameTime = 0;
 
     let paddleMoveInterval = null;
@@ -34,6 +33,86 @@
     const PADDLE_HEIGHT = 100;
     const BALL_RADIUS = 10;
 
+    // Snapshots (pong/protocol.py): flags y seq, seguidos solo de los campos
+    // que han cambiado. Las posiciones llegan como enteros (posición * snapshotScale)
+    const BINARY_PROTOCOL = 'pong.bin.v1';
+    const SNAPSHOT_BALL = 1;
+    const SNAPSHOT_PADDLE = 2;
+    const SNAPSHOT_SCORE = 4;
+    const ACK_EVERY = 10;  // Confirmar cada 10 snapshots para que el servidor ajuste el ritmo
+    let snapshotScale = 1000;
+    let snapshotsSinceAck = 0;
+
+    // Predicción de la paleta propia: cada movimiento se aplica al momento y
+    // se guarda hasta que el servidor confirma haberlo procesado
+    const PADDLE_STEP = 0.025;  // Igual que engine.TOURNAMENT.paddle_step
+    let inputSeq = 0;
+    let pendingInputs = [];
+
+    function applyInput(position, direction) {
+        if (direction === 'up') return Math.max(0, position - PADDLE_STEP);
+        if (direction === 'down') return Math.min(1, position + PADDLE_STEP);
+        return position;
+    }
+
+    function reconcilePaddle(serverPaddle, lastProcessedInput) {
+        pendingInputs = pendingInputs.filter(input => input.seq > lastProcessedInput);
+        myPaddleY = pendingInputs.reduce(
+            (position, input) => applyInput(position, input.direction), serverPaddle);
+    }
+
+    function decodeFrame(buffer) {
+        const view = new DataView(buffer);
+        const data = { type: 'snapshot', flags: view.getUint8(0), seq: view.getUint32(1, true) };
+        let offset = 5;
+        if (data.flags & SNAPSHOT_BALL) {
+            data.ball = [view.getUint16(offset, true), view.getUint16(offset + 2, true)];
+            offset += 4;
+        }
+        if (data.flags & SNAPSHOT_PADDLE) {
+            data.paddles = [view.getUint16(offset, true), view.getUint16(offset + 2, true)];
+            data.inputs = [view.getUint32(offset + 4, true), view.getUint32(offset + 8, true)];
+            offset += 12;
+        }
+        if (data.flags & SNAPSHOT_SCORE) {
+            data.score = [view.getUint8(offset), view.getUint8(offset + 1)];
+        }
+        return data;
+    }
+
+    function applySnapshot(data) {
+        if (data.flags & SNAPSHOT_BALL) {
+            handleWebSocketMessage({
+                type: 'update_ball',
+                ball_position_x: data.ball[0] / snapshotScale,
+                ball_position_y: data.ball[1] / snapshotScale
+            });
+        }
+        if (data.flags & SNAPSHOT_PADDLE) {
+            handleWebSocketMessage({
+                type: 'update_paddle',
+                left_paddle: data.paddles[0] / snapshotScale,
+                right_paddle: data.paddles[1] / snapshotScale
+            });
+            if (myPlayerNumber) {
+                reconcilePaddle(data.paddles[myPlayerNumber - 1] / snapshotScale,
+                    data.inputs[myPlayerNumber - 1]);
+            }
+        }
+        if (data.flags & SNAPSHOT_SCORE) {
+            handleWebSocketMessage({
+                type: 'update_score',
+                player1_score: data.score[0],
+                player2_score: data.score[1]
+            });
+        }
+        snapshotsSinceAck++;
+        if (snapshotsSinceAck >= ACK_EVERY && socket && socket.readyState === WebSocket.OPEN) {
+            snapshotsSinceAck = 0;
+            socket.send(JSON.stringify({ action: 'ack', seq: data.seq }));
+        }
+    }
+
     function cleanupTournamentGame() {
         console.log("[DEBUG] Limpiando estado del juego de torneo...");
         if (animationFrameId) {
@@ -70,7 +149,8 @@
         matchId = null;
         gameInitialized = false;
         keysPressed = {};
-        lastPaddleUpdate = 0;
+        inputSeq = 0;
+        pendingInputs = [];
         lastFrameTime = 0;
         const gameContainer = document.getElementById('game-container');
         if (gameContainer) gameContainer.classList.add('d-none');
@@ -155,19 +235,15 @@
         window.addEventListener('keyup', window.keyupHandler);
 
         paddleMoveInterval = setInterval(() => {
-            if (!gameInitialized) return;
-            const paddleStep = 0.025;
-            let hasMoved = false;
+            if (!gameInitialized || !myPlayerNumber) return;
+            let direction;
             if (keysPressed['w'] || keysPressed['W'] || keysPressed['ArrowUp']) {
-                myPaddleY = Math.max(0, myPaddleY - paddleStep);
-                hasMoved = true;
+                direction = 'up';
+            } else if (keysPressed['s'] || keysPressed['S'] || keysPressed['ArrowDown']) {
+                direction = 'down';
             }
-            if (keysPressed['s'] || keysPressed['S'] || keysPressed['ArrowDown']) {
-                myPaddleY = Math.min(1, myPaddleY + paddleStep);
-                hasMoved = true;
-            }
-            if (hasMoved && myPlayerNumber) {
-                sendPaddleMovement();
+            if (direction) {
+                sendPaddleMovement(direction);
             }
         }, 20);
 
@@ -203,7 +279,8 @@
 
     function connectWebSocket() {
         const wsUrl = `wss://${window.location.host}/ws/tournament-match/${matchId}/`;
-        socket = new WebSocket(wsUrl);
+        socket = new WebSocket(wsUrl, [BINARY_PROTOCOL]);
+        socket.binaryType = 'arraybuffer';
 
         socket.onopen = () => {
             console.log("[DEBUG] Conexión WebSocket de torneo abierta:", wsUrl);
@@ -213,7 +290,15 @@
         };
 
         socket.onmessage = (event) => {
+            if (event.data instanceof ArrayBuffer) {
+                applySnapshot(decodeFrame(event.data));
+                return;
+            }
             const data = JSON.parse(event.data);
+            if (data.type === 'snapshot') {
+                applySnapshot(data);
+                return;
+            }
             console.log("[DEBUG] Mensaje WebSocket recibido:", data);
             handleWebSocketMessage(data);
         };
@@ -246,6 +331,7 @@
             console.log("[DEBUG] Inicio de partida recibido, asignando jugadores y comenzando gameLoop");
             const gameMessage = document.getElementById('game-message');
             if (gameMessage) gameMessage.classList.add('d-none');
+            snapshotScale = data.snapshot_scale || snapshotScale;
 
             myPlayerNumber = myId === data.player1.user_id ? 1 : 2;
             console.log("[DEBUG] Asignado como jugador:", myPlayerNumber);
@@ -315,7 +401,8 @@
             const player1IdStr = String(data.player1_id);
             const player2IdStr = String(data.player2_id);
             const winnerIdStr = data.winner === 1 ? player1IdStr : player2IdStr;
-            const isWinner = myIdStr === winnerIdStr;
+            // winner 0: el servidor ha interrumpido el partido y sigue pendiente
+            const isWinner = data.winner !== 0 && myIdStr === winnerIdStr;
             console.log("[DEBUG] Calculando isWinner - myId:", myIdStr, "winner:", data.winner, "player1_id:", player1IdStr, "player2_id:", player2IdStr, "isWinner:", isWinner);
 
             // Usar data.message si existe, o fallback según isWinner
@@ -343,14 +430,22 @@
             }
             if (tournamentContainer) {
                 tournamentContainer.classList.remove('d-none');
-                if (isWinner && matchId.includes('-match')) {  // Ganador de match1 o match2
+                const isFinal = matchId.endsWith('-m1');  // La final es el nodo 1 del cuadro
+                if (data.winner === 0) {
+                    tournamentContainer.innerHTML = `
+                        <div class="text-center">
+                            <h3>Partido interrumpido</h3>
+                            <p>${winnerMessage}</p>
+                        </div>
+                    `;
+                } else if (isWinner && !isFinal) {
                     tournamentContainer.innerHTML = `
                         <div class="text-center">
-                            <h3>¡Has ganado el primer partido!</h3>
-                            <p>Espera a que tu futuro oponente termine su partida antes de comenzar la final.</p>
+                            <h3>¡Has ganado el partido!</h3>
+                            <p>Espera a que terminen los demás partidos de la ronda para jugar la siguiente.</p>
                         </div>
                     `;
-                } else if (!isWinner && matchId.includes('-match')) {  // Perdedor de match1 o match2
+                } else if (!isWinner && !isFinal) {
                     tournamentContainer.innerHTML = `
                         <div class="text-center">
                             <h3>Fin de tu participación</h3>
@@ -363,25 +458,17 @@
         }
     }
 
-    function sendPaddleMovement() {
+    function sendPaddleMovement(direction) {
         if (socket && socket.readyState === WebSocket.OPEN) {
-            const now = Date.now();
-            if (now - lastPaddleUpdate >= 20) { // Reducido de 50 ms a 20 ms
-                lastPaddleUpdate = now;
-                let direction;
-                if (keysPressed['w'] || keysPressed['W'] || keysPressed['ArrowUp']) {
-                    direction = 'up';
-                } else if (keysPressed['s'] || keysPressed['S'] || keysPressed['ArrowDown']) {
-                    direction = 'down';
-                }
-                if (direction) {
-                    console.log("[DEBUG] Enviando movimiento de paleta:", direction);
-                    socket.send(JSON.stringify({
-                        'action': 'move',
-                        'direction': direction
-                    }));
-                }
-            }
+            // Aplicar el movimiento localmente sin esperar al servidor
+            inputSeq = (inputSeq + 1) >>> 0;
+            pendingInputs.push({ seq: inputSeq, direction: direction });
+            myPaddleY = applyInput(myPaddleY, direction);
+            socket.send(JSON.stringify({
+                'action': 'move',
+                'direction': direction,
+                'seq': inputSeq
+            }));
         }
     }
 
@@ -2,6 +2,7 @@
     let socket = null;
     let tournamentToken = null;
     let participants = [];
+    let maxPlayers = 4;
     let creatorId = null;
     let showStartButton = false;
     let tournamentFinished = false;
@@ -30,6 +31,7 @@
         }
         tournamentToken = null;
         participants = [];
+        maxPlayers = 4;
         creatorId = null;
         showStartButton = false;
         tournamentFinished = false; // Resetear al limpiar
@@ -79,6 +81,7 @@
                 if (!tournamentFinished) {
                     tournamentToken = data.token;
                     participants = data.participants;
+                    maxPlayers = data.max_players;
                     creatorId = data.creator;
                     showStartButton = data.show_start_button || false;
                     console.log("[DEBUG] Actualización recibida - Token:", tournamentToken, "Creador:", creatorId, "Show Start Button:", showStartButton);
@@ -98,7 +101,7 @@
             case 'countdown_to_final':
                 if (!tournamentFinished) {
                     console.log("[DEBUG] Contador para la final - Segundos restantes:", data.seconds, "Final Match ID:", data.final_match_id);
-                    showCountdown(data.seconds, data.final_match_id);
+                    showCountdown(data.seconds, data.final_match_id, data.final);
                 } else {
                     console.log("[DEBUG] Ignorando countdown_to_final porque el torneo ya terminó");
                 }
@@ -127,9 +130,12 @@
             console.log("[DEBUG] Creando torneo...");
             // Resetear el estado del torneo terminado
             tournamentFinished = false; 
+            const sizeSelect = document.getElementById('tournament-size-select');
+            const size = sizeSelect ? parseInt(sizeSelect.value, 10) : 4;
             setTimeout(() => {
                 socket.send(JSON.stringify({
-                    action: 'create_tournament'
+                    action: 'create_tournament',
+                    max_players: size
                 }));
             }, 200);
         } else {
@@ -184,7 +190,7 @@
         }
     }
 
-    function showCountdown(seconds, finalMatchId) {
+    function showCountdown(seconds, finalMatchId, isFinal) {
         const tournamentContainer = document.getElementById('tournament-container');
         if (!tournamentContainer) {
             console.error("[ERROR] No se encontró #tournament-container en el DOM");
@@ -194,12 +200,19 @@
         console.log("[DEBUG] Mostrando countdown:", seconds, "segundos para", finalMatchId);
         tournamentContainer.innerHTML = `
             <div class="text-center">
-                <h3>¡Preparándose para la final!</h3>
-                <p>La final comenzará en ${seconds} segundos...</p>
+                <h3>${isFinal ? '¡Preparándose para la final!' : '¡Preparándose para la siguiente ronda!'}</h3>
+                <p>${isFinal ? 'La final' : 'Tu partido'} comenzará en ${seconds} segundos...</p>
             </div>
         `;
     }
 
+    function playerItem(player, badge) {
+        return `<li class="list-group-item d-flex align-items-center">
+            <img src="${player.intra_picture || '/static/default-avatar.png'}" alt="Avatar" class="rounded-circle me-2" style="width: 40px; height: 40px; object-fit: cover;">
+            ${player.intra_login} ${badge || ''}
+        </li>`;
+    }
+
     function updateTournamentUI() {
         const tournamentContainer = document.getElementById('tournament-container');
         if (!tournamentContainer) {
@@ -216,7 +229,8 @@
             html += `<div class="card-header text-center">Token de invitación: <strong>${tournamentToken}</strong></div>`;
             html += '<div class="card-body">';
             html += '<ul class="list-group list-group-flush">';
-            html += '<li class="list-group-item">Ambos matches se juegan simultáneamente. Los ganadores avanzarán a la final.</li>';
+            html += `<li class="list-group-item">Eliminación directa hasta ${maxPlayers} jugadores. Si faltan jugadores, algunos pasan la primera ronda sin jugar.</li>`;
+            html += '<li class="list-group-item">Los partidos de cada ronda se juegan simultáneamente. Los ganadores avanzan a la siguiente.</li>';
             html += '<li class="list-group-item">Se jugará al mejor de 5 puntos.</li>';
             html += '<li class="list-group-item">Si un jugador se desconecta perderá automáticamente 5-0.</li>';
             html += '</ul>';
@@ -225,72 +239,24 @@
             html += '</div>';
             html += '</div>';
     
-            // Segundo row: Matches lado a lado
+            // Segundo row: jugadores inscritos
             html += '<div class="row justify-content-center mt-4">';
-    
-            // Match 1 (izquierda)
-            html += '<div class="col-md-5 mb-3">';
-            html += '<h4 class="text-center">Match 1</h4><ul class="list-group">';
-            const match1 = participants.slice(0, 2);
-            if (match1.length === 0) {
-                html += '<li class="list-group-item text-muted">Esperando jugador 1...</li>';
-                html += '<li class="list-group-item text-center">VS</li>';
-                html += '<li class="list-group-item text-muted">Esperando jugador 2...</li>';
-            } else if (match1.length === 1) {
-                html += `<li class="list-group-item d-flex align-items-center">
-                    <img src="${match1[0].intra_picture || '/static/default-avatar.png'}" alt="Avatar" class="rounded-circle me-2" style="width: 40px; height: 40px; object-fit: cover;">
-                    ${match1[0].intra_login} ${match1[0].id === creatorId ? '<span class="badge bg-primary ms-2">Creador</span>' : ''}
-                </li>`;
-                html += '<li class="list-group-item text-center">VS</li>';
-                html += '<li class="list-group-item text-muted">Esperando jugador 2...</li>';
-            } else {
-                html += `<li class="list-group-item d-flex align-items-center">
-                    <img src="${match1[0].intra_picture || '/static/default-avatar.png'}" alt="Avatar" class="rounded-circle me-2" style="width: 40px; height: 40px; object-fit: cover;">
-                    ${match1[0].intra_login} ${match1[0].id === creatorId ? '<span class="badge bg-primary ms-2">Creador</span>' : ''}
-                </li>`;
-                html += '<li class="list-group-item text-center">VS</li>';
-                html += `<li class="list-group-item d-flex align-items-center">
-                    <img src="${match1[1].intra_picture || '/static/default-avatar.png'}" alt="Avatar" class="rounded-circle me-2" style="width: 40px; height: 40px; object-fit: cover;">
-                    ${match1[1].intra_login} ${match1[1].id === creatorId ? '<span class="badge bg-primary ms-2">Creador</span>' : ''}
-                </li>`;
-            }
-            html += '</ul></div>';
-    
-            // Match 2 (derecha)
-            html += '<div class="col-md-5 mb-3">';
-            html += '<h4 class="text-center">Match 2</h4><ul class="list-group">';
-            const match2 = participants.slice(2, 4);
-            if (match2.length === 0) {
-                html += '<li class="list-group-item text-muted">Esperando jugador 3...</li>';
-                html += '<li class="list-group-item text-center">VS</li>';
-                html += '<li class="list-group-item text-muted">Esperando jugador 4...</li>';
-            } else if (match2.length === 1) {
-                html += `<li class="list-group-item d-flex align-items-center">
-                    <img src="${match2[0].intra_picture || '/static/default-avatar.png'}" alt="Avatar" class="rounded-circle me-2" style="width: 40px; height: 40px; object-fit: cover;">
-                    ${match2[0].intra_login} ${match2[0].id === creatorId ? '<span class="badge bg-primary ms-2">Creador</span>' : ''}
-                </li>`;
-                html += '<li class="list-group-item text-center">VS</li>';
-                html += '<li class="list-group-item text-muted">Esperando jugador 4...</li>';
-            } else {
-                html += `<li class="list-group-item d-flex align-items-center">
-                    <img src="${match2[0].intra_picture || '/static/default-avatar.png'}" alt="Avatar" class="rounded-circle me-2" style="width: 40px; height: 40px; object-fit: cover;">
-                    ${match2[0].intra_login} ${match2[0].id === creatorId ? '<span class="badge bg-primary ms-2">Creador</span>' : ''}
-                </li>`;
-                html += '<li class="list-group-item text-center">VS</li>';
-                html += `<li class="list-group-item d-flex align-items-center">
-                    <img src="${match2[1].intra_picture || '/static/default-avatar.png'}" alt="Avatar" class="rounded-circle me-2" style="width: 40px; height: 40px; object-fit: cover;">
-                    ${match2[1].intra_login} ${match2[1].id === creatorId ? '<span class="badge bg-primary ms-2">Creador</span>' : ''}
-                </li>`;
+            html += '<div class="col-md-6 mb-3">';
+            html += `<h4 class="text-center">Jugadores (${participants.length}/${maxPlayers})</h4><ul class="list-group">`;
+            participants.forEach(player => {
+                html += playerItem(player, player.id === creatorId ? '<span class="badge bg-primary ms-2">Creador</span>' : '');
+            });
+            if (participants.length < maxPlayers) {
+                html += '<li class="list-group-item text-muted">Esperando jugadores...</li>';
             }
             html += '</ul></div>';
-    
             html += '</div>'; // Cierre del segundo row
     
             // Botón de inicio
             if (showStartButton) {
                 html += '<div class="text-center mt-3">';
-                const isFull = participants.length === 4;
-                html += `<button id="start-tournament-btn" class="btn btn-success" ${!isFull ? 'disabled' : ''}>Comenzar Torneo</button>`;
+                const canStart = participants.length >= 2;
+                html += `<button id="start-tournament-btn" class="btn btn-success" ${!canStart ? 'disabled' : ''}>Comenzar Torneo</button>`;
                 html += '</div>';
             }
         } else {
@@ -301,6 +267,14 @@
         setupStartButton();
     }
 
+    function roundName(index, total) {
+        const remaining = total - index;
+        if (remaining === 1) return 'Final';
+        if (remaining === 2) return 'Semifinales';
+        if (remaining === 3) return 'Cuartos de final';
+        return `Ronda ${index + 1}`;
+    }
+
     function displayTournamentResults(results) {
         const tournamentContainer = document.getElementById('tournament-container');
         if (!tournamentContainer) {
@@ -309,39 +283,25 @@
         }
     
         let html = '<h3 class="text-center">Resultados del Torneo</h3>';
-        html += '<div class="row justify-content-center">';
-    
-        // Match 1
-        html += '<div class="col-md-4 mb-3"><h4>Match 1</h4><ul class="list-group">';
-        results.match1.players.forEach(player => {
-            html += `<li class="list-group-item d-flex align-items-center">
-                <img src="${player.intra_picture || '/static/default-avatar.png'}" alt="Avatar" class="rounded-circle me-2" style="width: 40px; height: 40px; object-fit: cover;">
-                ${player.intra_login} ${player.id === results.match1.winner.id ? '<span class="badge bg-success ms-2">Ganador</span>' : ''}
-            </li>`;
-        });
-        html += '</ul></div>';
-    
-        // Match 2
-        html += '<div class="col-md-4 mb-3"><h4>Match 2</h4><ul class="list-group">';
-        results.match2.players.forEach(player => {
-            html += `<li class="list-group-item d-flex align-items-center">
-                <img src="${player.intra_picture || '/static/default-avatar.png'}" alt="Avatar" class="rounded-circle me-2" style="width: 40px; height: 40px; object-fit: cover;">
-                ${player.intra_login} ${player.id === results.match2.winner.id ? '<span class="badge bg-success ms-2">Ganador</span>' : ''}
-            </li>`;
-        });
-        html += '</ul></div>';
-    
-        // Final
-        html += '<div class="col-md-4 mb-3"><h4>Final</h4><ul class="list-group">';
-        results.final.players.forEach(player => {
-            html += `<li class="list-group-item d-flex align-items-center">
-                <img src="${player.intra_picture || '/static/default-avatar.png'}" alt="Avatar" class="rounded-circle me-2" style="width: 40px; height: 40px; object-fit: cover;">
-                ${player.intra_login} ${player.id === results.final.winner.id ? '<span class="badge bg-success ms-2">Ganador</span>' : ''}
-            </li>`;
+        if (results.winner) {
+            html += `<p class="lead text-center">Campeón: <strong>${results.winner.intra_login}</strong></p>`;
+        }
+
+        // Una fila por ronda, de la primera a la final
+        results.rounds.forEach((matches, index) => {
+            html += `<h4 class="text-center mt-3">${roundName(index, results.rounds.length)}</h4>`;
+            html += '<div class="row justify-content-center">';
+            matches.forEach(match => {
+                html += '<div class="col-md-3 mb-3"><ul class="list-group">';
+                match.players.forEach(player => {
+                    const isWinner = match.winner && player.id === match.winner.id;
+                    html += playerItem(player, isWinner ? '<span class="badge bg-success ms-2">Ganador</span>' : '');
+                });
+                html += `<li class="list-group-item text-center text-muted">${match.score[0]} - ${match.score[1]}</li>`;
+                html += '</ul></div>';
+            });
+            html += '</div>';
         });
-        html += '</ul></div>';
-    
-        html += '</div>';
     
         tournamentContainer.innerHTML = html;
     }
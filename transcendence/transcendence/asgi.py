@@ -10,11 +10,7 @@ from django.core.asgi import get_asgi_application
 from channels.routing import ProtocolTypeRouter, URLRouter
 from channels.auth import AuthMiddlewareStack
 from transcendence.routing import websocket_urlpatterns  # Importamos solo la variable
-#from pong.consumers import tournament_rooms, tournament_connections
-
-#tournament_rooms.clear()
-#tournament_connections.clear()
-#print("[DEBUG] Estado inicial limpiado")
+# Los torneos en curso se recuperan de Redis (pong.store) al reiniciar
 
 application = ProtocolTypeRouter(
     {
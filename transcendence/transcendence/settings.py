@@ -140,6 +140,65 @@ CHANNEL_LAYERS = {
 }
 
 
+# Simulación de partidas: ticks por segundo del planificador compartido
+GAME_TICK_RATE = int(os.getenv("GAME_TICK_RATE", "60"))
+# Física de las salas: 'batch' (NumPy, todas a la vez) o 'engine' (sala a sala)
+GAME_PHYSICS_BACKEND = os.getenv("GAME_PHYSICS_BACKEND", "batch")
+# Decimales con los que se envían las posiciones en los snapshots (de 0 a 4;
+# con más el arranque falla porque no caben en los frames binarios)
+GAME_SNAPSHOT_DECIMALS = int(os.getenv("GAME_SNAPSHOT_DECIMALS", "3"))
+# Procesos de simulación aparte del proceso ASGI: 0 para simular en el propio
+# proceso, 'auto' para uno por núcleo
+GAME_SIMULATION_PROCESSES = os.getenv("GAME_SIMULATION_PROCESSES", "0")
+GAME_SIMULATION_PROCESSES = (os.cpu_count() if GAME_SIMULATION_PROCESSES == "auto"
+                             else int(GAME_SIMULATION_PROCESSES))
+# Máximo de partidas que empiezan a simularse en un mismo tick (0 sin límite);
+# el resto de las que arrancan a la vez, como una ronda de torneo, esperan
+GAME_STARTS_PER_TICK = int(os.getenv("GAME_STARTS_PER_TICK", "8"))
+
+# Cada cuántos milisegundos se vacía la cola de matchmaking
+MATCHMAKING_INTERVAL_MS = int(os.getenv("MATCHMAKING_INTERVAL_MS", "200"))
+# Máximo de parejas que se forman en cada pasada
+MATCHMAKING_BATCH_SIZE = int(os.getenv("MATCHMAKING_BATCH_SIZE", "256"))
+# Latidos de los workers en Redis para repartir las salas (pong.ownership)
+OWNERSHIP_HEARTBEAT_S = float(os.getenv("OWNERSHIP_HEARTBEAT_S", "2"))
+# Sin latir durante este tiempo un worker se da por caído
+OWNERSHIP_WORKER_TTL_S = float(os.getenv("OWNERSHIP_WORKER_TTL_S", "6"))
+# Cada cuántos milisegundos se escriben en Redis los torneos modificados
+TOURNAMENT_FLUSH_MS = int(os.getenv("TOURNAMENT_FLUSH_MS", "100"))
+# Tiempo que se conserva en Redis un torneo sin cambios
+TOURNAMENT_TTL_S = int(os.getenv("TOURNAMENT_TTL_S", "86400"))
+# Segundos que cada worker reutiliza los logins y estadísticas de usuarios que
+# tiene en caché (participantes de torneos, nombres del historial). Los
+# cambios se ven al momento en el worker que guarda el usuario y, como mucho,
+# tras este tiempo en los demás
+USER_CACHE_TTL_S = float(os.getenv("USER_CACHE_TTL_S", "10"))
+
+# Dónde se guardan los resultados de los torneos (pong.ledger): 'web3' (el
+# contrato en Ganache), 'memory' o 'sqlite' (copias locales del contrato para
+# probar sin Ganache), el fichero de 'sqlite' y los milisegundos que tarda
+# cada llamada a los libros locales
+BLOCKCHAIN_BACKEND = os.getenv("BLOCKCHAIN_BACKEND", "web3")
+BLOCKCHAIN_SQLITE_PATH = os.getenv("BLOCKCHAIN_SQLITE_PATH", os.path.join(BASE_DIR, 'ledger.sqlite3'))
+BLOCKCHAIN_LATENCY_MS = float(os.getenv("BLOCKCHAIN_LATENCY_MS", "0"))
+# Nodo de la blockchain (el mismo que usa Truffle para desplegar el contrato)
+BLOCKCHAIN_URL = f"http://{os.getenv('TRUFFLE_HOST', 'ganache')}:{os.getenv('TRUFFLE_PORT', '8545')}"
+# Directorio donde Truffle deja el ABI y la dirección del contrato desplegado
+BLOCKCHAIN_BUILD_DIR = os.getenv("CONTRACT_BUILD_DIR", "/app/build")
+# Conexiones keep-alive por cliente web3 (pong.blockchain) y segundos máximos
+# por petición al nodo
+BLOCKCHAIN_POOL_SIZE = int(os.getenv("BLOCKCHAIN_POOL_SIZE", "10"))
+BLOCKCHAIN_TIMEOUT_S = float(os.getenv("BLOCKCHAIN_TIMEOUT_S", "10"))
+# Escritura de resultados en la blockchain (pong.chain): resultados por
+# transacción, segundos que se espera a completar un lote, segundos entre
+# pasadas, espera máxima de un recibo y reintentos
+BLOCKCHAIN_BATCH_SIZE = int(os.getenv("BLOCKCHAIN_BATCH_SIZE", "20"))
+BLOCKCHAIN_BATCH_WINDOW_S = float(os.getenv("BLOCKCHAIN_BATCH_WINDOW_S", "2"))
+BLOCKCHAIN_POLL_S = float(os.getenv("BLOCKCHAIN_POLL_S", "5"))
+BLOCKCHAIN_RECEIPT_TIMEOUT_S = float(os.getenv("BLOCKCHAIN_RECEIPT_TIMEOUT_S", "120"))
+BLOCKCHAIN_MAX_ATTEMPTS = int(os.getenv("BLOCKCHAIN_MAX_ATTEMPTS", "8"))
+
+
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
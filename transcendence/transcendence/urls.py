@@ -20,6 +20,7 @@ urlpatterns = [
     path('mock-login/<str:username>/', mock_login, name='mock_login'),
     path('history/', views.history, name='history'),
     path('tournament-history/', views.tournament_history, name='tournament_history'),
+    path('tournament-history/<int:chain_index>/verify/', views.verify_tournament, name='verify_tournament'),
     path('profile/anonimize/', anonimize, name='anonimize'),
     path("prometheus/", include("django_prometheus.urls")),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
@@ -1,83 +1,65 @@
-from django.shortcuts import render, redirect
+from django.shortcuts import render, redirect, get_object_or_404
 from users.models import User
-from pong.models import History
+from pong.models import History, TournamentRecord
+from pong.chain import MATCH_FIELDS, from_contract
+from pong.ledger import ledger
+from django.conf import settings
 from django.utils import timezone
 import time
 from django.core.paginator import Paginator
-from web3 import Web3
-import json
 from django.http import HttpResponse
 from django.db.models import Q
-
-# Configuración de la blockchain
-ganache_url = "http://ganache:8545"
-web3 = Web3(Web3.HTTPProvider(ganache_url)) # Conexión a Ganache
-
-# Verificar conexión al iniciar
-if web3.is_connected():
-    print("[INFO] Conectado a la blockchain")
-else:
-    print("[ERROR] No se pudo conectar a la blockchain")
-
-# Cargar ABI y dirección del contrato
-with open('/app/build/contracts/Tournament.json') as f:
-    contract_json = json.load(f)
-    contract_abi = contract_json['abi']
-
-with open('/app/build/contract_address.txt', 'r') as file:
-    contract_address = file.read().strip()
-contract = web3.eth.contract(address=contract_address, abi=contract_abi)
-
-def get_all_tournaments():
-    if not web3.is_connected():
-        print("[ERROR] No se pudo conectar a la blockchain")
-        return []
-    try:
-        # Obtener todos los torneos desde la blockchain
-        matches = contract.functions.getMatches().call()
-        tournaments = []
-        for match in matches:
-            # Verificar si los player_id son numéricos
-            try:
-                player_ids = [match[0], match[1], match[2], match[3]]
-                # Intentar convertir cada ID a entero para validar
-                for pid in player_ids:
-                    int(pid)  # Lanza ValueError si no es numérico
-            except (ValueError, TypeError):
-                print(f"[INFO] Saltando torneo con IDs no numéricos: {player_ids}")
-                continue  # Saltar este torneo
-
-            tournament = {
-                "player_id_1": match[0],
-                "player_id_2": match[1],
-                "player_id_3": match[2],
-                "player_id_4": match[3],
-                "score_match_1_2": match[4],
-                "score_match_3_4": match[5],
-                "score_match_final": match[6]
-            }
-            # Mapear IDs a nombres de usuario
-            try:
-                tournament['player_1_name'] = User.objects.get(internal_id=match[0]).intra_login
-            except (User.DoesNotExist, ValueError):
-                tournament['player_1_name'] = match[0]
-            try:
-                tournament['player_2_name'] = User.objects.get(internal_id=match[1]).intra_login
-            except (User.DoesNotExist, ValueError):
-                tournament['player_2_name'] = match[1]
-            try:
-                tournament['player_3_name'] = User.objects.get(internal_id=match[2]).intra_login
-            except (User.DoesNotExist, ValueError):
-                tournament['player_3_name'] = match[2]
-            try:
-                tournament['player_4_name'] = User.objects.get(internal_id=match[3]).intra_login
-            except (User.DoesNotExist, ValueError):
-                tournament['player_4_name'] = match[3]
-            tournaments.append(tournament)
-        return tournaments
-    except Exception as e:
-        print(f"[ERROR] Error al obtener torneos de la blockchain: {e}")
-        return []
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from collections import OrderedDict
+import threading
+
+# LRU de internal_id a (caducidad, intra_login) (None si el usuario no existe)
+# para los nombres del historial de torneos. Caducan tras USER_CACHE_TTL_S
+# porque post_save solo limpia la caché del worker que guarda el usuario
+PLAYER_NAMES_SIZE = 1024
+player_names = OrderedDict()
+player_names_lock = threading.Lock()
+
+@receiver(post_save, sender=User)
+def invalidate_player_name(sender, instance, **kwargs):
+    with player_names_lock:
+        player_names.pop(instance.internal_id, None)
+
+def get_player_names(player_ids):
+    """Login de cada ID; los que no están en caché (o han caducado) se piden en una sola consulta."""
+    ids = {int(player_id) for player_id in player_ids if player_id.isdigit()}
+    now = time.monotonic()
+    with player_names_lock:
+        missing = [user_id for user_id in ids
+                   if user_id not in player_names or player_names[user_id][0] <= now]
+    if missing:
+        users = User.objects.in_bulk(missing)
+        expires = now + settings.USER_CACHE_TTL_S
+        with player_names_lock:
+            for user_id in missing:
+                user = users.get(user_id)
+                player_names[user_id] = (expires, user.intra_login if user else None)
+    names = {}
+    with player_names_lock:
+        for user_id in ids:
+            _, name = player_names.get(user_id, (0, None))
+            if user_id in player_names:
+                player_names.move_to_end(user_id)
+            if name is not None:
+                names[str(user_id)] = name
+        while len(player_names) > PLAYER_NAMES_SIZE:
+            player_names.popitem(last=False)
+    return names
+
+def add_player_names(entries):
+    """Añade a cada torneo de la página el login de sus jugadores."""
+    names = get_player_names([getattr(entry, f'player_id_{number}')
+                              for entry in entries for number in range(1, 5)])
+    for entry in entries:
+        for number in range(1, 5):
+            player_id = getattr(entry, f'player_id_{number}')
+            setattr(entry, f'player_{number}_name', names.get(player_id, player_id))
 
 def home(request):
     user_id = request.session.get('user_id')
@@ -150,12 +132,13 @@ def tournament_history(request):
         request.session.flush()
         return redirect('login')
 
-    # Obtener torneos desde la blockchain
-    tournament_entries = get_all_tournaments()
-    
+    # Copia local de los torneos de la blockchain, que mantiene pong.chain
+    tournament_entries = TournamentRecord.objects.order_by('-chain_index')
+
     paginator = Paginator(tournament_entries, 10)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
+    add_player_names(page_obj)
 
     context = {
         'user': user,
@@ -165,3 +148,17 @@ def tournament_history(request):
     template = "partials/tournament_history.html" if request.htmx else "tournament_history.html"
     return render(request, template, context)
 
+def verify_tournament(request, chain_index):
+    """Compara un torneo del historial con su entrada en el contrato."""
+    if not request.session.get('user_id'):
+        return redirect('login')
+    record = get_object_or_404(TournamentRecord, chain_index=chain_index)
+    try:
+        entry = ledger.match(chain_index)
+    except Exception as e:
+        print(f"[ERROR] Error al verificar el torneo #{chain_index} en la blockchain: {e}")
+        return HttpResponse('<span class="badge bg-secondary">Sin conexión</span>')
+    if from_contract(entry) == {field: getattr(record, field) for field in MATCH_FIELDS}:
+        return HttpResponse('<span class="badge bg-success">Verificado</span>')
+    print(f"[WARNING] El torneo #{chain_index} no coincide con la blockchain: {entry}")
+    return HttpResponse('<span class="badge bg-danger">No coincide</span>')